@@ -1,170 +1,387 @@
-import pyautogui
+# -*- coding: utf-8 -*-
+"""
+Gerador de links de afiliado em lote (sem mouse/teclado).
+
+Substitui o loop com pyautogui (cliques em coordenadas fixas: Excel → barra
+de URL → Compartilhar → Link, ~25s por produto). Agora:
+
+    1. Lê a coluna "Link Afiliado" da planilha gerada pelo ml.py
+    2. Gera os links de compartilhamento via HTTP, com vários workers e
+       vários links por requisição, usando os cookies de uma sessão logada
+       (arquivo JSON ou perfil do Chrome aberto em modo headless)
+    3. Grava todos os links na coluna "Link Compartilhado" de uma vez
+
+Linhas que já têm link gerado são puladas (dá para rodar de novo após falhas)
+e os links ficam em cache por ID do produto (MLB...): numa nova planilha só
+os produtos novos passam pelo serviço de afiliados.
+
+Uso:
+    python app.py mercadolivre_products_20250101_120000.xlsx --perfil ~/.ml-perfil
+    python app.py planilha.xlsx --endpoint http://127.0.0.1:8765/links   # stub local
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
 import time
-
-# --- (IMPORTANTE!) SUAS COORDENADAS ---
-
-# 1. Posição no Excel (Canto/Célula inicial)
-# X=1279, Y=109
-pos_1_x, pos_1_y = (1279, 109)
-
-# 6. Posição da Barra de URL do navegador
-# X=351, Y=60
-pos_2_x, pos_2_y = (351, 60)
-
-# 10. Posição para estabilizar/focar na tela do ML
-# X=1312, Y=190
-pos_3_x, pos_3_y = (1312, 190) 
-
-# 11. Posição do Botão "Compartilhar"
-# X=1204, Y=110
-pos_4_x, pos_4_y = (1204, 110) 
-
-# 16. Posição do Código do Produto no ML
-# X=1208, Y=461
-pos_5_x, pos_5_y = (1208, 461)
-
-# 11b. Posição do "Link" (após clicar em compartilhar)
-# X=1212, Y=366
-pos_6_x, pos_6_y = (1212, 366)
-# ----------------------------------------------------
-
-
-# --- Configuração do PyAutoGUI ---
-pyautogui.PAUSE = 0.5 
-pyautogui.FAILSAFE = True 
-
-
-# --- Início do Script ---
-while True:
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from openpyxl import load_workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.link_cache import DEFAULT_CACHE_PATH, LinkCache
+from common.product_ids import canonical_product_id
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+
+# Endpoint do programa de afiliados (recebe {"urls": [...], "tag": ...})
+AFFILIATE_ENDPOINT = os.environ.get(
+    "AFILIADO_ENDPOINT",
+    "https://www.mercadolivre.com.br/affiliate-program/api/v2/affiliates/createLink",
+)
+AFFILIATE_TAG = os.environ.get("AFILIADO_TAG", "")
+AFFILIATE_HOME = "https://www.mercadolivre.com.br/"
+
+# Colunas da planilha (nomes usados pelo ml.py)
+SOURCE_COLUMN = "Link Afiliado"
+TARGET_COLUMN = "Link Compartilhado"
+
+WORKERS = 4         # Requisições simultâneas
+BATCH_SIZE = 20     # Links por requisição
+HTTP_TIMEOUT = 20   # Segundos por requisição
+MAX_RETRIES = 3     # Tentativas por lote (429/5xx/erro de rede)
+RETRY_BACKOFF = 2.0 # Espera base entre tentativas (dobra a cada uma)
+SAVE_EVERY = 200    # Salva a planilha a cada N links gerados (0 = só no final)
+
+# Cache de links por ID do produto
+LINK_CACHE_TTL_DAYS = 30
+LINK_CACHE_MAX_ENTRIES = 50_000
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+class AffiliateError(Exception):
+    """Falha ao gerar links (resposta inválida ou tentativas esgotadas)"""
+
+
+# ============================================================================
+# SESSÃO AUTENTICADA
+# ============================================================================
+
+def load_cookies_file(path: str) -> List[Dict]:
+    """
+    Lê cookies exportados do navegador (lista JSON de {name, value, domain...}
+    ou dicionário simples nome → valor).
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return [{"name": k, "value": v} for k, v in data.items()]
+    return data
+
+
+def cookies_from_browser(profile_dir: str, url: str = AFFILIATE_HOME) -> List[Dict]:
+    """
+    Abre o perfil do Chrome (já logado) em modo headless e copia os cookies.
+
+    O navegador só é usado aqui: a geração dos links em si é feita via HTTP.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service as ChromeService
+
+    from common.driver_pool import resolve_chromedriver_path
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument(f"--user-data-dir={os.path.abspath(os.path.expanduser(profile_dir))}")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument(f"user-agent={USER_AGENT}")
+
+    driver = webdriver.Chrome(service=ChromeService(resolve_chromedriver_path()), options=options)
     try:
-        total_loops = int(input("Quantas vezes você quer que o loop se repita? "))
-        if total_loops > 0:
-            break
+        driver.get(url)
+        return driver.get_cookies()
+    finally:
+        driver.quit()
+
+
+def create_affiliate_session(cookies: Optional[List[Dict]] = None, pool_size: int = WORKERS) -> requests.Session:
+    """Sessão HTTP com os cookies da conta de afiliado e pool de conexões para os workers"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept": "application/json",
+        "Origin": AFFILIATE_HOME.rstrip("/"),
+        "Referer": AFFILIATE_HOME,
+    })
+    for cookie in cookies or []:
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""),
+                            path=cookie.get("path", "/"))
+    return session
+
+
+# ============================================================================
+# GERAÇÃO DOS LINKS
+# ============================================================================
+
+def parse_links_response(data, urls: List[str]) -> Dict[str, str]:
+    """
+    Interpreta a resposta do endpoint.
+
+    Aceita {"urls": [{"origin_url", "short_url"}, ...]} (ou "links"/"url"/"link")
+    e associa pela URL de origem ou, sem ela, pela ordem do pedido.
+
+    Retorna:
+          URL original → link gerado (só os que vieram preenchidos)
+    """
+    items = (data.get("urls") or data.get("links")) if isinstance(data, dict) else data
+    links = {}
+    for idx, item in enumerate(items or []):
+        if isinstance(item, str):
+            origin, link = (urls[idx] if idx < len(urls) else None), item
         else:
-            print("Por favor, insira um número maior que zero.")
-    except ValueError:
-        print("Entrada inválida. Por favor, digite apenas um número.")
-
-print(f"\nAutomação iniciando... O script rodará {total_loops} vez(es).")
-print("Você tem 5 segundos para focar na janela correta (Alt+Tab).")
-print("!!! LEMBRE-SE: Mova o mouse para o canto superior esquerdo para PARAR FORÇADAMENTE !!!")
-
-time.sleep(9) # <--- Tempo de 9s mantido
-print("Iniciando!")
-
-
-# --- O Loop Principal ---
-try:
-    for i in range(total_loops):
-        loop_atual = i + 1
-        print(f"\n--- Iniciando Loop {loop_atual} de {total_loops} ---")
-
-        # 1. clique no canto superior excel (X=1279, Y=109)
-        print(f"Loop {loop_atual}: 1. Clicando em Posição 1 (Excel) ({pos_1_x}, {pos_1_y})")
-        pyautogui.click(pos_1_x, pos_1_y)
-
-        # 2. Espere 2 segundos
-        print(f"Loop {loop_atual}: 2. Esperando 2 segundos...")
-        time.sleep(2)
-
-        # 4. Copie CTRL + C
-        print(f"Loop {loop_atual}: 4. Pressionando CTRL + C")
-        pyautogui.hotkey('ctrl', 'c')
-        
-        # 5. aperte alt + Tab (Indo para o Navegador)
-        print(f"Loop {loop_atual}: 5. Pressionando Alt + Tab")
-        pyautogui.hotkey('alt', 'tab')
-        time.sleep(0.5) 
-
-        # 6. clique na URL (X=351, Y=60)
-        print(f"Loop {loop_atual}: 6. Clicando em Posição 2 (URL) ({pos_2_x}, {pos_2_y})")
-        pyautogui.click(pos_2_x, pos_2_y)
-
-        # 7. Aperte CTRL + A (Selecionar tudo)
-        print(f"Loop {loop_atual}: 7. Pressionando CTRL + A")
-        pyautogui.hotkey('ctrl', 'a')
-        pyautogui.press('backspace') 
-
-        # 8. Aperte CTRL + V (Colar) e Enter
-        print(f"Loop {loop_atual}: 8. Pressionando CTRL + V e Enter")
-        pyautogui.hotkey('ctrl', 'v')
-        
-        # O clique extra aqui foi removido
-        pyautogui.press('enter') 
-
-        # 9. Espere 5 segundos (para a página carregar)
-        print(f"Loop {loop_atual}: 9. Esperando 5 segundos...")
-        time.sleep(10)
-
-        # 10. Clique para estabilizar na tela do ML (X=1312, Y=190)
-        print(f"Loop {loop_atual}: 10. Clicando em Posição 3 (Foco ML) ({pos_3_x}, {pos_3_y})")
-        pyautogui.click(pos_3_x, pos_3_y)
-
-        # 11. Clique no Botão compartilhar (X=1204, Y=110)
-        print(f"Loop {loop_atual}: 11. Clicando em Posição 4 (Compartilhar) ({pos_4_x}, {pos_4_y})")
-        pyautogui.click(pos_4_x, pos_4_y)
-
-        time.sleep(3)
-
-        # 11b. Clique no Link de compartilhar (X=1212, Y=366)
-        print(f"Loop {loop_atual}: 11b. Clicando em Posição 6 (Link) ({pos_6_x}, {pos_6_y})")
-        pyautogui.click(pos_6_x, pos_6_y) 
-
-        # 12. aperte alt + TAB (Voltando para o Excel)
-        print(f"Loop {loop_atual}: 12. Pressionando Alt + Tab")
-        pyautogui.hotkey('alt', 'tab')
-        time.sleep(0.5) 
-
-        # Resetar Posição no Excel (X=1279, Y=109)
-        print(f"Loop {loop_atual}: Resetando Posição 1 (Excel) ({pos_1_x}, {pos_1_y})")
-        pyautogui.click(pos_1_x, pos_1_y)
-
-        # 13. aperte o botão right (ir para a célula do lado)
-        print(f"Loop {loop_atual}: 13. Pressionando Seta para Direita")
-        pyautogui.press('right') # <--- CORRIGIDO de click() para press()
-
-        # 14. Pressione CTRL + V (Colar link no Excel)
-        print(f"Loop {loop_atual}: 14. Pressionando CTRL + V")
-        pyautogui.hotkey('ctrl', 'v')
-
-        # 15. aperte alt + TAB (Voltando para o Navegador)
-        #print(f"Loop {loop_atual}: 15. Pressionando Alt + Tab")
-        #pyautogui.hotkey('alt', 'tab')
-        #time.sleep(0.5) 
-
-        # 16. Copiar codigo do produto (X=1208, Y=461)
-        #print(f"Loop {loop_atual}: 16. Clicando em Posição 5 (Cód. Produto) ({pos_5_x}, {pos_5_y})")
-        #pyautogui.click(pos_5_x, pos_5_y)
-        #pyautogui.hotkey('ctrl', 'c') # (Assumindo que você quer copiar após clicar)
-
-        ## 17. aperte alt + TAB (Voltando para o Excel)
-        #print(f"Loop {loop_atual}: 17. Pressionando Alt + Tab")
-        #pyautogui.hotkey('alt', 'tab')
-        #time.sleep(0.5) 
-
-        # Resetar Posição no Excel (X=1279, Y=109)
-        #print(f"Loop {loop_atual}: Resetando Posição 1 (Excel) ({pos_1_x}, {pos_1_y})")
-        #pyautogui.click(pos_1_x, pos_1_y)
-
-        # 18. aperte o botão right
-        #print(f"Loop {loop_atual}: 18. Pressionando Seta para Direita 2x")
-        #pyautogui.press('right') # <--- CORRIGIDO de click() para press()
-
-        # 19. Pressione CTRL + V (Colar código do produto)
-        #print(f"Loop {loop_atual}: 19. Pressionando CTRL + V")
-        #pyautogui.hotkey('ctrl', 'v')
-        
-        # 20. Voltar para a célula inicial da próxima linha
-        print(f"Loop {loop_atual}: 20. Indo para próxima linha (Baixo, Esquerda 2x)")
-        pyautogui.press('down') # <--- CORRIGIDO de click() para press()
-        pyautogui.press('left') # <--- CORRIGIDO de click() para press()
-
-        print(f"--- Loop {loop_atual} Concluído ---")
-        time.sleep(5) # Pequena pausa antes do próximo loop
-
-    print("\n\KAutomação Concluída! Todos os loops foram executados.")
-
-except KeyboardInterrupt:
-    print("\n\nPROGRAMA INTERROMPIDO MANUALMENTE (Ctrl+C).")
-except pyautogui.FailSafeException:
-    print("\n\nPROGRAMA INTERROMPIDO (FAILSAFE)! O mouse foi movido para o canto.")
\ No newline at end of file
+            origin = item.get("origin_url") or item.get("url_origin") or (urls[idx] if idx < len(urls) else None)
+            link = item.get("short_url") or item.get("link") or item.get("url")
+        if origin and link and link != origin:
+            links[origin] = link
+    return links
+
+
+def request_links(session: requests.Session, urls: List[str], endpoint: str = AFFILIATE_ENDPOINT,
+                  tag: str = AFFILIATE_TAG, retries: int = MAX_RETRIES) -> Dict[str, str]:
+    """
+    Gera os links de um lote em UMA requisição (com retentativas).
+
+    Levanta:
+          AffiliateError: Tentativas esgotadas ou resposta inválida
+    """
+    payload = {"urls": urls}
+    if tag:
+        payload["tag"] = tag
+
+    last_error = None
+    for attempt in range(retries):
+        try:
+            response = session.post(endpoint, json=payload, timeout=HTTP_TIMEOUT)
+            if response.status_code in (401, 403):
+                # Sessão expirada: repetir não resolve
+                raise AffiliateError(f"HTTP {response.status_code}: sessão de afiliado inválida (refaça o login)")
+            if response.status_code == 429 or response.status_code >= 500:
+                last_error = f"HTTP {response.status_code}"
+            else:
+                response.raise_for_status()
+                return parse_links_response(response.json(), urls)
+        except AffiliateError:
+            raise
+        except (requests.RequestException, ValueError) as e:
+            last_error = str(e)
+        if attempt + 1 < retries:
+            time.sleep(RETRY_BACKOFF * (2 ** attempt))
+
+    raise AffiliateError(f"Lote de {len(urls)} links falhou após {retries} tentativas: {last_error}")
+
+
+def generate_links(session: requests.Session, urls: List[str], endpoint: str = AFFILIATE_ENDPOINT,
+                   workers: int = WORKERS, batch_size: int = BATCH_SIZE,
+                   on_batch=None) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Gera os links em paralelo (lotes de `batch_size`, `workers` simultâneos).
+
+    Args:
+          on_batch: Chamado (serializado) com o dicionário de cada lote concluído
+
+    Retorna:
+          (URL original → link gerado, lista de erros)
+    """
+    unique = list(dict.fromkeys(urls))
+    batches = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+    links: Dict[str, str] = {}
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(request_links, session, batch, endpoint): batch for batch in batches}
+        for future in as_completed(futures):
+            try:
+                batch_links = future.result()
+            except AffiliateError as e:
+                errors.append(str(e))
+                continue
+            with lock:
+                links.update(batch_links)
+                if on_batch is not None:
+                    on_batch(batch_links)
+
+    return links, errors
+
+
+# ============================================================================
+# PLANILHA
+# ============================================================================
+
+def find_latest_sheet(pattern: str = "mercadolivre_products_*.xlsx") -> Optional[str]:
+    """Planilha mais recente gerada pelo ml.py no diretório atual"""
+    files = glob.glob(pattern)
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def column_index(sheet, header: str, create: bool = False) -> Optional[int]:
+    """Índice (1-based) da coluna com esse cabeçalho; cria no final se `create`"""
+    for cell in sheet[1]:
+        if cell.value == header:
+            return cell.column
+    if not create:
+        return None
+    idx = sheet.max_column + 1
+    sheet.cell(row=1, column=idx, value=header)
+    return idx
+
+
+def process_sheet(path: str, session: requests.Session, endpoint: str = AFFILIATE_ENDPOINT,
+                  workers: int = WORKERS, batch_size: int = BATCH_SIZE, force: bool = False,
+                  cache: Optional[LinkCache] = None) -> Dict:
+    """
+    Preenche a coluna TARGET_COLUMN da planilha com os links gerados.
+
+    Args:
+          force: Gera de novo mesmo para linhas que já têm link (ignora o cache)
+          cache: Cache de links por ID do produto (None = sem cache)
+
+    Retorna:
+          Estatísticas: pending, cached, generated, errors, seconds
+    """
+    workbook = load_workbook(path)
+    sheet = workbook.active
+    source_idx = column_index(sheet, SOURCE_COLUMN)
+    if source_idx is None:
+        raise AffiliateError(f"Coluna '{SOURCE_COLUMN}' não encontrada em {path}")
+    target_idx = column_index(sheet, TARGET_COLUMN, create=True)
+
+    # URL → linhas (o mesmo produto pode aparecer em mais de uma categoria)
+    rows_by_url: Dict[str, List[int]] = {}
+    for row in range(2, sheet.max_row + 1):
+        url = sheet.cell(row=row, column=source_idx).value
+        if not url or not str(url).startswith("http"):
+            continue
+        if not force and sheet.cell(row=row, column=target_idx).value:
+            continue
+        rows_by_url.setdefault(str(url), []).append(row)
+
+    start = time.perf_counter()
+    product_ids = {url: canonical_product_id(url, "mercadolivre") for url in rows_by_url}
+
+    def fill(batch_links: Dict[str, str]) -> None:
+        for url, link in batch_links.items():
+            for row in rows_by_url.get(url, []):
+                sheet.cell(row=row, column=target_idx, value=link)
+
+    # Links já gerados em execuções anteriores (por ID, não por URL: os
+    # parâmetros de rastreamento da URL mudam entre coletas)
+    cached: Dict[str, str] = {}
+    if cache is not None and not force:
+        hits = cache.get_many(product_ids.values())
+        cached = {url: hits[pid] for url, pid in product_ids.items() if pid in hits}
+        fill(cached)
+
+    missing = [url for url in rows_by_url if url not in cached]
+    print(f"🔗 {len(rows_by_url)} links pendentes: {len(cached)} do cache, {len(missing)} para gerar "
+          f"({workers} workers, {batch_size} por requisição)")
+    written = 0
+
+    def write_batch(batch_links: Dict[str, str]) -> None:
+        nonlocal written
+        before = written
+        fill(batch_links)
+        written += len(batch_links)
+        if cache is not None:
+            cache.put_many({product_ids[url]: (url, link) for url, link in batch_links.items()})
+        print(f"   → {written}/{len(missing)} links gerados")
+        # Salvamento parcial: uma falha no meio não perde o que já foi gerado
+        if SAVE_EVERY and written // SAVE_EVERY > before // SAVE_EVERY:
+            workbook.save(path)
+
+    links, errors = generate_links(session, missing, endpoint, workers, batch_size, on_batch=write_batch)
+    workbook.save(path)
+
+    return {
+        "pending": len(rows_by_url),
+        "cached": len(cached),
+        "generated": len(links),
+        "errors": errors,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+# ============================================================================
+# PONTO DE ENTRADA
+# ============================================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Gera links de afiliado em lote para a planilha do ml.py")
+    parser.add_argument("planilha", nargs="?", help="Planilha .xlsx (padrão: a mais recente do ml.py)")
+    parser.add_argument("--endpoint", default=AFFILIATE_ENDPOINT, help="Endpoint de geração de links")
+    parser.add_argument("--cookies", help="Arquivo JSON com os cookies da conta de afiliado")
+    parser.add_argument("--perfil", help="Perfil do Chrome já logado (lido em modo headless)")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--lote", type=int, default=BATCH_SIZE, help="Links por requisição")
+    parser.add_argument("--forcar", action="store_true", help="Gera de novo links já preenchidos")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Arquivo do cache de links")
+    parser.add_argument("--sem-cache", action="store_true", help="Não usa o cache de links")
+    parser.add_argument("--ttl-dias", type=float, default=LINK_CACHE_TTL_DAYS, help="Validade dos links em cache")
+    args = parser.parse_args(argv)
+
+    path = args.planilha or find_latest_sheet()
+    if not path or not os.path.isfile(path):
+        print("❌ Planilha não encontrada. Informe o caminho do .xlsx gerado pelo ml.py.")
+        return 1
+
+    cookies = []
+    if args.cookies:
+        cookies = load_cookies_file(args.cookies)
+    elif args.perfil:
+        print("🌐 Lendo sessão do perfil do Chrome (headless)...")
+        cookies = cookies_from_browser(args.perfil)
+
+    session = create_affiliate_session(cookies, pool_size=args.workers)
+    print(f"📄 Planilha: {path}")
+
+    cache = None
+    if not args.sem_cache:
+        cache = LinkCache(args.cache, ttl=args.ttl_dias * 24 * 3600, max_entries=LINK_CACHE_MAX_ENTRIES)
+
+    try:
+        stats = process_sheet(path, session, args.endpoint, args.workers, args.lote, args.forcar, cache)
+    except AffiliateError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        if cache is not None:
+            cache.close()
+
+    done = stats["cached"] + stats["generated"]
+    print(f"\n✅ {done}/{stats['pending']} links preenchidos em {stats['seconds']:.1f}s "
+          f"({stats['cached']} do cache, {stats['generated']} gerados)")
+    if cache is not None:
+        print(f"🗃️ Cache: {cache.stats['hits']} hits, {cache.stats['misses']} misses, "
+              f"{cache.stats['expired']} expirados, {cache.stats['evicted']} removidos (LRU) — {args.cache}")
+    for error in stats["errors"]:
+        print(f"   ⚠️ {error}")
+    return 0 if not stats["errors"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,104 +1,411 @@
-import pyautogui
+# -*- coding: utf-8 -*-
+"""
+Publicação das ofertas no Telegram (substitui o loop com pyautogui + sleeps).
+
+Antes: 3 cliques em coordenadas fixas e 10 × time.sleep(60) por ciclo — uma
+publicação a cada ~10 minutos, independentemente do que havia para postar.
+Agora:
+
+    1. Lê as ofertas da planilha do ml.py/amzn.py (.xlsx, .csv, .jsonl, .parquet)
+    2. Coloca na fila persistente (SQLite) — ofertas repetidas (mesmo produto
+       e mesmo preço) são ignoradas, inclusive entre execuções
+    3. Publica respeitando os limites do Telegram (token bucket por chat e
+       global), agrupa fotos em álbuns e refaz envios com backoff
+
+Uso:
+    export TELEGRAM_BOT_TOKEN=123:ABC
+    python divulgar.py mercadolivre_products_20250101_120000.xlsx --chat @meucanal
+    python divulgar.py --chat @meucanal --continuo --intervalo 30   # relê a planilha mais recente
+    python divulgar.py planilha.xlsx --chat 1 --api-url http://127.0.0.1:8081   # stub local
+"""
+
+import argparse
+import glob
+import html
+import os
+import re
+import sys
 import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+import requests
+import schedule
+import telebot
+from telebot import apihelper
+from telebot.types import InputMediaPhoto
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.prices import parse_brl_cents
+from common.product_ids import canonical_product_id
+from common.publish_queue import DEFAULT_QUEUE_PATH, PublishQueue, TokenBucket
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+
+# Limites do Telegram: ~30 mensagens/s no total e ~20 mensagens/min por
+# grupo/canal (cada foto de um álbum conta como uma mensagem)
+GLOBAL_RATE_PER_SECOND = 30
+CHAT_RATE_PER_MINUTE = 20
+CHAT_BURST = 3
+
+ALBUM_SIZE = 1        # Ofertas por álbum (1 = uma postagem por oferta; máx. 10)
+MAX_ATTEMPTS = 5      # Tentativas por oferta antes de marcar como falha
+RETRY_BACKOFF = 5.0   # Espera base entre tentativas (dobra a cada uma)
+MIN_DISCOUNT_PCT = 0  # Publica só ofertas com desconto >= esse valor
+CAPTION_LIMIT = 1024  # Tamanho máximo da legenda de uma foto
+
+# Limitador global: compartilhado por todos os publicadores do processo
+GLOBAL_BUCKET = TokenBucket(GLOBAL_RATE_PER_SECOND, capacity=GLOBAL_RATE_PER_SECOND)
+
+# Cabeçalhos das planilhas (ml.py e amzn.py)
+TITLE_COLUMNS = ("Nome", "Title")
+PRICE_COLUMNS = ("Valor Promoção", "Preço", "Discount_Value")
+ORIGINAL_COLUMNS = ("Valor Produto", "Original_Value")
+LINK_COLUMNS = ("Link Compartilhado", "Link Afiliado", "Link")
+IMAGE_COLUMNS = ("Imagem", "Image_Card")
+
+
+# ============================================================================
+# OFERTAS
+# ============================================================================
+
+def _first(row: Dict, columns) -> Optional[str]:
+    for column in columns:
+        value = row.get(column)
+        if value is not None and not pd.isna(value) and str(value).strip() not in ("", "Not Found", "Não encontrado"):
+            return str(value).strip()
+    return None
+
+
+def _cents(value) -> Optional[int]:
+    if value is None or pd.isna(value):
+        return None
+    return int(value)
+
+
+def read_offers_file(path: str) -> pd.DataFrame:
+    """Lê a planilha exportada (formato pela extensão)"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return pd.read_csv(path, encoding="utf-8-sig", dtype=str)
+    if extension == ".jsonl":
+        return pd.read_json(path, lines=True, dtype=False)
+    if extension == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_excel(path, dtype=object)
+
+
+def load_offers(path: str, marketplace: Optional[str] = None,
+                min_discount: float = MIN_DISCOUNT_PCT) -> List[Dict]:
+    """
+    Converte as linhas da planilha em ofertas normalizadas.
+
+    Usa as colunas numéricas do ml.py ("Preço (centavos)", "Desconto %")
+    quando existem; senão interpreta os textos de preço.
+
+    Retorna:
+          Lista de ofertas: product_id, title, price_cents, original_price_cents,
+          discount_pct, installments, link, images
+    """
+    marketplace = marketplace or ("amazon" if "amazon" in os.path.basename(path).lower() else "mercadolivre")
+    offers = []
+    for row in read_offers_file(path).to_dict("records"):
+        link = _first(row, LINK_COLUMNS)
+        title = _first(row, TITLE_COLUMNS)
+        if not link or not title:
+            continue
+
+        price = _cents(row.get("Preço (centavos)")) if "Preço (centavos)" in row else None
+        if price is None:
+            price = parse_brl_cents(_first(row, PRICE_COLUMNS))
+        original = _cents(row.get("Preço Original (centavos)")) if "Preço Original (centavos)" in row else None
+        if original is None:
+            original = parse_brl_cents(_first(row, ORIGINAL_COLUMNS))
+
+        discount = None
+        if price and original and original > price:
+            discount = round((original - price) / original * 100, 1)
+        if min_discount and (discount or 0) < min_discount:
+            continue
+
+        # O ID vem do link original (o link curto de afiliado não tem o MLB)
+        product_link = _first(row, ("Link Afiliado", "Link")) or link
+        images = re.split(r"[\s;|]+", _first(row, IMAGE_COLUMNS) or "")
+        offers.append({
+            "product_id": canonical_product_id(product_link, marketplace),
+            "title": title,
+            "price_cents": price,
+            "original_price_cents": original,
+            "discount_pct": discount,
+            "installments": _first(row, ("Descrição", "Installments")),
+            "link": link,
+            "images": [i for i in images if i.startswith("http")],
+        })
+    return offers
+
+
+def offer_key(offer: Dict) -> str:
+    """Chave de duplicidade: mesmo produto com o mesmo preço não é publicado de novo"""
+    return f"{offer['product_id']}:{offer.get('price_cents')}"
+
+
+def format_brl(cents: Optional[int]) -> str:
+    """129990 → "R$ 1.299,90" """
+    if cents is None:
+        return ""
+    whole, frac = divmod(int(cents), 100)
+    return f"R$ {whole:,}".replace(",", ".") + f",{frac:02d}"
 
-# --- (IMPORTANTE!) SUAS COORDENADAS ---
 
-# 1. Posição no Excel (Canto/Célula inicial)
-# X=1279, Y=109
-pos_1_x, pos_1_y = (1279, 109)
+def format_caption(offer: Dict) -> str:
+    """Legenda HTML da oferta (respeita o limite de tamanho do Telegram)"""
+    price_line = f"<b>{format_brl(offer.get('price_cents'))}</b>" if offer.get("price_cents") else ""
+    if offer.get("discount_pct"):
+        price_line = (f"<s>{format_brl(offer['original_price_cents'])}</s> → {price_line} "
+                      f"(-{offer['discount_pct']:g}%)")
+    lines = [f"🔥 <b>{html.escape(offer['title'])}</b>"]
+    if price_line:
+        lines.append(price_line)
+    if offer.get("installments"):
+        lines.append(f"💳 {html.escape(offer['installments'])}")
+    lines.append(f"🛒 {html.escape(offer['link'])}")
+    caption = "\n".join(lines)
 
-# 6. Posição da Barra de URL do navegador
-# X=351, Y=60
-pos_2_x, pos_2_y = (351, 60)
+    if len(caption) > CAPTION_LIMIT:
+        excess = len(caption) - CAPTION_LIMIT + 1
+        short = dict(offer, title=offer["title"][:max(10, len(offer["title"]) - excess)] + "…")
+        return format_caption(short)
+    return caption
 
-# 10. Posição para estabilizar/focar na tela do ML
-# X=1312, Y=190
-pos_3_x, pos_3_y = (1312, 190) 
 
-# 11. Posição do Botão "Compartilhar"
-# X=1204, Y=110
-pos_4_x, pos_4_y = (1204, 110) 
+# ============================================================================
+# PUBLICAÇÃO
+# ============================================================================
 
-# 16. Posição do Código do Produto no ML
-# X=1208, Y=461
-pos_5_x, pos_5_y = (1208, 461)
+class TelegramPublisher:
+    """
+    Consome a fila e publica no chat, respeitando os limites do Telegram.
 
-# 11b. Posição do "Link" (após clicar em compartilhar)
-# X=1212, Y=366
-pos_6_x, pos_6_y = (1212, 366)
-# ----------------------------------------------------
+    Args:
+          bot: telebot.TeleBot
+          chat_id: Canal/grupo de destino (ex.: "@meucanal")
+          publish_queue: Fila persistente de ofertas
+          album_size: Ofertas agrupadas por álbum (1 = uma postagem por oferta)
+    """
 
+    def __init__(self, bot: telebot.TeleBot, chat_id, publish_queue: PublishQueue,
+                 album_size: int = ALBUM_SIZE, chat_rate_per_minute: float = CHAT_RATE_PER_MINUTE,
+                 max_attempts: int = MAX_ATTEMPTS, backoff: float = RETRY_BACKOFF):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.queue = publish_queue
+        self.album_size = max(1, min(10, album_size))
+        self.chat_bucket = TokenBucket(chat_rate_per_minute / 60.0, capacity=CHAT_BURST)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.blocked_until = 0.0
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "messages": 0}
 
-# --- Configuração do PyAutoGUI ---
-pyautogui.PAUSE = 0.5 
-pyautogui.FAILSAFE = True 
+    # --- Montagem das postagens ---
 
+    def _group_posts(self, items) -> List[List]:
+        """Agrupa ofertas de 1 foto em álbuns; ofertas com várias fotos viram um álbum próprio"""
+        posts, current = [], []
+        for item in items:
+            images = item[1].get("images") or []
+            if len(images) > 1 or not images or self.album_size == 1:
+                posts.append([item])
+                continue
+            current.append(item)
+            if len(current) >= self.album_size:
+                posts.append(current)
+                current = []
+        if current:
+            posts.append(current)
+        return posts
+
+    @staticmethod
+    def _message_count(post) -> int:
+        if len(post) == 1:
+            return max(1, len(post[0][1].get("images") or []))
+        return len(post)
+
+    def _send(self, post) -> None:
+        if len(post) == 1:
+            offer = post[0][1]
+            images = offer.get("images") or []
+            caption = format_caption(offer)
+            if not images:
+                self.bot.send_message(self.chat_id, caption, parse_mode="HTML")
+            elif len(images) == 1:
+                self.bot.send_photo(self.chat_id, images[0], caption=caption, parse_mode="HTML")
+            else:
+                # Álbum de uma oferta: legenda só na primeira foto
+                media = [InputMediaPhoto(images[0], caption=caption, parse_mode="HTML")]
+                media += [InputMediaPhoto(image) for image in images[1:10]]
+                self.bot.send_media_group(self.chat_id, media)
+            return
+
+        media = [InputMediaPhoto(offer["images"][0], caption=format_caption(offer), parse_mode="HTML")
+                 for _, offer, _ in post]
+        self.bot.send_media_group(self.chat_id, media)
+
+    # --- Erros ---
+
+    def _handle_error(self, post, error: Exception) -> None:
+        retry_after = None
+        permanent = False
+        if isinstance(error, apihelper.ApiTelegramException):
+            if error.error_code == 429:
+                retry_after = (error.result_json.get("parameters") or {}).get("retry_after", self.backoff)
+            elif 400 <= error.error_code < 500:
+                permanent = True
+
+        if permanent and len(post) > 1:
+            # Álbum recusado (ex.: uma foto inválida): publica as ofertas separadas
+            for item in post:
+                self._publish([item])
+            return
+
+        for key, offer, attempts in post:
+            if permanent and offer.get("images"):
+                # Foto recusada (URL inválida/expirada): tenta só com texto
+                offer["images"] = []
+                self._publish([(key, offer, attempts)])
+            elif permanent or attempts + 1 >= self.max_attempts:
+                self.queue.mark_failed(key, str(error))
+                self.stats["failed"] += 1
+                print(f"   ❌ Falha definitiva ({key}): {error}")
+            else:
+                delay = retry_after if retry_after is not None else self.backoff * (2 ** attempts)
+                self.queue.mark_retry(key, str(error), delay)
+                self.stats["retried"] += 1
+                print(f"   ⚠️ Reenvio em {delay:.0f}s ({key}): {error}")
+
+        if retry_after is not None:
+            # Flood control vale para o chat inteiro: pausa todos os envios. Só depois
+            # do mark_retry: a pausa termina quando a oferta já está liberada de novo
+            # (senão o claim seguinte pularia a oferta e quebraria a ordem)
+            self.blocked_until = time.monotonic() + retry_after
+
+    def _publish(self, post) -> None:
+        """Envia uma postagem (aguardando os limitadores) e atualiza a fila"""
+        messages = self._message_count(post)
+        self.chat_bucket.acquire(messages)
+        GLOBAL_BUCKET.acquire(messages)
+        try:
+            self._send(post)
+        except (apihelper.ApiException, requests.RequestException) as e:
+            self._handle_error(post, e)
+        else:
+            for key, _, _ in post:
+                self.queue.mark_sent(key)
+            self.stats["sent"] += len(post)
+            self.stats["messages"] += messages
+
+    # --- Loop ---
+
+    def publish_pending(self, limit: Optional[int] = None) -> int:
+        """
+        Publica o que estiver pronto na fila (até `limit` ofertas).
+
+        Retorna:
+              Ofertas publicadas nesta chamada
+        """
+        sent_before = self.stats["sent"]
+        processed = 0
+        while limit is None or processed < limit:
+            pause = self.blocked_until - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+
+            batch = self.queue.claim(min(10, limit - processed) if limit else 10)
+            if not batch:
+                break
+            for post in self._group_posts(batch):
+                self._publish(post)
+                processed += len(post)
+                if self.blocked_until > time.monotonic():
+                    break # Refaz o claim depois da pausa (a ordem é preservada)
+        return self.stats["sent"] - sent_before
+
+
+def find_latest_sheet() -> Optional[str]:
+    """Planilha mais recente gerada pelos scrapers no diretório atual"""
+    files = [f for pattern in ("mercadolivre_products_*.*", "ofertas_amazon*.*") for f in glob.glob(pattern)]
+    files = [f for f in files if os.path.splitext(f)[1].lower() in (".xlsx", ".csv", ".jsonl", ".parquet")]
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def enqueue_file(publish_queue: PublishQueue, path: Optional[str], min_discount: float = MIN_DISCOUNT_PCT) -> int:
+    """Lê a planilha e coloca as ofertas novas na fila. Retorna quantas entraram"""
+    path = path or find_latest_sheet()
+    if not path:
+        print("⚠️ Nenhuma planilha de ofertas encontrada.")
+        return 0
+    offers = load_offers(path, min_discount=min_discount)
+    added = publish_queue.enqueue((offer_key(o), o) for o in offers if o["product_id"])
+    print(f"📥 {path}: {len(offers)} ofertas, {added} novas na fila ({len(offers) - added} repetidas)")
+    return added
+
+
+# ============================================================================
+# PONTO DE ENTRADA
+# ============================================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Publica as ofertas coletadas no Telegram")
+    parser.add_argument("planilha", nargs="?", help="Planilha de ofertas (padrão: a mais recente)")
+    parser.add_argument("--chat", required=True, help="Chat/canal de destino (ex.: @meucanal)")
+    parser.add_argument("--token", default=os.environ.get("TELEGRAM_BOT_TOKEN"), help="Token do bot")
+    parser.add_argument("--fila", default=DEFAULT_QUEUE_PATH, help="Arquivo da fila persistente")
+    parser.add_argument("--min-desconto", type=float, default=MIN_DISCOUNT_PCT)
+    parser.add_argument("--album", type=int, default=ALBUM_SIZE, help="Ofertas por álbum (1-10)")
+    parser.add_argument("--limite", type=int, help="Máximo de ofertas publicadas nesta execução")
+    parser.add_argument("--continuo", action="store_true", help="Fica rodando e relê a planilha periodicamente")
+    parser.add_argument("--intervalo", type=int, default=30, help="Minutos entre leituras (modo contínuo)")
+    parser.add_argument("--api-url", default=os.environ.get("TELEGRAM_API_URL"),
+                        help="Servidor da Bot API (ex.: stub local)")
+    args = parser.parse_args(argv)
+
+    if not args.token:
+        print("❌ Informe o token do bot (--token ou TELEGRAM_BOT_TOKEN).")
+        return 1
+    if args.api_url:
+        apihelper.API_URL = args.api_url.rstrip("/") + "/bot{0}/{1}"
+
+    bot = telebot.TeleBot(args.token, threaded=False)
+    publish_queue = PublishQueue(args.fila)
+    publisher = TelegramPublisher(bot, args.chat, publish_queue, album_size=args.album)
 
-# --- Início do Script ---
-while True:
     try:
-        total_loops = int(input("Quantas vezes você quer que o loop se repita? "))
-        if total_loops > 0:
-            break
+        enqueue_file(publish_queue, args.planilha, args.min_desconto)
+        if args.continuo:
+            schedule.every(args.intervalo).minutes.do(enqueue_file, publish_queue, args.planilha, args.min_desconto)
+            print(f"🔁 Modo contínuo: nova leitura a cada {args.intervalo} min (Ctrl+C para sair)")
+            while True:
+                schedule.run_pending()
+                publisher.publish_pending()
+                ready_in = publish_queue.next_ready_in()
+                next_read = max(0.0, schedule.idle_seconds() or 0.0)
+                time.sleep(min(60.0, next_read, ready_in if ready_in is not None else 60.0))
         else:
-            print("Por favor, insira um número maior que zero.")
-    except ValueError:
-        print("Entrada inválida. Por favor, digite apenas um número.")
-
-print(f"\nAutomação iniciando... O script rodará {total_loops} vez(es).")
-print("Você tem 5 segundos para focar na janela correta (Alt+Tab).")
-print("!!! LEMBRE-SE: Mova o mouse para o canto superior esquerdo para PARAR FORÇADAMENTE !!!")
-
-time.sleep(9) # <--- Tempo de 9s mantido
-print("Iniciando!")
-
-
-# --- O Loop Principal ---
-try:
-    for i in range(total_loops):
-        loop_atual = i + 1
-        print(f"\n--- Iniciando Loop {loop_atual} de {total_loops} ---")
-
-        # 1. clique no canto superior excel (X=1279, Y=109)
-        print(f"Loop {loop_atual}: 1. Clicando em Posição 1 (Excel) ({pos_1_x}, {pos_1_y})")
-        pyautogui.click(811, 547)
-        print('click retornar bot')
-        time.sleep(5) # Pequena pausa antes do próximo loop
-
-        pyautogui.click(116,53)
-        print('Atualizar tela')
-        time.sleep(10) # Pequena pausa antes do próximo loop
-
-        pyautogui.click(803,625)
-        print('Pausar bot')
-        time.sleep(60) # Pequena pausa antes do próximo loop
-        print('Atualizar Pagina')
-        time.sleep(60)
-        print('1 minuto')
-        time.sleep(60)
-        print('2 minuto')
-        time.sleep(60)
-        print('3 minuto')
-        time.sleep(60)
-        print('4 minuto')
-        time.sleep(60)
-        print('5 minuto')
-        time.sleep(60)
-        print('6 minuto')
-        time.sleep(60)
-        print('7 minuto')
-        time.sleep(60)
-        print('8 minutos')
-        time.sleep(60)
-        print('9 minutos')
-
-
-        print(f"--- Loop {loop_atual} Concluído ---")
-        time.sleep(5) # Pequena pausa antes do próximo loop
-
-    print("\n\KAutomação Concluída! Todos os loops foram executados.")
-
-except KeyboardInterrupt:
-    print("\n\nPROGRAMA INTERROMPIDO MANUALMENTE (Ctrl+C).")
-except pyautogui.FailSafeException:
-    print("\n\nPROGRAMA INTERROMPIDO (FAILSAFE)! O mouse foi movido para o canto.")
\ No newline at end of file
+            publisher.publish_pending(args.limite)
+
+    except KeyboardInterrupt:
+        print("\n⚠️ Interrompido pelo usuário (a fila continua salva).")
+
+    finally:
+        counts = publish_queue.counts()
+        publish_queue.close()
+
+    print(f"\n📊 Publicadas: {publisher.stats['sent']} | reenvios: {publisher.stats['retried']} | "
+          f"falhas: {publisher.stats['failed']}")
+    print(f"🗃️ Fila: {counts['pending']} pendentes, {counts['sent']} publicadas, {counts['failed']} com falha")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Serviço de afiliados falso (local) para testar o app.py sem conta real.
+
+Responde no mesmo formato esperado pelo gerador:
+    POST /links  {"urls": [...]}  →  {"urls": [{"origin_url": ..., "short_url": ...}]}
+
+Uso:
+    python stub_afiliados.py --porta 8765 --latencia 0.2
+    python app.py planilha.xlsx --endpoint http://127.0.0.1:8765/links
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_short_url(url: str) -> str:
+    """Link curto determinístico para a URL (mesma entrada → mesmo link)"""
+    return "https://mercadolivre.com/sec/" + hashlib.sha1(url.encode("utf-8")).hexdigest()[:8]
+
+
+def create_stub_server(port: int = 0, latency: float = 0.0, fail_every: int = 0) -> ThreadingHTTPServer:
+    """
+    Cria o servidor (porta 0 = livre). Use `server.server_address[1]` para a porta.
+
+    Args:
+          latency: Atraso por requisição (s), simulando o serviço real
+          fail_every: Responde HTTP 503 a cada N requisições (testa retentativas)
+    """
+    counter = {"requests": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            with lock:
+                counter["requests"] += 1
+                current = counter["requests"]
+            if latency:
+                time.sleep(latency)
+            if fail_every and current % fail_every == 0:
+                self.send_response(503)
+                self.end_headers()
+                return
+
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                urls = json.loads(self.rfile.read(length) or b"{}").get("urls", [])
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                return
+
+            body = json.dumps({
+                "urls": [{"origin_url": u, "short_url": fake_short_url(u)} for u in urls]
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.requests = counter
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço de afiliados falso para testes locais")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.0)
+    parser.add_argument("--falhar-a-cada", type=int, default=0)
+    args = parser.parse_args()
+
+    server = create_stub_server(args.porta, args.latencia, args.falhar_a_cada)
+    print(f"🧪 Stub de afiliados em http://127.0.0.1:{args.porta}/links (Ctrl+C para sair)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
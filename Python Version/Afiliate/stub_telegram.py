@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Bot API do Telegram falsa (local) para testar o divulgar.py sem bot real.
+
+Implementa getMe, sendMessage, sendPhoto e sendMediaGroup, guarda o que foi
+"publicado" em `server.sent` e pode simular flood control (HTTP 429 com
+retry_after) e fotos recusadas (HTTP 400).
+
+Uso:
+    python stub_telegram.py --porta 8081 --limitar-a-cada 5
+    python divulgar.py planilha.xlsx --chat 1 --token 1:TESTE --api-url http://127.0.0.1:8081
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_PATH = re.compile(r"^/bot(?P<token>[^/]+)/(?P<method>\w+)$")
+
+
+def create_stub_server(port: int = 0, rate_limit_every: int = 0, retry_after: int = 1,
+                       reject_photo: str = "") -> ThreadingHTTPServer:
+    """
+    Cria o servidor (porta 0 = livre). Use `server.server_address[1]` para a porta.
+
+    Args:
+          rate_limit_every: Responde 429 a cada N envios (0 = nunca)
+          retry_after: Segundos informados no 429
+          reject_photo: Recusa (400) fotos cuja URL contém esse trecho
+    """
+    state = {"requests": 0, "message_id": 0}
+    sent = []
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: dict) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _error(self, status: int, description: str, **parameters) -> None:
+            body = {"ok": False, "error_code": status, "description": description}
+            if parameters:
+                body["parameters"] = parameters
+            self._reply(status, body)
+
+        def _params(self) -> dict:
+            params = {k: v[-1] for k, v in parse_qs(urlparse(self.path).query).items()}
+            length = int(self.headers.get("Content-Length") or 0)
+            if length and "application/x-www-form-urlencoded" in (self.headers.get("Content-Type") or ""):
+                params.update({k: v[-1] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()})
+            return params
+
+        def _photo(self, url) -> list:
+            return [{"file_id": url, "file_unique_id": str(abs(hash(url))), "width": 800, "height": 800}]
+
+        def _message(self, chat_id, **fields) -> dict:
+            with lock:
+                state["message_id"] += 1
+                message = {"message_id": state["message_id"], "date": int(time.time()),
+                           "chat": {"id": 1, "type": "channel", "title": str(chat_id)}, **fields}
+            return message
+
+        def _handle(self) -> None:
+            match = _PATH.match(urlparse(self.path).path)
+            if not match:
+                return self._error(404, "Not Found")
+            method, params = match.group("method"), self._params()
+
+            if method == "getMe":
+                return self._reply(200, {"ok": True, "result": {
+                    "id": 1, "is_bot": True, "first_name": "Stub", "username": "stub_bot"}})
+
+            if method not in ("sendMessage", "sendPhoto", "sendMediaGroup"):
+                return self._error(404, f"Not Found: method {method}")
+
+            with lock:
+                state["requests"] += 1
+                limited = rate_limit_every and state["requests"] % rate_limit_every == 0
+            if limited:
+                return self._error(429, f"Too Many Requests: retry after {retry_after}", retry_after=retry_after)
+
+            chat_id = params.get("chat_id")
+            if method == "sendMediaGroup":
+                media = json.loads(params.get("media", "[]"))
+                if reject_photo and any(reject_photo in m.get("media", "") for m in media):
+                    return self._error(400, "Bad Request: wrong file identifier/HTTP URL specified")
+                messages = [self._message(chat_id, photo=self._photo(m.get("media")),
+                                          caption=m.get("caption")) for m in media]
+                sent.append({"method": method, "chat_id": chat_id, "media": media})
+                return self._reply(200, {"ok": True, "result": messages})
+
+            if method == "sendPhoto":
+                if reject_photo and reject_photo in params.get("photo", ""):
+                    return self._error(400, "Bad Request: wrong file identifier/HTTP URL specified")
+                message = self._message(chat_id, photo=self._photo(params.get("photo")),
+                                        caption=params.get("caption"))
+            else:
+                message = self._message(chat_id, text=params.get("text"))
+            sent.append({"method": method, "chat_id": chat_id, **params})
+            return self._reply(200, {"ok": True, "result": message})
+
+        do_GET = _handle
+        do_POST = _handle
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.sent = sent
+    server.state = state
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bot API do Telegram falsa para testes locais")
+    parser.add_argument("--porta", type=int, default=8081)
+    parser.add_argument("--limitar-a-cada", type=int, default=0, help="Responde 429 a cada N envios")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--recusar-foto", default="", help="Recusa fotos cuja URL contém esse trecho")
+    args = parser.parse_args()
+
+    server = create_stub_server(args.porta, args.limitar_a_cada, args.retry_after, args.recusar_foto)
+    print(f"🧪 Bot API falsa em http://127.0.0.1:{args.porta} (Ctrl+C para sair)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
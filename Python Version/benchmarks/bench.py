@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark offline dos scrapers sobre páginas gravadas (benchmarks/fixtures).
+
+As páginas são servidas por um servidor HTTP local, então o resultado não
+depende da rede nem de mudanças no site. Cada backend mede, por repetição:
+
+    driver_startup  → criação do Chrome (backends de navegador)
+    page_load       → driver.get / GET HTTP
+    scroll          → carregamento por scroll
+    extract         → extração dos cards (per_card_ms = extract / produtos)
+    end-to-end      → tempo total e produtos/s
+
+O resultado é um JSON (benchmarks/resultados/<commit>.json) para comparar
+commits. Backends de navegador são marcados como "skipped" sem Chrome.
+
+Uso:
+    python benchmarks/bench.py                                  # todos os backends
+    python benchmarks/bench.py --backends ml_parse,ml_http --repeticoes 10
+    python benchmarks/bench.py --comparar benchmarks/resultados/abc1234.json
+    python benchmarks/bench.py --gravar mercadolivre=https://www.mercadolivre.com.br/ofertas
+    python benchmarks/bench.py --gravar amazon=https://www.amazon.com.br/s?k=fone --navegador
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "findML"))
+sys.path.insert(0, os.path.join(ROOT, "findAmzn"))
+
+import amzn
+import ml
+from selenium.webdriver.support.ui import WebDriverWait
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados")
+SCHEMA_VERSION = 1
+
+# Página gravada + seletor do card (o mesmo usado pelo scraper)
+FIXTURES = {
+    "mercadolivre": {"file": "mercadolivre_ofertas.html", "card": ml.Selectors.PRODUCT_BLOCK[1]},
+    "amazon": {"file": "amazon_busca.html", "card": amzn.Seletores.BLOCO_PRODUTO_CSS},
+}
+
+METRICS = ("seconds", "products_per_s", "driver_startup_s", "page_load_s", "scroll_s", "extract_s", "per_card_ms")
+
+
+# =====================================================================
+# SERVIDOR DAS PÁGINAS GRAVADAS
+# =====================================================================
+
+class FixtureServer:
+    """Serve benchmarks/fixtures em 127.0.0.1 (porta livre), com latência opcional"""
+
+    def __init__(self, directory: str = FIXTURES_DIR, latency_ms: float = 0.0):
+        latency = latency_ms / 1000.0
+
+        class Handler(SimpleHTTPRequestHandler):
+            def do_GET(self):
+                if latency:
+                    time.sleep(latency)
+                super().do_GET()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), partial(Handler, directory=directory))
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-server", daemon=True)
+
+    def __enter__(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def url(self, fixture: str) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/{FIXTURES[fixture]['file']}"
+
+
+def fixture_info(name: str) -> Dict:
+    """Arquivo, hash e nº de cards da página gravada (para saber se dois resultados são comparáveis)"""
+    import lxml.html
+
+    path = os.path.join(FIXTURES_DIR, FIXTURES[name]["file"])
+    with open(path, "rb") as f:
+        content = f.read()
+    cards = len(lxml.html.fromstring(content).cssselect(FIXTURES[name]["card"]))
+    return {
+        "file": FIXTURES[name]["file"],
+        "sha256": hashlib.sha256(content).hexdigest()[:16],
+        "bytes": len(content),
+        "cards": cards,
+    }
+
+
+# =====================================================================
+# MEDIÇÃO
+# =====================================================================
+
+class PhaseTimer:
+    """Acumula o tempo das chamadas embrulhadas, por fase"""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+    def wrap(self, phase: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(phase, time.perf_counter() - start)
+        return timed
+
+    @contextlib.contextmanager
+    def patch(self, owner, name: str, phase: str):
+        """Troca `owner.name` pela versão cronometrada enquanto o bloco roda"""
+        original = getattr(owner, name)
+        setattr(owner, name, self.wrap(phase, original))
+        try:
+            yield
+        finally:
+            setattr(owner, name, original)
+
+
+class BackendUnavailable(RuntimeError):
+    """O backend não pode rodar neste ambiente (ex.: sem Chrome)"""
+
+
+# Registro de backends: nome → (função, fixture, usa navegador)
+BACKENDS: Dict[str, Dict] = {}
+
+
+def backend(name: str, fixture: str, browser: bool = False):
+    """
+    Registra um backend. A função recebe (url, timer) e devolve a lista de
+    produtos; as fases são registradas no timer.
+    """
+    def register(func: Callable) -> Callable:
+        BACKENDS[name] = {"run": func, "fixture": fixture, "browser": browser, "doc": (func.__doc__ or "").strip()}
+        return func
+    return register
+
+
+def start_driver(factory: Callable, timer: PhaseTimer):
+    try:
+        return timer.wrap("driver_startup", factory)()
+    except Exception as e:
+        raise BackendUnavailable(f"navegador indisponível: {str(e).splitlines()[0] if str(e) else type(e).__name__}")
+
+
+@backend("ml_parse", "mercadolivre")
+def bench_ml_parse(url: str, timer: PhaseTimer) -> List[Dict]:
+    """Mercado Livre: só o parse do HTML (lxml), sem rede"""
+    with open(os.path.join(FIXTURES_DIR, FIXTURES["mercadolivre"]["file"]), encoding="utf-8") as f:
+        html = f.read()
+    return timer.wrap("extract", ml.parse_listing_html)(html, url)
+
+
+@backend("ml_http", "mercadolivre")
+def bench_ml_http(url: str, timer: PhaseTimer) -> List[Dict]:
+    """Mercado Livre: collect_mercadolivre_static (GET + parse)"""
+    session = ml.create_http_session()
+    session.get = timer.wrap("page_load", session.get)
+    with timer.patch(ml, "parse_listing_page", "extract"):
+        return ml.collect_mercadolivre_static(url, session)
+
+
+@backend("ml_selenium", "mercadolivre", browser=True)
+def bench_ml_selenium(url: str, timer: PhaseTimer) -> List[Dict]:
+    """Mercado Livre: collect_mercadolivre_data (Chrome, extração em lote)"""
+    driver = start_driver(ml.initialize_driver, timer)
+    try:
+        driver.get = timer.wrap("page_load", driver.get)
+        # Sem pop-up de cookies na página gravada: espera curta para não somar 15s
+        wait, wait_short = WebDriverWait(driver, ml.WAIT_TIME), WebDriverWait(driver, 1)
+        with timer.patch(ml, "scroll_page", "scroll"), \
+                timer.patch(ml, "extract_cards_bulk", "extract"), \
+                timer.patch(ml, "extract_card_fields", "extract"):
+            return ml.collect_mercadolivre_data(driver, wait, wait_short, url)
+    finally:
+        driver.quit()
+
+
+@backend("amzn_selenium", "amazon", browser=True)
+def bench_amzn_selenium(url: str, timer: PhaseTimer) -> List[Dict]:
+    """Amazon: coletar_dados (Chrome, extração por bloco)"""
+    driver = start_driver(amzn.iniciar_driver, timer)
+    try:
+        driver.get = timer.wrap("page_load", driver.get)
+        start = time.perf_counter()
+        with timer.patch(amzn, "scroll_and_wait", "scroll"):
+            products = amzn.coletar_dados(url, limite=fixture_info("amazon")["cards"], driver=driver)
+        # A extração é intercalada com o scroll: fica com o restante do tempo
+        elapsed = time.perf_counter() - start
+        timer.add("extract", elapsed - timer.seconds.get("page_load", 0.0) - timer.seconds.get("scroll", 0.0))
+        return products
+    finally:
+        driver.quit()
+
+
+def run_once(name: str, url: str, quiet: bool = True) -> Dict:
+    """Uma repetição de um backend → métricas da execução"""
+    timer = PhaseTimer()
+    output = io.StringIO() if quiet else sys.stdout
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        products = BACKENDS[name]["run"](url, timer)
+    seconds = time.perf_counter() - start
+
+    count = len(products)
+    run = {"products": count, "seconds": seconds, "products_per_s": count / seconds if seconds else None}
+    for phase in ("driver_startup", "page_load", "scroll", "extract"):
+        run[f"{phase}_s"] = timer.seconds.get(phase)
+    run["per_card_ms"] = run["extract_s"] * 1000 / count if count and run["extract_s"] is not None else None
+    return run
+
+
+def summarize(runs: List[Dict]) -> Dict:
+    """Mediana, mínimo e máximo de cada métrica entre as repetições"""
+    summary = {"products": runs[0]["products"] if runs else 0}
+    for metric in METRICS:
+        values = [r[metric] for r in runs if r.get(metric) is not None]
+        if values:
+            summary[metric] = {
+                "median": statistics.median(values),
+                "min": min(values),
+                "max": max(values),
+            }
+    return summary
+
+
+def run_backend(name: str, server: FixtureServer, repeat: int, warmup: int, quiet: bool = True) -> Dict:
+    """
+    Roda `warmup` + `repeat` vezes (backends de navegador não aquecem: cada
+    repetição já inclui a criação do Chrome).
+
+    Retorna:
+          {"status": "ok" | "skipped" | "error", "runs", "summary"} ou com "reason"
+    """
+    spec = BACKENDS[name]
+    url = server.url(spec["fixture"])
+    try:
+        for _ in range(0 if spec["browser"] else warmup):
+            run_once(name, url, quiet)
+        runs = [run_once(name, url, quiet) for _ in range(repeat)]
+    except BackendUnavailable as e:
+        return {"status": "skipped", "reason": str(e)}
+    except Exception as e:
+        return {"status": "error", "reason": f"{type(e).__name__}: {e}"}
+
+    if not runs[0]["products"]:
+        return {"status": "error", "reason": "nenhum produto extraído da página gravada", "runs": runs}
+    return {"status": "ok", "fixture": spec["fixture"], "runs": runs, "summary": summarize(runs)}
+
+
+# =====================================================================
+# RESULTADO E COMPARAÇÃO
+# =====================================================================
+
+def git_revision() -> Dict:
+    """Commit atual e se há alterações não commitadas"""
+    def git(*args) -> Optional[str]:
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True,
+                                  timeout=30, check=True).stdout.strip()
+        except Exception:
+            return None
+
+    commit = git("rev-parse", "HEAD")
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {"commit": commit, "dirty": bool(status) if status is not None else None}
+
+
+def run_benchmarks(names: List[str], repeat: int = 5, warmup: int = 1, latency_ms: float = 0.0,
+                   quiet: bool = True) -> Dict:
+    """Roda os backends e monta o documento de resultado (JSON)"""
+    result = {
+        "schema": SCHEMA_VERSION,
+        **git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "latency_ms": latency_ms,
+        "fixtures": {name: fixture_info(name) for name in FIXTURES},
+        "backends": {},
+    }
+    with FixtureServer(latency_ms=latency_ms) as server:
+        for name in names:
+            print(f"⏱️ {name}...", flush=True)
+            result["backends"][name] = outcome = run_backend(name, server, repeat, warmup, quiet)
+            print(f"   {format_outcome(outcome)}")
+    return result
+
+
+def format_outcome(outcome: Dict) -> str:
+    if outcome["status"] != "ok":
+        return f"{'⏭️' if outcome['status'] == 'skipped' else '❌'} {outcome['status']}: {outcome['reason']}"
+    s = outcome["summary"]
+    parts = [f"✅ {s['products']} produtos", f"{s['products_per_s']['median']:.0f} produtos/s",
+             f"total {s['seconds']['median'] * 1000:.1f} ms"]
+    for metric, label in (("driver_startup_s", "driver"), ("page_load_s", "load"), ("scroll_s", "scroll")):
+        if metric in s:
+            parts.append(f"{label} {s[metric]['median'] * 1000:.1f} ms")
+    if "per_card_ms" in s:
+        parts.append(f"{s['per_card_ms']['median']:.3f} ms/card")
+    return " | ".join(parts)
+
+
+def compare_results(base: Dict, current: Dict, tolerance_pct: float = 10.0) -> List[Dict]:
+    """
+    Compara a mediana de produtos/s de cada backend presente (ok) nos dois resultados.
+
+    Retorna:
+          Uma linha por backend: base, atual, variação % e se é regressão
+          (queda maior que `tolerance_pct`)
+    """
+    rows = []
+    for name, outcome in current["backends"].items():
+        before = base.get("backends", {}).get(name)
+        if outcome["status"] != "ok" or not before or before.get("status") != "ok":
+            continue
+        old = before["summary"]["products_per_s"]["median"]
+        new = outcome["summary"]["products_per_s"]["median"]
+        change = (new - old) / old * 100 if old else 0.0
+        same_fixture = base.get("fixtures", {}).get(outcome["fixture"], {}).get("sha256") == \
+            current["fixtures"][outcome["fixture"]]["sha256"]
+        rows.append({
+            "backend": name, "base": old, "current": new, "change_pct": change,
+            "regression": change < -tolerance_pct, "same_fixture": same_fixture,
+        })
+    return rows
+
+
+# =====================================================================
+# GRAVAÇÃO DE NOVAS PÁGINAS
+# =====================================================================
+
+def record_fixture(name: str, url: str, browser: bool = False) -> str:
+    """
+    Grava a página real como fixture (substitui a atual).
+
+    Com `browser`, usa o Chrome (páginas que exigem JavaScript ou bloqueiam
+    clientes HTTP, como a busca da Amazon) e rola algumas vezes antes de salvar.
+
+    Levanta:
+          ValueError: Se a página não tiver nenhum card com o seletor do scraper
+    """
+    import lxml.html
+    from common.scroll_loader import scroll_and_wait
+
+    card = FIXTURES[name]["card"]
+    if browser:
+        driver = amzn.iniciar_driver()
+        try:
+            driver.get(url)
+            for _ in range(3):
+                scroll_and_wait(driver, card, scroll_by=1500)
+            html = driver.page_source
+        finally:
+            driver.quit()
+    else:
+        response = ml.create_http_session().get(url, timeout=ml.HTTP_TIMEOUT)
+        response.raise_for_status()
+        html = response.text
+
+    cards = len(lxml.html.fromstring(html).cssselect(card))
+    if not cards:
+        raise ValueError(f"nenhum card ({card}) na página gravada de {url}")
+
+    path = os.path.join(FIXTURES_DIR, FIXTURES[name]["file"])
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html)
+    print(f"💾 {name}: {cards} cards gravados em {path}")
+    return path
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark offline dos scrapers (páginas gravadas)")
+    parser.add_argument("--backends", help=f"Lista separada por vírgula (padrão: todos: {', '.join(BACKENDS)})")
+    parser.add_argument("--repeticoes", type=int, default=5, help="Repetições medidas por backend")
+    parser.add_argument("--aquecimento", type=int, default=1, help="Execuções descartadas (backends sem navegador)")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Latência artificial do servidor (ms)")
+    parser.add_argument("--saida", help="Arquivo JSON (padrão: benchmarks/resultados/<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de um commit anterior para comparar")
+    parser.add_argument("--tolerancia", type=float, default=10.0, help="Queda de produtos/s tolerada (%%)")
+    parser.add_argument("--gravar", action="append", default=[], metavar="FIXTURE=URL",
+                        help=f"Grava uma página real como fixture ({', '.join(FIXTURES)})")
+    parser.add_argument("--navegador", action="store_true", help="Grava usando o Chrome")
+    parser.add_argument("--verbose", action="store_true", help="Mostra a saída dos scrapers")
+    args = parser.parse_args(argv)
+
+    if args.gravar:
+        for item in args.gravar:
+            name, _, url = item.partition("=")
+            if name not in FIXTURES or not url:
+                parser.error(f"--gravar espera FIXTURE=URL com FIXTURE em: {', '.join(FIXTURES)}")
+            record_fixture(name, url, browser=args.navegador)
+        return 0
+
+    names = [n.strip() for n in args.backends.split(",")] if args.backends else list(BACKENDS)
+    unknown = [n for n in names if n not in BACKENDS]
+    if unknown:
+        parser.error(f"backend(s) desconhecido(s): {', '.join(unknown)} (disponíveis: {', '.join(BACKENDS)})")
+
+    result = run_benchmarks(names, args.repeticoes, args.aquecimento, args.latencia, quiet=not args.verbose)
+
+    output = args.saida or os.path.join(RESULTS_DIR, f"{(result['commit'] or 'local')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"💾 Resultado: {output}")
+
+    if not args.comparar:
+        return 0
+    with open(args.comparar, encoding="utf-8") as f:
+        base = json.load(f)
+    print(f"\n📊 Comparação com {(base.get('commit') or '?')[:12]} (produtos/s, mediana)")
+    regressions = 0
+    for row in compare_results(base, result, args.tolerancia):
+        flag = "🔴" if row["regression"] else "🟢"
+        note = "" if row["same_fixture"] else " (fixture diferente)"
+        print(f"   {flag} {row['backend']}: {row['base']:.0f} → {row['current']:.0f} ({row['change_pct']:+.1f}%){note}")
+        regressions += row["regression"]
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,3 @@
+"""
+Módulos compartilhados entre os scrapers (findML, findAmzn) e o Afiliate.
+"""
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+API HTTP somente leitura sobre o catálogo coletado (Flask).
+
+    GET /health                 → tamanho e idade do índice
+    GET /products               → filtros, ordenação e paginação por cursor
+    GET /products/<product_id>  → produto + histórico de preços
+
+Filtros de /products:
+    marketplace=mercadolivre|amazon   min_price / max_price (R$)
+    min_discount (%)   q (palavras do título)   sort=price|discount|last_seen|title
+    order=asc|desc     limit (1-200)            cursor (next_cursor da página anterior)
+
+As consultas de lista são respondidas pelo índice em memória (common.catalog);
+só o detalhe do produto consulta o banco.
+"""
+
+import time
+from datetime import datetime
+from typing import Optional
+
+from flask import Flask, jsonify, request
+from flask_cors import CORS
+
+from common.catalog import CatalogQueryError, CatalogService
+from common.store import DEFAULT_DB_PATH, ProductStore
+
+PRODUCT_FIELDS = (
+    "product_id", "marketplace", "title", "link", "image_url",
+    "price_cents", "original_price_cents", "discount_pct", "first_seen", "last_seen",
+)
+
+
+def _serialize(product: dict) -> dict:
+    data = {k: product.get(k) for k in PRODUCT_FIELDS}
+    for key in ("first_seen", "last_seen"):
+        if isinstance(data[key], datetime):
+            data[key] = data[key].isoformat()
+    return data
+
+
+def _reais_to_cents(name: str) -> Optional[int]:
+    value = request.args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return int(round(float(value.replace(",", ".")) * 100))
+    except ValueError:
+        raise CatalogQueryError(f"{name} deve ser um número (em reais)")
+
+
+def _float_arg(name: str) -> Optional[float]:
+    value = request.args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return float(value.replace(",", "."))
+    except ValueError:
+        raise CatalogQueryError(f"{name} deve ser um número")
+
+
+def create_app(db_path: str = DEFAULT_DB_PATH, poll_interval: float = 5.0, watch: bool = True) -> Flask:
+    """
+    Cria a aplicação.
+
+    Args:
+          db_path: Banco SQLite gravado pelos scrapers
+          poll_interval: Intervalo (s) para verificar se uma coleta terminou
+          watch: Remonta o índice automaticamente após novas coletas
+    """
+    app = Flask(__name__)
+    app.json.ensure_ascii = False
+    app.json.sort_keys = False
+    CORS(app, methods=["GET"])
+
+    store = ProductStore(db_path)
+    service = CatalogService(store, poll_interval)
+    if watch:
+        service.start()
+    app.config["CATALOG_SERVICE"] = service
+
+    @app.errorhandler(CatalogQueryError)
+    def bad_request(error):
+        return jsonify({"error": str(error)}), 400
+
+    @app.get("/health")
+    def health():
+        index = service.index
+        return jsonify({
+            "products": len(index),
+            "marketplaces": index.marketplaces,
+            "built_at": datetime.fromtimestamp(index.built_at).isoformat(timespec="seconds"),
+            "build_ms": round(index.build_seconds * 1000, 1),
+        })
+
+    @app.get("/products")
+    def list_products():
+        start = time.perf_counter()
+        try:
+            limit = int(request.args.get("limit", 50))
+        except ValueError:
+            raise CatalogQueryError("limit deve ser um inteiro")
+        result = service.index.query(
+            marketplace=request.args.get("marketplace") or None,
+            min_price=_reais_to_cents("min_price"),
+            max_price=_reais_to_cents("max_price"),
+            min_discount=_float_arg("min_discount"),
+            keyword=request.args.get("q") or None,
+            sort=request.args.get("sort", "price"),
+            order=request.args.get("order", "asc"),
+            limit=limit,
+            cursor=request.args.get("cursor") or None,
+        )
+        return jsonify({
+            "items": [_serialize(p) for p in result["items"]],
+            "total": result["total"],
+            "next_cursor": result["next_cursor"],
+            "took_ms": round((time.perf_counter() - start) * 1000, 2),
+        })
+
+    @app.get("/products/<product_id>")
+    def get_product(product_id: str):
+        product = service.index.get(product_id) or store.get_product(product_id)
+        if product is None:
+            return jsonify({"error": "produto não encontrado"}), 404
+        history = [
+            {"observed_at": h["observed_at"].isoformat(), "price_cents": h["price_cents"],
+             "original_price_cents": h["original_price_cents"]}
+            for h in store.price_history(product_id)
+        ]
+        return jsonify({**_serialize(product), "price_history": history})
+
+    return app
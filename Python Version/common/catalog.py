@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+Índice em memória do catálogo coletado, para consultas de baixa latência.
+
+Montado uma vez a partir do ProductStore (e remontado quando termina uma
+nova coleta). Cada consulta só faz operações vetorizadas (NumPy) sobre
+arrays já prontos:
+
+    • colunas numéricas (preço, desconto, marketplace, last_seen)
+    • ordens pré-calculadas por campo (asc/desc, ausentes sempre no fim)
+    • índice invertido token → posições (tokens de common.matching)
+
+Paginação por cursor: o cursor guarda o último produto entregue (valor do
+campo e product_id, que desempata as ordens), então continua funcionando
+mesmo se o índice for remontado entre duas páginas.
+"""
+
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from common.matching import normalize_title
+
+SORT_FIELDS = ("price", "discount", "last_seen", "title")
+MAX_LIMIT = 200
+
+
+class CatalogQueryError(ValueError):
+    """Parâmetro de consulta inválido"""
+
+
+def encode_cursor(product_id: str, value) -> str:
+    raw = json.dumps({"id": product_id, "v": value}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if not isinstance(data, dict) or "id" not in data:
+            raise ValueError
+        return data
+    except ValueError as e:
+        raise CatalogQueryError("cursor inválido") from e
+
+
+class CatalogIndex:
+    """Snapshot imutável do catálogo (troque a instância inteira para atualizar)"""
+
+    def __init__(self, products: List[Dict]):
+        start = time.perf_counter()
+        self.products = products
+        n = len(products)
+        self.id_to_pos = {p["product_id"]: i for i, p in enumerate(products)}
+
+        self.marketplaces = sorted({p["marketplace"] for p in products})
+        codes = {m: i for i, m in enumerate(self.marketplaces)}
+        self.marketplace = np.array([codes[p["marketplace"]] for p in products], dtype=np.int16)
+
+        price = np.array([p.get("price_cents") if p.get("price_cents") is not None else np.nan
+                          for p in products], dtype=np.float64)
+        original = np.array([p.get("original_price_cents") if p.get("original_price_cents") is not None else np.nan
+                             for p in products], dtype=np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            discount = np.where(original > price, (original - price) / original * 100.0, 0.0)
+        discount[np.isnan(price)] = np.nan
+        last_seen = np.array([_timestamp(p.get("last_seen")) for p in products], dtype=np.float64)
+
+        self.columns = {"price": price, "discount": np.round(discount, 2), "last_seen": last_seen}
+        for i, p in enumerate(products):
+            p["discount_pct"] = None if np.isnan(self.columns["discount"][i]) else float(self.columns["discount"][i])
+
+        # Ordens por campo: (asc, desc) pelo par (valor, product_id), ausentes
+        # no fim nas duas direções. O desempate pelo ID é o que o cursor usa
+        # para continuar quando o produto dele some do índice.
+        self.orders = {}
+        self.ranks = {}
+        id_rank = np.empty(n, dtype=np.int64)
+        id_rank[np.argsort(np.array([p["product_id"] for p in products], dtype=object), kind="stable")] = np.arange(n)
+        titles = np.array([(p.get("title") or "").lower() for p in products], dtype=object)
+        for field in SORT_FIELDS:
+            if field == "title":
+                _, title_code = np.unique(titles, return_inverse=True)
+                asc = np.lexsort((id_rank, title_code))
+                desc = asc[::-1].copy()
+            else:
+                values = self.columns[field]
+                missing = np.isnan(values)
+                present = np.flatnonzero(~missing)
+                asc_present = present[np.lexsort((id_rank[present], values[present]))]
+                tail = np.flatnonzero(missing)
+                tail = tail[np.argsort(id_rank[tail], kind="stable")]
+                asc = np.concatenate([asc_present, tail])
+                desc = np.concatenate([asc_present[::-1], tail])
+            for direction, order in (("asc", asc), ("desc", desc)):
+                rank = np.empty(n, dtype=np.int64)
+                rank[order] = np.arange(n)
+                self.orders[(field, direction)] = order
+                self.ranks[(field, direction)] = rank
+
+        # Índice invertido
+        postings: Dict[str, List[int]] = {}
+        for i, p in enumerate(products):
+            for token in normalize_title(p.get("title"))["tokens"]:
+                postings.setdefault(token, []).append(i)
+        self.postings = {t: np.array(v, dtype=np.int64) for t, v in postings.items()}
+
+        self.built_at = time.time()
+        self.build_seconds = time.perf_counter() - start
+
+    @classmethod
+    def from_store(cls, store) -> "CatalogIndex":
+        return cls(list(store.iter_products()))
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    # --- Consulta ---
+
+    def _mask(self, marketplace: Optional[str], min_price: Optional[int], max_price: Optional[int],
+              min_discount: Optional[float], keyword: Optional[str]) -> np.ndarray:
+        mask = np.ones(len(self.products), dtype=bool)
+        if marketplace:
+            if marketplace not in self.marketplaces:
+                return np.zeros(len(self.products), dtype=bool)
+            mask &= self.marketplace == self.marketplaces.index(marketplace)
+        price = self.columns["price"]
+        if min_price is not None:
+            mask &= price >= min_price
+        if max_price is not None:
+            mask &= price <= max_price
+        if min_discount is not None:
+            mask &= self.columns["discount"] >= min_discount
+        if keyword:
+            tokens = normalize_title(keyword)["tokens"]
+            if not tokens:
+                raise CatalogQueryError("palavra-chave sem termos válidos")
+            # Menor lista primeiro: as interseções ficam pequenas
+            for token in sorted(tokens, key=lambda t: len(self.postings.get(t, ()))):
+                positions = self.postings.get(token)
+                if positions is None:
+                    return np.zeros(len(self.products), dtype=bool)
+                token_mask = np.zeros(len(self.products), dtype=bool)
+                token_mask[positions] = True
+                mask &= token_mask
+        return mask
+
+    def _sort_value(self, field: str, pos: int):
+        if field == "title":
+            return (self.products[pos].get("title") or "").lower()
+        value = self.columns[field][pos]
+        return None if np.isnan(value) else float(value)
+
+    def _start_rank(self, field: str, direction: str, cursor: Dict) -> int:
+        """Rank a partir do qual continuar (exclusivo)"""
+        pos = self.id_to_pos.get(cursor["id"])
+        if pos is not None:
+            return int(self.ranks[(field, direction)][pos])
+        # Produto sumiu após uma remontagem: continua pelo par (valor, ID),
+        # sem pular os empatados com o valor do cursor
+        order = self.orders[(field, direction)]
+        target, target_id = cursor.get("v"), str(cursor["id"])
+        for rank, p in enumerate(order):
+            value, product_id = self._sort_value(field, p), self.products[p]["product_id"]
+            if target is None:
+                after = value is None and product_id > target_id
+            elif value is None:
+                after = True
+            elif value != target:
+                after = (value > target) if direction == "asc" else (value < target)
+            else:
+                after = (product_id > target_id) if direction == "asc" else (product_id < target_id)
+            if after:
+                return rank - 1
+        return len(order) - 1
+
+    def query(self, marketplace: Optional[str] = None, min_price: Optional[int] = None,
+              max_price: Optional[int] = None, min_discount: Optional[float] = None,
+              keyword: Optional[str] = None, sort: str = "price", order: str = "asc",
+              limit: int = 50, cursor: Optional[str] = None) -> Dict:
+        """
+        Filtra, ordena e pagina.
+
+        Args:
+              min_price/max_price: Em centavos
+              sort: price | discount | last_seen | title
+              order: asc | desc
+              cursor: Valor de `next_cursor` da página anterior
+
+        Retorna:
+              {"items", "total", "next_cursor"}
+
+        Levanta:
+              CatalogQueryError: Parâmetro inválido
+        """
+        if sort not in SORT_FIELDS:
+            raise CatalogQueryError(f"sort deve ser um de: {', '.join(SORT_FIELDS)}")
+        if order not in ("asc", "desc"):
+            raise CatalogQueryError("order deve ser asc ou desc")
+        limit = max(1, min(MAX_LIMIT, int(limit)))
+
+        mask = self._mask(marketplace, min_price, max_price, min_discount, keyword)
+        total = int(mask.sum())
+
+        ordering = self.orders[(sort, order)]
+        if cursor:
+            ordering = ordering[self._start_rank(sort, order, decode_cursor(cursor)) + 1:]
+        hits = ordering[mask[ordering]][:limit + 1]
+
+        items = [self.products[p] for p in hits[:limit]]
+        next_cursor = None
+        if len(hits) > limit:
+            last = int(hits[limit - 1])
+            next_cursor = encode_cursor(self.products[last]["product_id"], self._sort_value(sort, last))
+        return {"items": items, "total": total, "next_cursor": next_cursor}
+
+    def get(self, product_id: str) -> Optional[Dict]:
+        pos = self.id_to_pos.get(product_id)
+        return None if pos is None else self.products[pos]
+
+
+def _timestamp(value) -> float:
+    if value is None:
+        return np.nan
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return np.nan
+
+
+class CatalogService:
+    """
+    Mantém o índice atual e o remonta em segundo plano quando uma coleta
+    termina (o banco mudou e ficou estável por um intervalo de verificação).
+    As consultas nunca esperam a remontagem.
+    """
+
+    def __init__(self, store, poll_interval: float = 5.0):
+        self.store = store
+        self.poll_interval = poll_interval
+        self.index = CatalogIndex.from_store(store)
+        self._signature = store.catalog_signature()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self, force: bool = False) -> bool:
+        """Remonta o índice se o banco mudou. Retorna True se remontou"""
+        signature = self.store.catalog_signature()
+        if not force and signature == self._signature:
+            return False
+        index = CatalogIndex.from_store(self.store)
+        self.index, self._signature = index, signature # Troca atômica da referência
+        return True
+
+    def start(self) -> "CatalogService":
+        def watch():
+            previous = self._signature
+            while not self._stop.wait(self.poll_interval):
+                try:
+                    signature = self.store.catalog_signature()
+                    # Durante a coleta os lotes continuam chegando: espera estabilizar
+                    if signature != self._signature and signature == previous and self.refresh():
+                        print(f"🔄 Catálogo remontado: {len(self.index)} produtos "
+                              f"({self.index.build_seconds * 1000:.0f} ms)")
+                    previous = signature
+                except Exception as e:
+                    print(f"⚠️ Falha ao remontar o catálogo: {e}")
+
+        self._thread = threading.Thread(target=watch, name="catalog-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
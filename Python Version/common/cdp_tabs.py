@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+Motor assíncrono de várias abas num único Chrome (DevTools Protocol).
+
+Um driver Selenium fica ocioso a maior parte do tempo esperando driver.get,
+scrolls e pausas. Aqui o mesmo navegador (já aquecido) é controlado direto
+pelo websocket de debug: cada URL ganha uma aba (sessão CDP "flatten"), e
+até `tab_concurrency` abas navegam, rolam e extraem ao mesmo tempo. As abas
+são reaproveitadas entre URLs.
+
+Usa trio + trio-websocket (já instalados como dependências do Selenium).
+
+Uso:
+    async def job(tab, url):
+        await tab.navigate(url)
+        await load_products_tab(tab, "div.card")
+        return await tab.call("return document.title;")
+
+    for index, result in iter_tab_results(browser_ws_url(driver), urls, job, tab_concurrency=6):
+        ...  # result = valor do job ou a exceção que ele levantou
+
+O Chrome precisa ser iniciado com BACKGROUND_FLAGS para que as abas em
+segundo plano não tenham timers e renderização estrangulados.
+"""
+
+import json
+import queue
+import threading
+import urllib.request
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import trio
+from trio_websocket import ConnectionClosed, open_websocket_url
+
+from common.scroll_loader import SCROLL_AND_WAIT_SCRIPT, SCROLL_TIMEOUT, SETTLE_MS
+
+TAB_CONCURRENCY = 4
+COMMAND_TIMEOUT = 30.0
+NAVIGATION_TIMEOUT = 30.0
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024 # Resultados da extração em lote podem ser grandes
+
+# Sem isso o Chrome estrangula timers/renderização das abas que não estão em foco
+BACKGROUND_FLAGS = (
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+)
+
+
+class CDPError(RuntimeError):
+    """Erro devolvido pelo navegador (ou timeout) em um comando CDP"""
+
+
+def browser_ws_url(driver) -> str:
+    """
+    URL do websocket de debug do navegador de um driver Selenium.
+
+    Levanta:
+          CDPError: Se o driver não expuser o endereço de debug
+    """
+    address = (driver.capabilities.get("goog:chromeOptions") or {}).get("debuggerAddress")
+    if not address:
+        raise CDPError("driver sem debuggerAddress (não é Chrome/Chromium?)")
+    with urllib.request.urlopen(f"http://{address}/json/version", timeout=10) as response:
+        return json.load(response)["webSocketDebuggerUrl"]
+
+
+def default_tab_setup(user_agent: Optional[str] = None, blocked_urls: Optional[Sequence[str]] = None,
+                      scripts: Iterable[str] = ()) -> List[Tuple[str, Dict]]:
+    """
+    Comandos aplicados em cada aba nova (o que initialize_driver faz na aba do driver).
+
+    Args:
+          user_agent: Sobrescreve o User-Agent da aba
+          blocked_urls: Padrões de Network.setBlockedURLs (bloqueio de recursos)
+          scripts: Scripts injetados antes de qualquer script da página
+    """
+    commands: List[Tuple[str, Dict]] = [
+        ("Page.enable", {}),
+        ("Emulation.setFocusEmulationEnabled", {"enabled": True}),
+    ]
+    if user_agent or blocked_urls:
+        commands.append(("Network.enable", {}))
+    if user_agent:
+        commands.append(("Network.setUserAgentOverride", {"userAgent": user_agent}))
+    if blocked_urls:
+        commands.append(("Network.setBlockedURLs", {"urls": list(blocked_urls)}))
+    for source in scripts:
+        commands.append(("Page.addScriptToEvaluateOnNewDocument", {"source": source}))
+    return commands
+
+
+# ============================================================================
+# CONEXÃO E ABAS
+# ============================================================================
+
+class CDPConnection:
+    """Websocket do navegador: comandos com id + eventos por sessão"""
+
+    def __init__(self, ws):
+        self._ws = ws
+        self._next_id = 0
+        self._pending: Dict[int, Dict] = {}
+        self._waiters: Dict[Tuple, List[Dict]] = {}
+        self.closed = False
+
+    async def send(self, method: str, params: Optional[Dict] = None, session_id: Optional[str] = None,
+                   timeout: float = COMMAND_TIMEOUT) -> Dict:
+        """
+        Envia um comando e espera a resposta.
+
+        Levanta:
+              CDPError: Erro do navegador, timeout ou conexão fechada
+        """
+        if self.closed:
+            raise CDPError("conexão CDP fechada")
+        self._next_id += 1
+        message = {"id": self._next_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        slot = self._pending[self._next_id] = {"event": trio.Event()}
+        try:
+            await self._ws.send_message(json.dumps(message))
+            with trio.move_on_after(timeout) as scope:
+                await slot["event"].wait()
+        finally:
+            self._pending.pop(message["id"], None)
+
+        if scope.cancelled_caught:
+            raise CDPError(f"{method}: sem resposta em {timeout:.0f}s")
+        response = slot.get("response") or {}
+        if "error" in response:
+            raise CDPError(f"{method}: {response['error'].get('message', response['error'])}")
+        return response.get("result", {})
+
+    def expect(self, method: str, session_id: Optional[str] = None) -> Dict:
+        """Registra a espera por um evento ANTES do comando que o dispara"""
+        slot = {"event": trio.Event()}
+        self._waiters.setdefault((session_id, method), []).append(slot)
+        return slot
+
+    async def reader(self) -> None:
+        """Loop que distribui respostas e eventos (roda no nursery da conexão)"""
+        try:
+            while True:
+                message = json.loads(await self._ws.get_message())
+                if "id" in message:
+                    slot = self._pending.get(message["id"])
+                    if slot is not None:
+                        slot["response"] = message
+                        slot["event"].set()
+                    continue
+                for slot in self._waiters.pop((message.get("sessionId"), message.get("method")), []):
+                    slot["params"] = message.get("params", {})
+                    slot["event"].set()
+        except ConnectionClosed:
+            pass
+        finally:
+            self.closed = True
+            for slot in self._pending.values():
+                slot["response"] = {"error": {"message": "conexão CDP fechada"}}
+                slot["event"].set()
+
+
+class Tab:
+    """Uma aba (target) ligada à conexão por uma sessão "flatten" """
+
+    def __init__(self, connection: CDPConnection, target_id: str, session_id: str):
+        self.connection = connection
+        self.target_id = target_id
+        self.session_id = session_id
+
+    @classmethod
+    async def open(cls, connection: CDPConnection, setup: Sequence[Tuple[str, Dict]] = ()) -> "Tab":
+        target = await connection.send("Target.createTarget", {"url": "about:blank", "background": True})
+        attached = await connection.send("Target.attachToTarget", {"targetId": target["targetId"], "flatten": True})
+        tab = cls(connection, target["targetId"], attached["sessionId"])
+        for method, params in setup:
+            await tab.send(method, params)
+        return tab
+
+    async def send(self, method: str, params: Optional[Dict] = None, timeout: float = COMMAND_TIMEOUT) -> Dict:
+        return await self.connection.send(method, params, self.session_id, timeout)
+
+    async def navigate(self, url: str, timeout: float = NAVIGATION_TIMEOUT) -> bool:
+        """
+        Navega e espera o evento load (requer Page.enable no setup).
+
+        Retorna:
+              False se o load não chegou em `timeout` (a página pode estar utilizável)
+
+        Levanta:
+              CDPError: Se a navegação falhar (DNS, conexão recusada, ...)
+        """
+        loaded = self.connection.expect("Page.loadEventFired", self.session_id)
+        result = await self.send("Page.navigate", {"url": url}, timeout)
+        if result.get("errorText"):
+            raise CDPError(f"navegação falhou ({result['errorText']}): {url}")
+        with trio.move_on_after(timeout):
+            await loaded["event"].wait()
+            return True
+        return False
+
+    async def evaluate(self, expression: str, await_promise: bool = False, timeout: float = COMMAND_TIMEOUT):
+        """
+        Avalia JavaScript na página e devolve o valor (JSON).
+
+        Levanta:
+              CDPError: Exceção no script
+        """
+        result = await self.send("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": True,
+            "awaitPromise": await_promise,
+        }, timeout)
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            text = (details.get("exception") or {}).get("description") or details.get("text")
+            raise CDPError(f"erro no script: {text}")
+        return (result.get("result") or {}).get("value")
+
+    async def call(self, body: str, *args, timeout: float = COMMAND_TIMEOUT):
+        """Equivalente de driver.execute_script (corpo de função usando `arguments`)"""
+        return await self.evaluate(f"(function() {{ {body} \n}}).apply(null, {json.dumps(list(args))})",
+                                   timeout=timeout)
+
+    async def call_async(self, body: str, *args, timeout: float = COMMAND_TIMEOUT):
+        """Equivalente de driver.execute_async_script (o último argumento é o callback)"""
+        expression = (f"new Promise((resolve) => {{ (function() {{ {body} \n}})"
+                      f".apply(null, {json.dumps(list(args))}.concat([resolve])); }})")
+        return await self.evaluate(expression, await_promise=True, timeout=timeout)
+
+    async def close(self) -> None:
+        try:
+            await self.connection.send("Target.closeTarget", {"targetId": self.target_id}, timeout=5)
+        except CDPError:
+            pass
+
+
+# ============================================================================
+# AJUDANTES DE PÁGINA
+# ============================================================================
+
+async def wait_for_selector(tab: Tab, css_selector: str, timeout: float = NAVIGATION_TIMEOUT,
+                            poll: float = 0.2) -> int:
+    """Espera existir ao menos um elemento. Retorna a contagem (0 = timeout)"""
+    expression = f"document.querySelectorAll({json.dumps(css_selector)}).length"
+    with trio.move_on_after(timeout):
+        while True:
+            count = await tab.evaluate(expression)
+            if count:
+                return int(count)
+            await trio.sleep(poll)
+    return 0
+
+
+async def page_snapshot(tab: Tab) -> Tuple[str, str]:
+    """(URL atual, HTML) da aba — ex.: para detectar páginas de bloqueio/CAPTCHA"""
+    snapshot = await tab.evaluate("[location.href, document.documentElement.outerHTML]") or ["", ""]
+    return snapshot[0], snapshot[1]
+
+
+async def load_products_tab(tab: Tab, css_selector: str, max_scrolls: int = 30, target_count: Optional[int] = None,
+                            stall_limit: int = 3, scroll_by: Optional[int] = None,
+                            timeout: float = SCROLL_TIMEOUT, settle_ms: int = SETTLE_MS) -> Dict:
+    """
+    Mesmo critério de parada de scroll_loader.load_products, numa aba CDP
+    (mesmo script de scroll orientado a eventos).
+
+    Retorna:
+          Dicionário com total, per_scroll e reason
+    """
+    per_scroll: List[int] = []
+    stalls = 0
+    last_height = None
+    total = 0
+    reason = "max_scrolls"
+
+    for _ in range(max_scrolls):
+        step = await tab.call_async(SCROLL_AND_WAIT_SCRIPT, css_selector, scroll_by or 0,
+                                    int(timeout * 1000), settle_ms, timeout=timeout + 5) or {}
+        before = int(step.get("before", 0))
+        total = int(step.get("after", before))
+        new = max(0, total - before)
+        per_scroll.append(new)
+
+        if target_count is not None and total >= target_count:
+            reason = "target"
+            break
+        if new == 0 and step.get("height") == last_height:
+            stalls += 1
+            if stalls >= stall_limit:
+                reason = "stalled"
+                break
+        else:
+            stalls = 0
+        last_height = step.get("height")
+
+    return {"total": total, "per_scroll": per_scroll, "reason": reason}
+
+
+# ============================================================================
+# EXECUÇÃO
+# ============================================================================
+
+async def run_tabs(ws_url: str, items: Sequence, job: Callable, tab_concurrency: int = TAB_CONCURRENCY,
+                   setup: Sequence[Tuple[str, Dict]] = (), on_result: Optional[Callable] = None) -> List:
+    """
+    Roda `job(tab, item)` para cada item com até `tab_concurrency` abas simultâneas.
+
+    Uma aba cujo job falhou é fechada (pode ter ficado em estado ruim); as
+    demais voltam para o conjunto livre e são reaproveitadas.
+
+    Args:
+          on_result: Chamado com (índice, resultado) assim que cada item termina
+
+    Retorna:
+          Resultados na ordem de `items` (a exceção no lugar do item que falhou)
+    """
+    results: List = [None] * len(items)
+    async with open_websocket_url(ws_url, max_message_size=MAX_MESSAGE_SIZE) as ws:
+        connection = CDPConnection(ws)
+        async with trio.open_nursery() as nursery:
+            nursery.start_soon(connection.reader)
+            limiter = trio.CapacityLimiter(max(1, tab_concurrency))
+            free_tabs: List[Tab] = []
+
+            async def worker(index: int, item) -> None:
+                async with limiter:
+                    tab = None
+                    try:
+                        tab = free_tabs.pop() if free_tabs else await Tab.open(connection, setup)
+                        result = await job(tab, item)
+                        free_tabs.append(tab)
+                    except Exception as e:
+                        result = e
+                        if tab is not None:
+                            await tab.close()
+                results[index] = result
+                if on_result is not None:
+                    on_result(index, result)
+
+            async with trio.open_nursery() as jobs:
+                for index, item in enumerate(items):
+                    jobs.start_soon(worker, index, item)
+
+            for tab in free_tabs:
+                await tab.close()
+            nursery.cancel_scope.cancel()
+    return results
+
+
+_DONE = object()
+
+
+def iter_tab_results(ws_url: str, items: Sequence, job: Callable, tab_concurrency: int = TAB_CONCURRENCY,
+                     setup: Sequence[Tuple[str, Dict]] = ()) -> Iterator[Tuple[int, object]]:
+    """
+    Versão síncrona em streaming de run_tabs (o loop trio roda numa thread).
+
+    Gera:
+          (índice do item, resultado ou exceção) na ordem em que terminam
+
+    Levanta:
+          Exception: Falha da conexão com o navegador (ex.: websocket recusado)
+    """
+    results: queue.Queue = queue.Queue()
+    failure: List[BaseException] = []
+
+    def runner() -> None:
+        try:
+            trio.run(run_tabs, ws_url, items, job, tab_concurrency, setup,
+                     lambda index, result: results.put((index, result)))
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            results.put(_DONE)
+
+    thread = threading.Thread(target=runner, name="cdp-tabs", daemon=True)
+    thread.start()
+    while True:
+        entry = results.get()
+        if entry is _DONE:
+            break
+        yield entry
+    thread.join()
+    if failure:
+        raise failure[0]
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Journal de checkpoint (append-only, JSON lines) para coletas longas.
+
+Cada unidade de trabalho (categoria, busca da API) grava no journal os
+produtos já extraídos, as páginas concluídas e, ao final, a marca de
+unidade concluída. Após um crash, CAPTCHA ou Ctrl+C, a execução com
+`resume=True` pula as unidades concluídas, reaproveita as páginas já
+baixadas e reentrega os produtos salvos. As chaves dos produtos que o
+banco confirmou também vão para o journal, para o resume não gravar de
+novo a mesma observação de preço (nem pular as que não chegaram ao banco).
+
+Tipos de linha:
+    {"type": "start",    "ts": ..., "resume": false}
+    {"type": "products", "unit": "<url>", "products": [...]}
+    {"type": "page",     "unit": "<url>", "page": 2, "products": [...], ...info}
+    {"type": "done",     "unit": "<url>", "count": 48}
+    {"type": "stored",   "keys": ["MLB123", ...]}
+
+Uma linha truncada no fim (processo morto no meio da escrita) é ignorada.
+
+Uso:
+    journal = CheckpointJournal("checkpoints/mercadolivre.jsonl", resume=True)
+    if not journal.is_done(url):
+        journal.record_products(url, products)
+        journal.mark_done(url, len(products))
+    journal.close()
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+
+def read_journal(path: str) -> Iterator[Dict]:
+    """Percorre as linhas válidas do journal (ignora linhas corrompidas/truncadas)"""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and record.get("type"):
+                yield record
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class CheckpointJournal:
+    """
+    Journal de checkpoint thread-safe (workers paralelos gravam no mesmo arquivo).
+
+    Args:
+          path: Arquivo do journal
+          resume: Carrega o estado do journal existente e continua gravando
+                  nele. Sem resume, um journal anterior é preservado como
+                  `<path>.prev` e a coleta começa do zero
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.resume = resume
+        self.done: Dict[str, int] = {}                    # unidade → produtos
+        self.pages: Dict[str, Set[int]] = {}              # unidade → páginas concluídas
+        self.stored: Set[str] = set()                     # chaves já gravadas no banco
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if resume:
+            for record in read_journal(path):
+                self._apply(record)
+        elif os.path.exists(path):
+            os.replace(path, f"{path}.prev")
+        self._file = open(path, "a", encoding="utf-8")
+        if resume and self._file.tell() and not _ends_with_newline(path):
+            self._file.write("\n") # Não cola a próxima linha numa linha truncada
+        self._write({"type": "start", "ts": round(time.time(), 3), "resume": resume})
+
+    def _apply(self, record: Dict) -> None:
+        if record["type"] == "done":
+            self.done[record["unit"]] = record.get("count", 0)
+        elif record["type"] == "page":
+            self.pages.setdefault(record["unit"], set()).add(int(record["page"]))
+        elif record["type"] == "stored":
+            self.stored.update(record.get("keys", []))
+
+    def _write(self, record: Dict) -> None:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file is None:
+                return
+            # Uma linha por write + flush: o que foi gravado sobrevive a um crash
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._apply(record)
+
+    # --- Escrita ---
+
+    def record_products(self, unit: str, products: List[Dict]) -> None:
+        """Grava produtos extraídos (ainda sem a unidade concluída)"""
+        if products:
+            self._write({"type": "products", "unit": unit, "products": products})
+
+    def record_page(self, unit: str, page: int, products: List[Dict], **info) -> None:
+        """
+        Grava uma página concluída de uma listagem paginada.
+
+        Args:
+              info: Dados para retomar sem baixar a página de novo (ex.:
+                    link da próxima página e URL final da página 1)
+        """
+        self._write({"type": "page", "unit": unit, "page": page, "products": products, **info})
+
+    def mark_done(self, unit: str, count: int = 0) -> None:
+        """Marca a unidade como concluída (pulada no resume)"""
+        self._write({"type": "done", "unit": unit, "count": count})
+
+    def record_stored(self, keys: Iterable[Optional[str]]) -> None:
+        """Grava as chaves dos produtos que o banco confirmou (chamar depois do commit)"""
+        keys = [k for k in keys if k is not None]
+        if keys:
+            self._write({"type": "stored", "keys": keys})
+
+    # --- Leitura ---
+
+    def is_done(self, unit: str) -> bool:
+        return unit in self.done
+
+    def is_stored(self, key: str) -> bool:
+        return key in self.stored
+
+    def saved_pages(self, unit: str) -> Dict[int, Dict]:
+        """
+        Páginas já concluídas da unidade, lidas do arquivo (os produtos não
+        ficam em memória).
+
+        Retorna:
+              {página: registro com "products" e os dados de record_page}
+        """
+        with self._lock:
+            if not self.pages.get(unit):
+                return {}
+        return {int(r["page"]): r for r in read_journal(self.path)
+                if r["type"] == "page" and r.get("unit") == unit}
+
+    def saved_products(self, units: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+        """
+        Reentrega os produtos gravados, na ordem do journal (com repetidos:
+        a mesma unidade pode ter sido retomada mais de uma vez).
+
+        Args:
+              units: Só estas unidades (None = todas)
+        """
+        selected: Optional[Set[str]] = set(units) if units is not None else None
+        for record in read_journal(self.path):
+            if record["type"] not in ("products", "page"):
+                continue
+            if selected is not None and record.get("unit") not in selected:
+                continue
+            yield from record.get("products", [])
+
+    def summary(self) -> str:
+        pages = sum(len(p) for p in self.pages.values())
+        return f"{len(self.done)} unidade(s) concluída(s), {pages} página(s) salvas — {self.path}"
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Pool de navegadores pré-aquecidos + cache local do caminho do chromedriver.
+
+Uso:
+    pool = DriverPool(initialize_driver, size=2)
+    pool.prewarm()                  # abre os navegadores em segundo plano
+    with pool.lease() as driver:    # empresta um driver já configurado
+        driver.get(url)
+    pool.close()
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+# ============================================================================
+# CACHE DO CHROMEDRIVER
+# ============================================================================
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "findprodct")
+CHROMEDRIVER_CACHE_FILE = os.path.join(CACHE_DIR, "chromedriver.json")
+
+_resolve_lock = threading.Lock()
+_resolved_path: Optional[str] = None
+
+
+def resolve_chromedriver_path(force_refresh: bool = False) -> str:
+    """
+    Resolve o caminho do chromedriver UMA vez e guarda em cache local.
+
+    Ordem: variável CHROMEDRIVER_PATH → cache em memória → cache em disco →
+    ChromeDriverManager().install() (única etapa que usa a rede).
+
+    Args:
+          force_refresh: Ignora o cache e consulta o ChromeDriverManager
+
+    Retorna:
+          Caminho do executável do chromedriver
+    """
+    global _resolved_path
+
+    env_path = os.environ.get("CHROMEDRIVER_PATH")
+    if env_path and os.path.isfile(env_path):
+        return env_path
+
+    with _resolve_lock:
+        if _resolved_path and not force_refresh and os.path.isfile(_resolved_path):
+            return _resolved_path
+
+        if not force_refresh:
+            try:
+                with open(CHROMEDRIVER_CACHE_FILE, encoding="utf-8") as f:
+                    cached = json.load(f).get("path")
+                if cached and os.path.isfile(cached):
+                    _resolved_path = cached
+                    return cached
+            except (OSError, ValueError):
+                pass
+
+        # Import local: só é necessário quando o cache não existe
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        path = ChromeDriverManager().install()
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(CHROMEDRIVER_CACHE_FILE, "w", encoding="utf-8") as f:
+                json.dump({"path": path, "resolved_at": int(time.time())}, f)
+        except OSError:
+            pass # Sem cache em disco: continua funcionando, só não persiste
+
+        _resolved_path = path
+        return path
+
+
+# ============================================================================
+# POOL DE DRIVERS
+# ============================================================================
+
+def is_driver_healthy(driver) -> bool:
+    """Verifica se o navegador ainda responde (sessão viva)"""
+    try:
+        return driver.execute_script("return 1") == 1
+    except Exception:
+        return False
+
+
+class DriverPool:
+    """
+    Mantém navegadores já configurados (anti-detecção aplicada pela factory)
+    e os empresta aos scrapers. Drivers são reciclados após `max_uses`
+    empréstimos ou quando falham no health-check.
+    """
+
+    def __init__(self, factory: Callable, size: int = 1, max_uses: int = 50):
+        self.factory = factory
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self._idle = queue.Queue()
+        self._uses: Dict[int, int] = {}
+        self._total = 0
+        self._lock = threading.Lock()
+        self._create_lock = threading.Lock() # Criação serial (portas de debug)
+        self._closed = False
+
+    # --- Criação / descarte ---
+
+    def _create(self):
+        with self._create_lock:
+            driver = self.factory()
+        with self._lock:
+            self._uses[id(driver)] = 0
+        return driver
+
+    def _destroy(self, driver) -> None:
+        with self._lock:
+            self._total -= 1
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def prewarm(self, count: Optional[int] = None, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Abre navegadores antecipadamente (por padrão em uma thread).
+
+        Args:
+              count: Quantos abrir (padrão: tamanho do pool)
+              background: Se True, não bloqueia quem chamou
+
+        Retorna:
+              A thread de pré-aquecimento (ou None se foi síncrono)
+        """
+        count = self.size if count is None else min(count, self.size)
+
+        def _warm():
+            while True:
+                with self._lock:
+                    if self._closed or self._total >= count:
+                        return
+                    self._total += 1
+                try:
+                    self._idle.put(self._create())
+                except Exception as e:
+                    with self._lock:
+                        self._total -= 1
+                    print(f"   ⚠️ Pool: falha ao pré-aquecer navegador: {e}")
+                    return
+
+        if not background:
+            _warm()
+            return None
+        thread = threading.Thread(target=_warm, daemon=True)
+        thread.start()
+        return thread
+
+    # --- Empréstimo ---
+
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        Empresta um driver saudável (cria um novo se o pool ainda não encheu).
+
+        Args:
+              timeout: Tempo máximo esperando um driver livre (None = sem limite)
+        """
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._total < self.size
+                    if can_create:
+                        self._total += 1
+                if can_create:
+                    try:
+                        return self._create()
+                    except Exception:
+                        with self._lock:
+                            self._total -= 1
+                        raise
+                driver = self._idle.get(timeout=timeout)
+
+            if is_driver_healthy(driver):
+                return driver
+            # Driver morto: descarta e tenta o próximo
+            self._destroy(driver)
+
+    def release(self, driver) -> None:
+        """Devolve o driver ao pool (ou recicla se atingiu max_uses)"""
+        with self._lock:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+        if self._closed or uses >= self.max_uses or not is_driver_healthy(driver):
+            self._destroy(driver)
+            return
+        try:
+            driver.get("about:blank") # Limpa a página anterior antes do próximo uso
+        except Exception:
+            self._destroy(driver)
+            return
+        self._idle.put(driver)
+
+    def discard(self, driver) -> None:
+        """Remove um driver com problema (ex.: travou em CAPTCHA)"""
+        self._destroy(driver)
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None):
+        """Context manager: empresta e devolve (ou descarta em caso de erro)"""
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        except Exception:
+            self.discard(driver)
+            raise
+        else:
+            self.release(driver)
+
+    def close(self) -> None:
+        """Fecha todos os navegadores ociosos"""
+        self._closed = True
+        drivers: List = []
+        while True:
+            try:
+                drivers.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for driver in drivers:
+            self._destroy(driver)
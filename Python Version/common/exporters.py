@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Exportadores em streaming: gravam as linhas conforme chegam, em vez de montar
+um DataFrame inteiro no final e chamar to_excel.
+
+    CsvExporter      → .csv   (flush a cada lote)
+    JsonlExporter    → .jsonl (flush a cada lote)
+    ParquetExporter  → .parquet (pyarrow, 1 row group por lote, compressão zstd)
+    XlsxExporter     → .xlsx  (openpyxl write-only, memória constante; o arquivo
+                                só é escrito no close(), então não sobrevive a
+                                uma queda: use junto com .csv/.jsonl)
+
+Uso:
+    with create_exporter("saida.csv", columns, rename_map) as exporter:
+        exporter.write_rows(lote_1)
+        exporter.write_rows(lote_2)
+"""
+
+import csv
+import json
+import math
+import os
+from typing import Dict, Iterable, List, Optional
+
+# Tipos aceitos em `column_types` (usados pelo Parquet; os demais formatos
+# só convertem valores ausentes para vazio)
+COLUMN_TYPES = ("string", "int64", "float64", "bool")
+
+
+def clean_value(value):
+    """Converte NA/NaN/tipos NumPy em valores Python simples (None, int, float...)"""
+    if value is None:
+        return None
+    try:
+        # pd.NA, NaT e NaN
+        if value != value or str(value) in ("<NA>", "NaT"):
+            return None
+    except (TypeError, ValueError):
+        if str(value) == "<NA>":
+            return None
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        try:
+            return value.item()
+        except (AttributeError, ValueError):
+            pass
+    if isinstance(value, float) and math.isinf(value):
+        return None
+    return value
+
+
+class Exporter:
+    """
+    Interface comum dos exportadores.
+
+    Args:
+          path: Arquivo de saída
+          columns: Colunas (nomes internos), na ordem de gravação
+          rename_map: Nome interno → nome no arquivo (cabeçalho)
+          column_types: Nome interno → tipo (COLUMN_TYPES); padrão "string"
+    """
+
+    extension = ""
+
+    def __init__(self, path: str, columns: List[str], rename_map: Optional[Dict[str, str]] = None,
+                 column_types: Optional[Dict[str, str]] = None):
+        self.path = path
+        self.columns = list(columns)
+        self.rename_map = rename_map or {}
+        self.column_types = column_types or {}
+        self.headers = [self.rename_map.get(c, c) for c in self.columns]
+        self.rows_written = 0
+        self._opened = False
+
+    # --- Ciclo de vida ---
+
+    def open(self) -> "Exporter":
+        if not self._opened:
+            self._open()
+            self._opened = True
+        return self
+
+    def write_rows(self, rows: Iterable[Dict]) -> int:
+        """Grava um lote de dicionários (chaves = nomes internos). Retorna quantas linhas"""
+        self.open()
+        values = [[clean_value(row.get(c)) for c in self.columns] for row in rows]
+        if values:
+            self._write(values)
+            self.rows_written += len(values)
+        return len(values)
+
+    def write_row(self, row: Dict) -> None:
+        self.write_rows([row])
+
+    def close(self) -> None:
+        if self._opened:
+            self._close()
+            self._opened = False
+
+    def __enter__(self) -> "Exporter":
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # --- Implementação por formato ---
+
+    def _open(self) -> None:
+        raise NotImplementedError
+
+    def _write(self, values: List[List]) -> None:
+        raise NotImplementedError
+
+    def _close(self) -> None:
+        raise NotImplementedError
+
+
+class CsvExporter(Exporter):
+    extension = ".csv"
+
+    def _open(self) -> None:
+        # utf-8-sig: o Excel abre acentuação corretamente
+        self._file = open(self.path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.headers)
+
+    def _write(self, values: List[List]) -> None:
+        self._writer.writerows(["" if v is None else v for v in row] for row in values)
+        self._file.flush()
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class JsonlExporter(Exporter):
+    extension = ".jsonl"
+
+    def _open(self) -> None:
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def _write(self, values: List[List]) -> None:
+        for row in values:
+            self._file.write(json.dumps(dict(zip(self.headers, row)), ensure_ascii=False, default=str))
+            self._file.write("\n")
+        self._file.flush()
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class XlsxExporter(Exporter):
+    """
+    openpyxl em modo write-only: as linhas vão direto para o XML temporário,
+    sem manter as células em memória. O .xlsx final só é escrito no close():
+    se o processo morrer antes, nada fica no disco (CSV/JSONL sim).
+    """
+
+    extension = ".xlsx"
+
+    def _open(self) -> None:
+        from openpyxl import Workbook
+
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet("Sheet1")
+        self._sheet.append(self.headers)
+
+    def _write(self, values: List[List]) -> None:
+        for row in values:
+            self._sheet.append(row)
+
+    def _close(self) -> None:
+        self._workbook.save(self.path)
+
+
+class ParquetExporter(Exporter):
+    """Parquet colunar comprimido; cada lote vira um row group"""
+
+    extension = ".parquet"
+
+    def _open(self) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Exportação Parquet requer o pacote 'pyarrow' (pip install pyarrow)") from e
+
+        types = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(), "bool": pa.bool_()}
+        self._pa = pa
+        self._schema = pa.schema([
+            (header, types[self.column_types.get(column, "string")])
+            for column, header in zip(self.columns, self.headers)
+        ])
+        self._writer = pq.ParquetWriter(self.path, self._schema, compression="zstd")
+
+    def _write(self, values: List[List]) -> None:
+        arrays = []
+        for idx, field in enumerate(self._schema):
+            column = [row[idx] for row in values]
+            if field.type == self._pa.string():
+                column = [None if v is None else str(v) for v in column]
+            arrays.append(self._pa.array(column, type=field.type))
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def _close(self) -> None:
+        self._writer.close()
+
+
+EXPORTERS = {cls.extension: cls for cls in (CsvExporter, JsonlExporter, XlsxExporter, ParquetExporter)}
+
+
+def create_exporter(path: str, columns: List[str], rename_map: Optional[Dict[str, str]] = None,
+                    column_types: Optional[Dict[str, str]] = None) -> Exporter:
+    """
+    Escolhe o exportador pela extensão do arquivo (.csv, .jsonl, .xlsx, .parquet).
+
+    Levanta:
+          ValueError: Extensão não suportada
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXPORTERS:
+        raise ValueError(f"Formato de exportação não suportado: '{extension}' "
+                         f"(use {', '.join(sorted(EXPORTERS))})")
+    return EXPORTERS[extension](path, columns, rename_map, column_types)
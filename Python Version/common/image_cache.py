@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Download concorrente das imagens dos cards + cache em disco por conteúdo.
+
+    • Sessão HTTP única com pool de conexões (keep-alive) para os workers
+    • Arquivos nomeados pelo SHA-256 do conteúdo original: a mesma imagem
+      vinda de URLs/categorias diferentes é guardada (e redimensionada) 1 vez
+    • Índice SQLite URL → hash: URLs já vistas nem são baixadas de novo
+    • Decodifica e redimensiona para o tamanho de postagem uma única vez
+    • Limite de espaço em disco com remoção LRU
+
+Uso:
+    cache = ImageCache()
+    caminhos = cache.fetch_many(["https://http2.mlstatic.com/D_Q_NP_....webp", ...])
+    print(cache.stats)
+"""
+
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from common.driver_pool import CACHE_DIR
+
+DEFAULT_IMAGE_DIR = os.environ.get("FINDPRODUCT_IMAGES", os.path.join(CACHE_DIR, "images"))
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024   # 500 MB
+POST_SIZE = (1080, 1080)                # Caixa máxima (mantém a proporção)
+JPEG_QUALITY = 85
+WORKERS = 8
+HTTP_TIMEOUT = 15
+MAX_IMAGE_BYTES = 15 * 1024 * 1024      # Ignora respostas maiores que isso
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha        TEXT PRIMARY KEY,
+    path       TEXT NOT NULL,
+    bytes      INTEGER NOT NULL,
+    last_used  REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url         TEXT PRIMARY KEY,
+    sha         TEXT NOT NULL,
+    fetched_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_blobs_last_used ON blobs (last_used);
+CREATE INDEX IF NOT EXISTS ix_urls_sha ON urls (sha);
+"""
+
+
+def create_image_session(workers: int = WORKERS) -> requests.Session:
+    """Sessão com pool de conexões do tamanho do nº de workers e retentativas"""
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT, "Accept": "image/avif,image/webp,image/*,*/*;q=0.8"})
+    return session
+
+
+def resize_for_post(data: bytes, size=POST_SIZE, quality: int = JPEG_QUALITY) -> bytes:
+    """
+    Decodifica e reduz a imagem para caber em `size` (nunca amplia).
+
+    Retorna:
+          Bytes JPEG
+
+    Levanta:
+          ImportError: Pillow não instalado
+          OSError: Conteúdo não é uma imagem válida
+          ValueError: Imagem truncada ou grande demais (bomba de descompressão)
+    """
+    try:
+        from PIL import Image
+    except ImportError as e:
+        raise ImportError("Cache de imagens requer o pacote 'Pillow' (pip install pillow)") from e
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # JPEG: decodifica já em escala reduzida (bem mais rápido para fotos grandes)
+            image.draft("RGB", size)
+            image = image.convert("RGB")
+            image.thumbnail(size, Image.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, "JPEG", quality=quality, optimize=True)
+    except Image.DecompressionBombError as e:
+        raise ValueError(str(e)) from e
+    return output.getvalue()
+
+
+class ImageCache:
+    """
+    Cache de imagens redimensionadas, endereçado pelo conteúdo.
+
+    Args:
+          root: Diretório do cache (arquivos + index.db)
+          max_bytes: Espaço máximo ocupado pelas imagens (LRU); None = sem limite
+          size: Tamanho máximo de postagem (largura, altura)
+          workers: Downloads simultâneos
+    """
+
+    def __init__(self, root: str = DEFAULT_IMAGE_DIR, max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+                 size=POST_SIZE, workers: int = WORKERS, session: Optional[requests.Session] = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.size = tuple(size)
+        self.workers = workers
+        self.session = session or create_image_session(workers)
+        self.stats = {"hits": 0, "downloaded": 0, "deduplicated": 0, "failed": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Event] = {}
+
+        os.makedirs(root, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    # --- Consulta ---
+
+    def path_for(self, url: str) -> Optional[str]:
+        """Caminho local da imagem dessa URL, se já estiver no cache"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT b.sha, b.path FROM urls u JOIN blobs b ON b.sha = u.sha WHERE u.url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            if not os.path.isfile(row[1]):
+                # Arquivo apagado por fora: esquece a entrada
+                with self._conn:
+                    self._conn.execute("DELETE FROM blobs WHERE sha = ?", (row[0],))
+                    self._conn.execute("DELETE FROM urls WHERE sha = ?", (row[0],))
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE blobs SET last_used = ? WHERE sha = ?", (time.time(), row[0]))
+            return row[1]
+
+    # --- Download ---
+
+    def fetch(self, url: str) -> Optional[str]:
+        """
+        Caminho local da imagem (baixa, redimensiona e guarda se necessário).
+
+        Retorna:
+              Caminho do .jpg ou None se a URL falhar/não for imagem
+        """
+        if not url or not str(url).startswith("http"):
+            return None
+
+        # Mesma URL pedida por 2 threads ao mesmo tempo: só uma baixa
+        with self._lock:
+            event = self._inflight.get(url)
+            owner = event is None
+            if owner:
+                event = self._inflight[url] = threading.Event()
+        if not owner:
+            event.wait()
+            return self.path_for(url)
+
+        try:
+            path = self.path_for(url)
+            if path:
+                with self._lock:
+                    self.stats["hits"] += 1
+                return path
+            return self._download(url)
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+            event.set()
+
+    def _download(self, url: str) -> Optional[str]:
+        try:
+            response = self.session.get(url, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+            data = response.content
+            if not data or len(data) > MAX_IMAGE_BYTES:
+                raise ValueError(f"tamanho inválido ({len(data)} bytes)")
+        except (requests.RequestException, ValueError):
+            with self._lock:
+                self.stats["failed"] += 1
+            return None
+
+        sha = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            row = self._conn.execute("SELECT path FROM blobs WHERE sha = ?", (sha,)).fetchone()
+        if row and os.path.isfile(row[0]):
+            # Conteúdo já conhecido (outra URL): não decodifica de novo
+            self._register(url, sha, row[0], None)
+            with self._lock:
+                self.stats["deduplicated"] += 1
+            return row[0]
+
+        # Falhas ficam nesta imagem (contadas em "failed"): não derrubam o lote
+        try:
+            resized = resize_for_post(data, self.size)
+            path = os.path.join(self.root, sha[:2], f"{sha}.jpg")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(resized)
+            os.replace(temp_path, path)
+            self._register(url, sha, path, len(resized))
+        except (ImportError, OSError, ValueError, sqlite3.Error):
+            with self._lock:
+                self.stats["failed"] += 1
+            return None
+        with self._lock:
+            self.stats["downloaded"] += 1
+        return path
+
+    def _register(self, url: str, sha: str, path: str, size: Optional[int]) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            if size is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO blobs (sha, path, bytes, last_used) VALUES (?, ?, ?, ?)",
+                    (sha, path, size, now),
+                )
+            self._conn.execute("INSERT OR REPLACE INTO urls (url, sha, fetched_at) VALUES (?, ?, ?)",
+                               (url, sha, now))
+            if size is not None:
+                self._evict(keep=sha)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        if self.max_bytes is None:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for sha, path, size in self._conn.execute(
+            "SELECT sha, path, bytes FROM blobs ORDER BY last_used"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            if sha == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._conn.execute("DELETE FROM blobs WHERE sha = ?", (sha,))
+            self._conn.execute("DELETE FROM urls WHERE sha = ?", (sha,))
+            total -= size
+            self.stats["evicted"] += 1
+
+    def fetch_many(self, urls: Iterable[str], workers: Optional[int] = None) -> Dict[str, Optional[str]]:
+        """
+        Baixa várias imagens em paralelo (URLs repetidas só uma vez).
+
+        Retorna:
+              URL → caminho local (None para as que falharam)
+        """
+        unique = [u for u in dict.fromkeys(urls) if u and str(u).startswith("http")]
+        if not unique:
+            return {}
+        with ThreadPoolExecutor(max_workers=max(1, workers or self.workers)) as executor:
+            return dict(zip(unique, executor.map(self.fetch, unique)))
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM blobs").fetchone()[0]
+
+    def close(self) -> None:
+        self.session.close()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentação dos scrapers: tempo por fase (spans) e contadores por seletor.
+
+Desativada por padrão (custo de uma verificação de atributo por chamada).
+Ativada com configure() ou pela variável FINDPRODUCT_METRICS:
+
+    FINDPRODUCT_METRICS=metricas.jsonl  → 1 linha JSON por span + resumo no fim
+    FINDPRODUCT_METRICS=scraper.prom    → textfile do Prometheus (node_exporter),
+                                          reescrito de forma atômica no close()
+    FINDPRODUCT_QUIET=1                 → sem banners no console (modo produção);
+                                          erros e avisos (❌ ⚠️ 🔴) vão para o stderr
+
+Uso:
+    from common import instrumentation as metrics
+
+    with metrics.span("page_load", site="mercadolivre"):
+        driver.get(url)
+    metrics.selector("a.poly-component__title", "text", found=True, seconds=0.002)
+    metrics.close()
+"""
+
+import contextlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+PROMETHEUS_PREFIX = "findprodct"
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def _key(name: str, labels: Dict) -> Tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+class Instrumentation:
+    """
+    Agrega spans, contadores e estatísticas de seletor (thread-safe).
+
+    Args:
+          path: Destino (.prom = textfile do Prometheus; outro = JSON lines).
+                None = só agrega em memória (summary_lines/snapshot)
+          enabled: Liga a coleta
+    """
+
+    def __init__(self, path: Optional[str] = None, enabled: bool = False):
+        self.path = path
+        self.enabled = enabled
+        self.format = "prometheus" if path and path.endswith(".prom") else "jsonl"
+        self.spans: Dict[Tuple, List[float]] = {}      # key → [count, total_s, max_s]
+        self.counters: Dict[Tuple, float] = {}
+        self.selectors: Dict[Tuple, List[float]] = {}  # (selector, kind) → [hits, fallbacks, total_s]
+        self._lock = threading.Lock()
+        self._events = None
+        if enabled and path and self.format == "jsonl":
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._events = open(path, "a", encoding="utf-8", buffering=1)
+
+    # --- Registro ---
+
+    def span(self, name: str, **labels):
+        """Context manager que mede o bloco (no-op quando desativado)"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, labels)
+
+    @contextlib.contextmanager
+    def _span(self, name: str, labels: Dict) -> Iterator[None]:
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, error=error, **labels)
+
+    def observe(self, name: str, seconds: float, error: Optional[str] = None, **labels) -> None:
+        """Registra uma duração já medida (ex.: etapas do pipeline)"""
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            stats = self.spans.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+        if self._events is not None:
+            event = {"ts": round(time.time(), 3), "type": "span", "name": name,
+                     "seconds": round(seconds, 6), **labels}
+            if error:
+                event["error"] = error
+            self._write_event(event)
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def selector(self, selector: str, kind: str, found: bool, seconds: float = 0.0) -> None:
+        """
+        Uma busca de seletor: acerto ou fallback ("Not Found"/default) e o tempo gasto.
+
+        Args:
+              selector: CSS/XPath usado
+              kind: text | attr:<nome> | bulk:<campo> | html
+        """
+        if not self.enabled:
+            return
+        key = (selector, kind)
+        with self._lock:
+            stats = self.selectors.setdefault(key, [0, 0, 0.0])
+            stats[0 if found else 1] += 1
+            stats[2] += seconds
+
+    def _write_event(self, event: Dict) -> None:
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._events is not None:
+                self._events.write(line + "\n")
+
+    # --- Leitura ---
+
+    def snapshot(self) -> Dict:
+        """Estado agregado (serializável em JSON)"""
+        with self._lock:
+            return {
+                "spans": [
+                    {"name": name, **dict(labels), "count": s[0], "seconds": round(s[1], 6), "max_seconds": round(s[2], 6)}
+                    for (name, labels), s in self.spans.items()
+                ],
+                "counters": [
+                    {"name": name, **dict(labels), "value": value}
+                    for (name, labels), value in self.counters.items()
+                ],
+                "selectors": [
+                    {"selector": sel, "kind": kind, "hits": s[0], "fallbacks": s[1], "ms": round(s[2] * 1000, 3)}
+                    for (sel, kind), s in self.selectors.items()
+                ],
+            }
+
+    def summary_lines(self, limit: int = 10) -> List[str]:
+        """Resumo legível: fases por tempo total e seletores com mais fallbacks"""
+        snap = self.snapshot()
+        spans: Dict[str, List[float]] = {}
+        for s in snap["spans"]:
+            total = spans.setdefault(s["name"], [0, 0.0])
+            total[0] += s["count"]
+            total[1] += s["seconds"]
+        lines = [f"{name}: {seconds:.2f}s em {count}x"
+                 for name, (count, seconds) in sorted(spans.items(), key=lambda i: -i[1][1])]
+        worst = sorted(snap["selectors"], key=lambda s: (-s["fallbacks"], -s["ms"]))[:limit]
+        lines += [f"{s['kind']} {s['selector']}: {s['hits']} ok, {s['fallbacks']} fallback, {s['ms']:.0f} ms"
+                  for s in worst]
+        return lines
+
+    def prometheus_text(self) -> str:
+        """Exposição no formato texto do Prometheus"""
+        p = PROMETHEUS_PREFIX
+        out: List[str] = []
+
+        def series(metric: str, labels: Dict, value) -> None:
+            rendered = ",".join(f'{k}="{_escape_label(str(v))}"' for k, v in labels.items())
+            out.append(f"{metric}{{{rendered}}} {value}" if rendered else f"{metric} {value}")
+
+        with self._lock:
+            spans = dict(self.spans)
+            counters = dict(self.counters)
+            selectors = dict(self.selectors)
+
+        for metric, column, kind, help_text in (
+            (f"{p}_phase_seconds_total", 1, "counter", "Tempo total gasto na fase"),
+            (f"{p}_phase_calls_total", 0, "counter", "Execuções da fase"),
+            (f"{p}_phase_seconds_max", 2, "gauge", "Execução mais lenta da fase"),
+        ):
+            out += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            for (name, labels), stats in spans.items():
+                series(metric, {"phase": name, **dict(labels)}, round(stats[column], 6))
+
+        # HELP/TYPE uma vez por métrica, com todas as séries dela em seguida
+        by_metric: Dict[str, List] = {}
+        for (name, labels), value in counters.items():
+            by_metric.setdefault(f"{p}_{_metric_name(name)}_total", []).append((name, labels, value))
+        for metric, rows in by_metric.items():
+            out += [f"# HELP {metric} Contador {rows[0][0]}", f"# TYPE {metric} counter"]
+            for _, labels, value in rows:
+                series(metric, dict(labels), value)
+
+        for metric, column, help_text in (
+            (f"{p}_selector_hits_total", 0, "Buscas de seletor com resultado"),
+            (f"{p}_selector_fallbacks_total", 1, "Buscas de seletor que caíram no valor padrão"),
+            (f"{p}_selector_seconds_total", 2, "Tempo gasto nas buscas de seletor"),
+        ):
+            out += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for (sel, kind), stats in selectors.items():
+                series(metric, {"selector": sel, "kind": kind}, round(stats[column], 6))
+        return "\n".join(out) + "\n"
+
+    # --- Saída ---
+
+    def close(self) -> Optional[str]:
+        """
+        Grava o resumo (JSON lines) ou o textfile (Prometheus).
+
+        Retorna:
+              Caminho gravado (ou None se desativado / sem destino)
+        """
+        if not self.enabled or not self.path:
+            return None
+        if self.format == "prometheus":
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            # Escrita atômica: o node_exporter nunca lê um arquivo pela metade
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp, self.path)
+        else:
+            self._write_event({"ts": round(time.time(), 3), "type": "summary", **self.snapshot()})
+            with self._lock:
+                if self._events is not None:
+                    self._events.close()
+                    self._events = None
+        return self.path
+
+
+# =====================================================================
+# INSTÂNCIA GLOBAL (usada pelos scrapers)
+# =====================================================================
+
+_current = Instrumentation(os.environ.get("FINDPRODUCT_METRICS") or None,
+                           enabled=bool(os.environ.get("FINDPRODUCT_METRICS")))
+QUIET = os.environ.get("FINDPRODUCT_QUIET", "") not in ("", "0")
+
+
+def configure(path: Optional[str] = None, enabled: bool = True) -> Instrumentation:
+    """Troca a instância global (ex.: destino vindo da configuração do script)"""
+    global _current
+    _current = Instrumentation(path, enabled=enabled)
+    return _current
+
+
+def current() -> Instrumentation:
+    return _current
+
+
+def enabled() -> bool:
+    return _current.enabled
+
+
+def span(name: str, **labels):
+    if not _current.enabled:
+        return _NULL_SPAN
+    return _current.span(name, **labels)
+
+
+def observe(name: str, seconds: float, **labels) -> None:
+    if _current.enabled:
+        _current.observe(name, seconds, **labels)
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    if _current.enabled:
+        _current.count(name, value, **labels)
+
+
+def selector(selector: str, kind: str, found: bool, seconds: float = 0.0) -> None:
+    if _current.enabled:
+        _current.selector(selector, kind, found, seconds)
+
+
+def close() -> Optional[str]:
+    return _current.close()
+
+
+# Marcadores das mensagens de erro/aviso dos scrapers (⚠ sem o seletor de variação)
+ALERT_MARKERS = ("❌", "⚠", "🔴")
+
+
+class _QuietStream:
+    """stdout do modo quieto: descarta as linhas comuns e repassa erros/avisos ao stderr"""
+
+    def __init__(self, target=None):
+        self.target = target
+        self._buffer = ""
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            self._buffer += text
+            *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._forward(line)
+        return len(text)
+
+    def _forward(self, line: str) -> None:
+        if any(marker in line for marker in ALERT_MARKERS):
+            target = self.target or sys.stderr
+            target.write(line.strip("\n") + "\n")
+            target.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            line, self._buffer = self._buffer, ""
+        if line:
+            self._forward(line)
+
+
+@contextlib.contextmanager
+def quiet_output(quiet: bool = QUIET) -> Iterator[None]:
+    """
+    Modo produção: descarta os banners (stdout) do bloco. As linhas de erro
+    e aviso (com ❌, ⚠️ ou 🔴) continuam visíveis, pelo stderr.
+    """
+    if not quiet:
+        yield
+        return
+    stream = _QuietStream()
+    try:
+        with contextlib.redirect_stdout(stream):
+            yield
+    finally:
+        stream.flush()
+
+
+def report(stream=None) -> None:
+    """Imprime o resumo e o destino das métricas (stderr no modo quieto)"""
+    if not _current.enabled:
+        return
+    stream = stream or (sys.stderr if QUIET else sys.stdout)
+    print("\n📈 Tempo por fase / seletores:", file=stream)
+    for line in _current.summary_lines():
+        print(f"   • {line}", file=stream)
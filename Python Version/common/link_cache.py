@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Cache persistente (SQLite) dos links de afiliado, por ID canônico do produto.
+
+Um link gerado continua válido por dias: reexecuções sobre uma lista de
+ofertas quase igual só precisam gerar links para os produtos novos.
+
+    TTL          → entradas mais antigas que `ttl` segundos contam como miss
+    Limite LRU   → acima de `max_entries`, remove as usadas há mais tempo
+
+Uso:
+    cache = LinkCache()
+    encontrados = cache.get_many(["MLB123", "MLB456"])
+    cache.put_many({"MLB789": ("https://...MLB-789", "https://mercadolivre.com/sec/abc")})
+    print(cache.stats)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from common.driver_pool import CACHE_DIR
+
+DEFAULT_CACHE_PATH = os.environ.get("AFILIADO_CACHE", os.path.join(CACHE_DIR, "affiliate_links.db"))
+DEFAULT_TTL = 30 * 24 * 3600   # 30 dias
+DEFAULT_MAX_ENTRIES = 50_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS affiliate_links (
+    product_id  TEXT PRIMARY KEY,
+    source_url  TEXT,
+    link        TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    last_used   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_affiliate_links_last_used ON affiliate_links (last_used);
+"""
+
+
+class LinkCache:
+    """
+    Cache de links de afiliado com TTL, limite LRU e estatísticas.
+
+    Args:
+          path: Arquivo SQLite (":memory:" para testes)
+          ttl: Validade de um link (s); None = não expira
+          max_entries: Máximo de links guardados (LRU); None = sem limite
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: Optional[float] = DEFAULT_TTL,
+                 max_entries: Optional[int] = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "stored": 0}
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    # --- Leitura ---
+
+    def get(self, product_id: str) -> Optional[str]:
+        """Link em cache (ou None se ausente/expirado)"""
+        return self.get_many([product_id]).get(product_id)
+
+    def get_many(self, product_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        Busca vários IDs de uma vez (atualiza o uso das entradas encontradas).
+
+        Retorna:
+              ID → link, só para os válidos (hits)
+        """
+        ids = list(dict.fromkeys(p for p in product_ids if p))
+        now = time.time()
+        found: Dict[str, str] = {}
+        expired = []
+
+        with self._lock:
+            # SQLite limita o número de parâmetros: consulta em blocos
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT product_id, link, created_at FROM affiliate_links "
+                    f"WHERE product_id IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for product_id, link, created_at in rows:
+                    if self.ttl is not None and now - created_at > self.ttl:
+                        expired.append(product_id)
+                    else:
+                        found[product_id] = link
+
+            with self._conn:
+                if found:
+                    self._conn.executemany(
+                        "UPDATE affiliate_links SET last_used = ? WHERE product_id = ?",
+                        [(now, p) for p in found],
+                    )
+                if expired:
+                    self._conn.executemany("DELETE FROM affiliate_links WHERE product_id = ?",
+                                           [(p,) for p in expired])
+
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(ids) - len(found)
+            self.stats["expired"] += len(expired)
+        return found
+
+    # --- Escrita ---
+
+    def put(self, product_id: str, link: str, source_url: Optional[str] = None) -> None:
+        self.put_many({product_id: (source_url, link)})
+
+    def put_many(self, entries: Dict[str, Tuple[Optional[str], str]]) -> int:
+        """
+        Grava vários links (ID → (URL de origem, link)) e aplica o limite LRU.
+
+        Retorna:
+              Número de links gravados
+        """
+        now = time.time()
+        rows = [(p, source, link, now, now) for p, (source, link) in entries.items() if p and link]
+        if not rows:
+            return 0
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO affiliate_links "
+                    "(product_id, source_url, link, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self.stats["stored"] += len(rows)
+                self._evict()
+        return len(rows)
+
+    def _evict(self) -> None:
+        if self.max_entries is None:
+            return
+        total = self._conn.execute("SELECT COUNT(*) FROM affiliate_links").fetchone()[0]
+        excess = total - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM affiliate_links WHERE product_id IN "
+                "(SELECT product_id FROM affiliate_links ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self.stats["evicted"] += excess
+
+    # --- Manutenção ---
+
+    def purge_expired(self) -> int:
+        """Remove todas as entradas vencidas. Retorna quantas"""
+        if self.ttl is None:
+            return 0
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM affiliate_links WHERE created_at < ?",
+                                        (time.time() - self.ttl,))
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM affiliate_links").fetchone()[0]
+
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
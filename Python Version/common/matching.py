@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+Casamento de produtos entre marketplaces (Amazon × Mercado Livre).
+
+Comparar todos os títulos com todos é O(n·m). Aqui cada título vira um
+conjunto de tokens normalizados (marca, modelo, capacidade) e entra num
+índice invertido token → produtos, separado por marketplace. Para achar os
+candidatos de um produto só são percorridas as listas dos tokens raros dele
+(os muito frequentes, como "kit" ou "preto", são ignorados), e a similaridade
+exata (Jaccard ponderado por IDF) é calculada só para os melhores candidatos.
+
+    index = MatchIndex()
+    index.sync_from_store(ProductStore())       # incremental: só o que mudou
+    pares = index.match("amazon", "mercadolivre", min_score=0.6)
+    linhas = price_gap_report(index, pares)
+    index.save("match_index.json.gz")
+"""
+
+import gzip
+import json
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_INDEX_PATH = "match_index.json.gz"
+
+# Palavras sem valor para identificar o produto
+STOPWORDS = {
+    "a", "o", "as", "os", "e", "de", "da", "do", "das", "dos", "em", "com", "sem", "para", "por",
+    "p", "c", "um", "uma", "no", "na", "nos", "nas", "ao", "the", "and", "with", "for", "of",
+    "novo", "nova", "original", "oferta", "promocao", "frete", "gratis", "envio", "imediato",
+    "lancamento", "cor", "unidade", "unidades", "un", "kit",
+}
+
+# Unidades de capacidade/medida (com sinônimos) → forma canônica
+UNITS = {
+    "gb": "gb", "giga": "gb", "gigas": "gb", "tb": "tb", "mb": "mb",
+    "ml": "ml", "l": "l", "lt": "l", "litro": "l", "litros": "l",
+    "kg": "kg", "gr": "g", "gramas": "g", "mg": "mg",   # "g" sozinho fica de fora: "5g" é rede
+    "w": "w", "watts": "w", "v": "v", "volts": "v", "mah": "mah", "hz": "hz",
+    "pol": "pol", "polegadas": "pol", "\"": "pol", "cm": "cm", "mm": "mm", "m": "m",
+}
+_UNIT_PATTERN = "|".join(sorted((re.escape(u) for u in UNITS), key=len, reverse=True))
+_MEASURE_RE = re.compile(rf"(\d+(?:[.,]\d+)?)\s*({_UNIT_PATTERN})(?![a-z0-9])")
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-/.][a-z0-9]+)*")
+
+MAX_DF_RATIO = 0.05     # Tokens em mais de 5% dos produtos não geram candidatos...
+MIN_DF_CUTOFF = 50      # ...desde que apareçam em mais de 50 produtos
+CANDIDATES_PER_ITEM = 20
+MODEL_BONUS = 0.15      # Mesmo código de modelo nos dois títulos
+CAPACITY_PENALTY = 0.5  # Capacidades diferentes na mesma unidade (128gb × 256gb)
+
+
+# ============================================================================
+# NORMALIZAÇÃO
+# ============================================================================
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def normalize_title(title: Optional[str]) -> Dict[str, Set[str]]:
+    """
+    Quebra o título em tokens normalizados.
+
+    Exemplo: 'Smartphone Samsung Galaxy A54 5G 128 GB Preto'
+          → capacities {"128gb"}, models {"a54", "5g"}, tokens {"smartphone", "samsung", ...}
+
+    Retorna:
+          {"tokens": todos, "models": códigos com letras+dígitos, "capacities": medidas}
+    """
+    text = _strip_accents((title or "").lower())
+    capacities = set()
+
+    def measure(match) -> str:
+        number = match.group(1).replace(",", ".")
+        if "." in number:
+            number = number.rstrip("0").rstrip(".")
+        token = f"{number}{UNITS[match.group(2)]}"
+        capacities.add(token)
+        return f" {token} "
+
+    text = _MEASURE_RE.sub(measure, text)
+    tokens, models = set(), set()
+    for raw in _TOKEN_RE.findall(text):
+        token = raw.replace("/", "-").replace(".", "") if not raw[0].isdigit() else raw
+        if token in STOPWORDS or len(token) < 2 and not token.isdigit():
+            continue
+        tokens.add(token)
+        compact = token.replace("-", "")
+        if token not in capacities and re.search(r"\d", compact) and re.search(r"[a-z]", compact):
+            models.add(compact)
+            if compact != token:
+                tokens.add(compact) # "sm-a546" também casa com "sma546"
+    return {"tokens": tokens, "models": models, "capacities": capacities}
+
+
+def _capacity_conflict(a: Set[str], b: Set[str]) -> bool:
+    """True se os dois títulos têm medidas na mesma unidade, mas nenhuma em comum"""
+    if not a or not b or a & b:
+        return False
+    units_a = {re.sub(r"^[\d.]+", "", t) for t in a}
+    units_b = {re.sub(r"^[\d.]+", "", t) for t in b}
+    return bool(units_a & units_b)
+
+
+# ============================================================================
+# ÍNDICE
+# ============================================================================
+
+class MatchIndex:
+    """Índice invertido de títulos, por marketplace, com atualização incremental"""
+
+    def __init__(self):
+        self.docs: Dict[str, Dict] = {}
+        self.postings: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self.df: Dict[str, int] = defaultdict(int)
+        self.synced_at: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # --- Atualização ---
+
+    def add(self, product_id: str, title: str, marketplace: str, price_cents: Optional[int] = None,
+            link: Optional[str] = None) -> None:
+        """Insere ou atualiza um produto (título novo → tokens reindexados)"""
+        current = self.docs.get(product_id)
+        if current and current["title"] == title and current["marketplace"] == marketplace:
+            current.update(price_cents=price_cents, link=link or current.get("link"))
+            return
+        if current:
+            self.remove(product_id)
+
+        features = normalize_title(title)
+        self.docs[product_id] = {
+            "title": title, "marketplace": marketplace, "price_cents": price_cents, "link": link,
+            **features,
+        }
+        for token in features["tokens"]:
+            self.postings[marketplace][token].add(product_id)
+            self.df[token] += 1
+
+    def remove(self, product_id: str) -> None:
+        doc = self.docs.pop(product_id, None)
+        if not doc:
+            return
+        for token in doc["tokens"]:
+            self.postings[doc["marketplace"]][token].discard(product_id)
+            self.df[token] -= 1
+            if self.df[token] <= 0:
+                del self.df[token]
+
+    def update(self, records: Iterable[Dict]) -> int:
+        """Upsert de linhas no formato do store (product_id, title, marketplace, price_cents, link)"""
+        count = 0
+        for record in records:
+            if record.get("product_id") and record.get("title"):
+                self.add(record["product_id"], record["title"], record["marketplace"],
+                         record.get("price_cents"), record.get("link"))
+                count += 1
+        return count
+
+    def sync_from_store(self, store) -> int:
+        """
+        Traz do ProductStore só os produtos vistos desde a última sincronização.
+
+        Retorna:
+              Quantos produtos foram (re)indexados
+        """
+        started = datetime.now(timezone.utc).replace(tzinfo=None)
+        count = self.update(store.iter_products(since=self.synced_at))
+        self.synced_at = started
+        return count
+
+    # --- Consulta ---
+
+    def idf(self, token: str) -> float:
+        return math.log(1 + len(self.docs) / max(1, self.df.get(token, 0)))
+
+    def similarity(self, a: Dict, b: Dict) -> float:
+        """Jaccard ponderado por IDF, com bônus de modelo e penalidade de capacidade"""
+        shared = a["tokens"] & b["tokens"]
+        if not shared:
+            return 0.0
+        union = a["tokens"] | b["tokens"]
+        score = sum(self.idf(t) for t in shared) / sum(self.idf(t) for t in union)
+        if a["models"] & b["models"]:
+            score = min(1.0, score + MODEL_BONUS)
+        if _capacity_conflict(a["capacities"], b["capacities"]):
+            score *= CAPACITY_PENALTY
+        return round(score, 4)
+
+    def candidates(self, product_id: str, marketplace: str, limit: int = CANDIDATES_PER_ITEM) -> List[str]:
+        """Produtos de `marketplace` que compartilham tokens raros com `product_id`"""
+        doc = self.docs[product_id]
+        max_df = max(MIN_DF_CUTOFF, MAX_DF_RATIO * len(self.docs))
+        scores: Dict[str, float] = defaultdict(float)
+        postings = self.postings.get(marketplace, {})
+        for token in doc["tokens"]:
+            if self.df.get(token, 0) > max_df:
+                continue
+            weight = self.idf(token) * (2.0 if token in doc["models"] else 1.0)
+            for other in postings.get(token, ()):
+                scores[other] += weight
+        return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+    def match(self, left: str = "amazon", right: str = "mercadolivre", min_score: float = 0.6,
+              top_k: int = 1) -> List[Tuple[str, str, float]]:
+        """
+        Pares (produto de `left`, produto de `right`, similaridade) acima de `min_score`.
+
+        Retorna:
+              Lista ordenada pela similaridade (até `top_k` pares por produto de `left`)
+        """
+        pairs = []
+        for product_id, doc in self.docs.items():
+            if doc["marketplace"] != left:
+                continue
+            scored = [(other, self.similarity(doc, self.docs[other])) for other in self.candidates(product_id, right)]
+            scored = sorted((s for s in scored if s[1] >= min_score), key=lambda s: s[1], reverse=True)
+            pairs.extend((product_id, other, score) for other, score in scored[:top_k])
+        return sorted(pairs, key=lambda p: p[2], reverse=True)
+
+    # --- Persistência ---
+
+    def save(self, path: str = DEFAULT_INDEX_PATH) -> None:
+        """Grava os produtos indexados (as listas invertidas são refeitas no load)"""
+        data = {
+            "synced_at": self.synced_at.isoformat() if self.synced_at else None,
+            "docs": {pid: {k: doc[k] for k in ("title", "marketplace", "price_cents", "link")}
+                     for pid, doc in self.docs.items()},
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_PATH) -> "MatchIndex":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls()
+        index.update(dict(doc, product_id=pid) for pid, doc in data["docs"].items())
+        if data.get("synced_at"):
+            index.synced_at = datetime.fromisoformat(data["synced_at"])
+        return index
+
+
+# ============================================================================
+# RELATÓRIO
+# ============================================================================
+
+REPORT_COLUMNS = [
+    "score", "left_id", "left_title", "left_price_cents", "right_id", "right_title", "right_price_cents",
+    "gap_cents", "gap_pct", "cheaper", "left_link", "right_link",
+]
+
+
+def price_gap_report(index: MatchIndex, pairs: List[Tuple[str, str, float]],
+                     min_gap_pct: float = 0.0) -> List[Dict]:
+    """
+    Diferença de preço de cada par casado.
+
+    gap_cents = preço à esquerda − preço à direita (positivo: direita mais barata);
+    gap_pct é relativo ao mais barato.
+
+    Retorna:
+          Linhas (REPORT_COLUMNS), da maior diferença percentual para a menor
+    """
+    rows = []
+    for left_id, right_id, score in pairs:
+        left, right = index.docs[left_id], index.docs[right_id]
+        lp, rp = left.get("price_cents"), right.get("price_cents")
+        if not lp or not rp:
+            continue
+        gap = lp - rp
+        gap_pct = round(abs(gap) / min(lp, rp) * 100, 2)
+        if gap_pct < min_gap_pct:
+            continue
+        rows.append({
+            "score": score,
+            "left_id": left_id, "left_title": left["title"], "left_price_cents": lp,
+            "right_id": right_id, "right_title": right["title"], "right_price_cents": rp,
+            "gap_cents": gap,
+            "gap_pct": gap_pct,
+            "cheaper": "=" if gap == 0 else (right["marketplace"] if gap > 0 else left["marketplace"]),
+            "left_link": left.get("link"), "right_link": right.get("link"),
+        })
+    return sorted(rows, key=lambda r: r["gap_pct"], reverse=True)
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Captura das respostas de rede (XHR/fetch/documento) que alimentam as listagens.
+
+O scroll infinito das lojas busca os produtos em JSON (ou em fragmentos de
+HTML embrulhados em JSON) antes de renderizar os cards. Em vez de ler o DOM
+depois, lemos essas respostas direto do Chrome:
+
+    1. O log de performance (mesmo usado pelos contadores de bloqueio) traz
+       os eventos Network.responseReceived / Network.loadingFinished;
+    2. O corpo de cada resposta relevante vem de Network.getResponseBody
+       (precisa ser lido antes de sair da página).
+
+O log de performance é esvaziado a cada leitura: quem também precisa das
+mensagens (ex.: collect_blocking_stats) deve recebê-las da captura.
+
+Uso:
+    from common.resource_blocking import read_performance_log
+
+    capture = NetworkCapture([r"mercadolivre\\.com\\.br"])
+    capture.enable(driver)                              # logo após criar o driver
+    messages = read_performance_log(driver)             # após o scroll
+    for response in capture.collect(driver, messages):
+        for payload in parse_json_body(response.body): ...
+"""
+
+import base64
+import json
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Sequence, Set
+
+# Tipos de recurso do CDP que podem trazer produtos
+DEFAULT_RESOURCE_TYPES = ("XHR", "Fetch", "Document")
+
+# Respostas maiores que isso são ignoradas (ex.: bundles JS servidos como JSON)
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+# Buffer do Chrome para corpos de resposta (o padrão descarta os antigos rápido demais)
+RESOURCE_BUFFER_BYTES = 64 * 1024 * 1024
+
+# Prefixos anti-XSSI que algumas APIs colocam antes do JSON
+_XSSI_PREFIXES = (")]}'", "while(1);", "for(;;);")
+
+# Separador das respostas em streaming da busca da Amazon (/s/query)
+_CHUNK_SEPARATOR = "&&&"
+
+
+class CapturedResponse(NamedTuple):
+    request_id: str
+    url: str
+    mime_type: str
+    resource_type: str
+    body: str
+
+
+def _is_textual(mime_type: str, resource_type: str) -> bool:
+    mime_type = (mime_type or "").lower()
+    if resource_type == "Document":
+        return "html" in mime_type
+    return "json" in mime_type or "javascript" in mime_type or mime_type.startswith("text/")
+
+
+class NetworkCapture:
+    """
+    Seleciona e baixa os corpos das respostas relevantes de uma página.
+
+    Args:
+          url_patterns: Regex das URLs a capturar (vazio = todas)
+          resource_types: Tipos de recurso do CDP aceitos
+          max_body_bytes: Tamanho máximo (encodedDataLength) de um corpo
+    """
+
+    def __init__(self, url_patterns: Sequence[str] = (),
+                 resource_types: Sequence[str] = DEFAULT_RESOURCE_TYPES,
+                 max_body_bytes: int = MAX_BODY_BYTES):
+        self.url_patterns: List[Pattern] = [re.compile(p) for p in url_patterns]
+        self.resource_types = set(resource_types)
+        self.max_body_bytes = max_body_bytes
+        self.seen: Set[str] = set()
+
+    def enable(self, driver) -> None:
+        """Liga o domínio Network com um buffer de corpos maior"""
+        driver.execute_cdp_cmd("Network.enable", {
+            "maxTotalBufferSize": RESOURCE_BUFFER_BYTES,
+            "maxResourceBufferSize": self.max_body_bytes,
+        })
+
+    def matches(self, url: str) -> bool:
+        return not self.url_patterns or any(p.search(url) for p in self.url_patterns)
+
+    def finished_responses(self, messages: Iterable[Dict]) -> List[Dict]:
+        """
+        Respostas relevantes que terminaram de carregar, na ordem de chegada.
+
+        Retorna:
+              Lista de {"requestId", "url", "mimeType", "type"}
+        """
+        pending: Dict[str, Dict] = {}
+        finished: List[Dict] = []
+        for message in messages:
+            method = message.get("method")
+            params = message.get("params", {})
+            request_id = params.get("requestId")
+            if method == "Network.responseReceived":
+                response = params.get("response", {})
+                resource_type = params.get("type", "Other")
+                url = response.get("url", "")
+                if (request_id not in self.seen and resource_type in self.resource_types
+                        and response.get("status", 0) < 400
+                        and _is_textual(response.get("mimeType", ""), resource_type)
+                        and self.matches(url)):
+                    pending[request_id] = {"requestId": request_id, "url": url,
+                                           "mimeType": response.get("mimeType", ""), "type": resource_type}
+            elif method == "Network.loadingFinished" and request_id in pending:
+                entry = pending.pop(request_id)
+                if int(params.get("encodedDataLength", 0)) <= self.max_body_bytes:
+                    finished.append(entry)
+        return finished
+
+    def collect(self, driver, messages: Iterable[Dict],
+                send: Optional[Callable[[str, Dict], Dict]] = None) -> List[CapturedResponse]:
+        """
+        Baixa os corpos das respostas ainda não capturadas.
+
+        Args:
+              driver: WebDriver (usa execute_cdp_cmd)
+              messages: Mensagens já lidas do log de performance
+              send: Alternativa a driver.execute_cdp_cmd (ex.: sessão CDP própria)
+
+        Retorna:
+              Respostas com corpo (as que o Chrome já descartou ficam de fora)
+        """
+        send = send or driver.execute_cdp_cmd
+        captured: List[CapturedResponse] = []
+        for entry in self.finished_responses(messages):
+            self.seen.add(entry["requestId"])
+            try:
+                result = send("Network.getResponseBody", {"requestId": entry["requestId"]})
+            except Exception:
+                continue # Corpo já descartado do buffer (ou resposta sem corpo)
+            body = result.get("body", "")
+            if result.get("base64Encoded"):
+                try:
+                    body = base64.b64decode(body).decode("utf-8", errors="replace")
+                except ValueError:
+                    continue
+            if body:
+                captured.append(CapturedResponse(entry["requestId"], entry["url"], entry["mimeType"],
+                                                 entry["type"], body))
+        return captured
+
+    def reset(self) -> None:
+        """Esquece as respostas já capturadas (nova página)"""
+        self.seen.clear()
+
+
+# ============================================================================
+# INTERPRETAÇÃO DOS CORPOS
+# ============================================================================
+
+def parse_json_body(body: str) -> List:
+    """
+    Interpreta um corpo JSON, tolerando prefixos anti-XSSI e respostas em
+    streaming com vários documentos separados por "&&&".
+
+    Retorna:
+          Lista de documentos JSON (vazia se o corpo não for JSON)
+    """
+    text = body.lstrip()
+    for prefix in _XSSI_PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix):].lstrip()
+    chunks = text.split(_CHUNK_SEPARATOR) if _CHUNK_SEPARATOR in text else [text]
+    documents = []
+    for chunk in chunks:
+        chunk = chunk.strip()
+        if not chunk or chunk[0] not in "[{":
+            continue
+        try:
+            documents.append(json.loads(chunk))
+        except ValueError:
+            continue
+    return documents
+
+
+def iter_dicts(document) -> Iterator[Dict]:
+    """Percorre (sem recursão) todos os objetos de um documento JSON"""
+    stack = [document]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            yield node
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+
+def dedupe(products: Iterable[Dict], key: Callable[[Dict], Optional[str]],
+           seen: Optional[Set[str]] = None) -> List[Dict]:
+    """
+    Remove repetidos pela chave (ex.: ID do anúncio). Produtos sem chave são mantidos.
+
+    Args:
+          seen: Chaves já vistas (atualizado no lugar)
+    """
+    seen = set() if seen is None else seen
+    unique = []
+    for product in products:
+        value = key(product)
+        if value:
+            if value in seen:
+                continue
+            seen.add(value)
+        unique.append(product)
+    return unique
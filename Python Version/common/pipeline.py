@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline em streaming: coleta → normalização → dedupe → store → exportação.
+
+A fonte (gerador dos scrapers) é consumida na thread de quem chamou; cada
+etapa roda na sua própria thread, ligada à seguinte por uma fila limitada
+(`queue_size`). Assim a memória fica constante e as primeiras linhas chegam
+ao destino enquanto o navegador ainda está coletando.
+
+Uso:
+    stats = run_pipeline(iter_produtos(), [
+        Stage("dedupe", dedupe_by(lambda p: p["Link"])),
+        Stage("store", gravar_lote, batch_size=500),
+    ])
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+_END = object()
+
+
+class Stage:
+    """
+    Etapa do pipeline.
+
+    Args:
+          name: Nome (para estatísticas/logs)
+          fn: Sem batch_size: fn(item) → item ou None (descarta).
+              Com batch_size: fn(lista) → lista (ou None = repassa a própria lista)
+          batch_size: Agrupa itens em lotes desse tamanho (None = item a item)
+          flush_interval: Envia o lote incompleto após esse tempo sem completar (s)
+    """
+
+    def __init__(self, name: str, fn: Callable, batch_size: Optional[int] = None,
+                 flush_interval: float = 2.0):
+        self.name = name
+        self.fn = fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.items_in = 0
+        self.items_out = 0
+        self.seconds = 0.0
+        self.input_done = False
+
+    def _emit(self, outputs, downstream: Optional[queue.Queue]) -> None:
+        for item in outputs:
+            self.items_out += 1
+            if downstream is not None:
+                downstream.put(item)
+
+    def _call(self, payload):
+        start = time.perf_counter()
+        try:
+            return self.fn(payload)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def run(self, upstream: queue.Queue, downstream: Optional[queue.Queue]) -> None:
+        """Loop da thread: lê de `upstream`, processa e escreve em `downstream`"""
+        batch: List = []
+        last_flush = time.monotonic()
+
+        def flush() -> None:
+            nonlocal batch, last_flush
+            if batch:
+                result = self._call(batch)
+                self._emit(batch if result is None else result, downstream)
+                batch = []
+            last_flush = time.monotonic()
+
+        while True:
+            timeout = None
+            if self.batch_size and batch:
+                timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                item = upstream.get(timeout=timeout)
+            except queue.Empty:
+                flush()
+                continue
+
+            if item is _END:
+                self.input_done = True
+                flush()
+                break
+
+            self.items_in += 1
+            if self.batch_size:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    flush()
+            else:
+                result = self._call(item)
+                if result is not None:
+                    self._emit([result], downstream)
+
+        if downstream is not None:
+            downstream.put(_END)
+
+
+def dedupe_by(key_fn: Callable[[Dict], object]) -> Callable[[Dict], Optional[Dict]]:
+    """Etapa item a item que descarta itens com chave já vista (chave None = sempre repassa)"""
+    seen = set()
+    lock = threading.Lock()
+
+    def dedupe(item: Dict) -> Optional[Dict]:
+        key = key_fn(item)
+        if key is None:
+            return item
+        with lock:
+            if key in seen:
+                return None
+            seen.add(key)
+        return item
+
+    return dedupe
+
+
+def run_pipeline(source: Iterable, stages: List[Stage], queue_size: int = 100) -> Dict:
+    """
+    Executa o pipeline até a fonte acabar (ou falhar).
+
+    Erros/Ctrl+C na fonte encerram o pipeline depois de esvaziar as etapas
+    (o que já foi coletado chega aos destinos) e são relançados. Um erro
+    em uma etapa interrompe a fonte e é relançado.
+
+    Retorna:
+          Estatísticas: itens da fonte, tempo total e in/out/segundos por etapa
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    errors: List[BaseException] = []
+
+    def guarded(stage: Stage, upstream: queue.Queue, downstream: Optional[queue.Queue]) -> None:
+        try:
+            stage.run(upstream, downstream)
+        except BaseException as e:
+            errors.append(e)
+            # Continua drenando para não travar quem está escrevendo na fila
+            while not stage.input_done and upstream.get() is not _END:
+                pass
+            if downstream is not None:
+                downstream.put(_END)
+
+    threads = []
+    for idx, stage in enumerate(stages):
+        downstream = queues[idx + 1] if idx + 1 < len(stages) else None
+        thread = threading.Thread(target=guarded, args=(stage, queues[idx], downstream),
+                                  name=f"pipeline-{stage.name}", daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    start = time.perf_counter()
+    produced = 0
+    try:
+        for item in source:
+            if errors:
+                break
+            produced += 1
+            if stages:
+                queues[0].put(item)
+    finally:
+        # Fonte interrompida antes do fim (erro em etapa): libera o gerador
+        if errors and hasattr(source, "close"):
+            source.close()
+        if stages:
+            queues[0].put(_END)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return {
+        "produced": produced,
+        "seconds": time.perf_counter() - start,
+        "stages": {
+            s.name: {"in": s.items_in, "out": s.items_out, "seconds": round(s.seconds, 3)}
+            for s in stages
+        },
+    }
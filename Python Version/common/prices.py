@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Conversão dos preços exibidos (strings em R$) para centavos inteiros.
+
+    parse_brl_cents          → 1 valor (usado pelo store)
+    normalize_price_columns  → DataFrame inteiro, vetorizado (pandas/NumPy)
+"""
+
+import re
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Valores que os scrapers usam quando o campo não existe na página
+MISSING_SENTINELS = {"", "Not Found", "Não informado", "Não encontrado", "None", "nan"}
+
+_NUMBER_PATTERN = re.compile(r"\d[\d.]*(?:,\d{1,2})?")
+
+
+def parse_brl_cents(text) -> Optional[int]:
+    """
+    Converte um preço brasileiro em centavos.
+
+    Exemplos: "1.299" → 129900 | "999,90" → 99990 | "R$ 1.299,90" → 129990
+
+    Retorna:
+          Centavos (int) ou None se o valor estiver ausente/ilegível
+    """
+    if text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return int(round(float(text) * 100))
+    text = str(text).strip()
+    if text in MISSING_SENTINELS:
+        return None
+    match = _NUMBER_PATTERN.search(text)
+    if not match:
+        return None
+    number = match.group(0)
+    whole, _, cents = number.partition(",")
+    whole = whole.replace(".", "")
+    if not whole:
+        return None
+    return int(whole) * 100 + int(cents.ljust(2, "0") if cents else 0)
+
+
+# ============================================================================
+# NORMALIZAÇÃO VETORIZADA (LOTE INTEIRO DE UMA VEZ)
+# ============================================================================
+
+# "12x R$ 99,90", "em 10x de R$ 1.299,00 sem juros", "12x R$ 99 90" (centavos em outro span)
+_INSTALLMENTS_PATTERN = r"(\d+)\s*x\s*(?:de\s*)?R\$\s*(\d[\d.]*)(?:[,\s](\d{2}))?"
+_PRICE_PATTERN = r"(\d[\d.]*)(?:,(\d{1,2}))?"
+
+# Colunas numéricas adicionadas pela normalização
+PRICE_COLUMNS = [
+    "Price_Cents", "Original_Price_Cents", "Price_Missing",
+    "Installment_Count", "Installment_Cents", "Discount_Pct",
+]
+
+# Tipos das colunas numéricas (usados pelos exportadores tipados, ex.: Parquet)
+PRICE_COLUMN_TYPES = {
+    "Price_Cents": "int64",
+    "Original_Price_Cents": "int64",
+    "Price_Missing": "bool",
+    "Installment_Count": "int64",
+    "Installment_Cents": "int64",
+    "Discount_Pct": "float64",
+}
+
+# Nomes das colunas numéricas nas planilhas
+PRICE_COLUMN_NAMES = {
+    "Price_Cents": "Preço (centavos)",
+    "Original_Price_Cents": "Preço Original (centavos)",
+    "Price_Missing": "Preço Ausente",
+    "Installment_Count": "Parcelas",
+    "Installment_Cents": "Valor Parcela (centavos)",
+    "Discount_Pct": "Desconto %",
+}
+
+
+def _cents_from_parts(whole, cents):
+    """Converte as partes (inteiro com pontos, centavos) extraídas em centavos (Int64)"""
+    whole = pd.to_numeric(whole.str.replace(".", "", regex=False), errors="coerce")
+    cents = pd.to_numeric(cents.str.ljust(2, "0"), errors="coerce").fillna(0)
+    return (whole * 100 + cents).round().astype("Int64")
+
+
+def price_series_to_cents(series):
+    """
+    Versão vetorizada de parse_brl_cents para uma coluna inteira.
+
+    Retorna:
+          Série Int64 (centavos) com <NA> onde o preço está ausente/ilegível
+    """
+    text = series.astype("string").str.strip()
+    text = text.mask(text.isin(MISSING_SENTINELS))
+    parts = text.str.extract(_PRICE_PATTERN)
+    return _cents_from_parts(parts[0], parts[1].astype("string"))
+
+
+def installments_to_columns(series):
+    """
+    Interpreta o texto de parcelamento.
+
+    Retorna:
+          (Série Int64 com nº de parcelas, Série Int64 com valor da parcela em centavos)
+    """
+    text = series.astype("string")
+    parts = text.str.extract(_INSTALLMENTS_PATTERN, flags=re.IGNORECASE)
+    count = pd.to_numeric(parts[0].astype("string"), errors="coerce").astype("Int64")
+    amount = _cents_from_parts(parts[1].astype("string"), parts[2].astype("string"))
+    return count, amount
+
+
+def discount_pct(price_cents, original_cents):
+    """
+    Desconto (%) vetorizado: (original - preço) / original.
+
+    Retorna:
+          Série float com NaN quando não há preço original maior que o atual
+    """
+    price = price_cents.astype("float64")
+    original = original_cents.astype("float64")
+    valid = (original > 0) & (price > 0) & (original > price)
+    pct = np.where(valid.fillna(False).to_numpy(), (original - price) / original * 100.0, np.nan)
+    return pd.Series(pct, index=price_cents.index).round(2)
+
+
+def normalize_price_columns(df, price_col: str, original_col: Optional[str] = None,
+                            installments_col: Optional[str] = None):
+    """
+    Adiciona as colunas numéricas (PRICE_COLUMNS) ao DataFrame de produtos.
+
+    Args:
+          df: DataFrame montado pelos scrapers
+          price_col: Coluna do preço atual ("Discount_Value" no ML, "Preço" na Amazon)
+          original_col: Coluna do preço antigo (opcional)
+          installments_col: Coluna com o texto de parcelamento (opcional)
+
+    Retorna:
+          O mesmo DataFrame, com as colunas novas
+    """
+    empty = pd.Series(pd.NA, index=df.index, dtype="string")
+
+    df["Price_Cents"] = price_series_to_cents(df[price_col]) if price_col in df else empty.astype("Int64")
+    if original_col and original_col in df:
+        df["Original_Price_Cents"] = price_series_to_cents(df[original_col])
+    else:
+        df["Original_Price_Cents"] = empty.astype("Int64")
+    df["Price_Missing"] = df["Price_Cents"].isna()
+
+    if installments_col and installments_col in df:
+        df["Installment_Count"], df["Installment_Cents"] = installments_to_columns(df[installments_col])
+    else:
+        df["Installment_Count"] = empty.astype("Int64")
+        df["Installment_Cents"] = empty.astype("Int64")
+
+    df["Discount_Pct"] = discount_pct(df["Price_Cents"], df["Original_Price_Cents"])
+    return df
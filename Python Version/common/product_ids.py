@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+IDs canônicos de produto a partir dos links dos marketplaces.
+
+    Mercado Livre → "MLB1234567890" (parâmetros wid/item_id ou path)
+    Amazon        → ASIN de 10 caracteres ("/dp/B0ABCDEF12")
+"""
+
+import hashlib
+import re
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+MLB_ID_PATTERN = re.compile(r"(MLB)-?(\d{6,})", re.IGNORECASE)
+ASIN_PATH_PATTERN = re.compile(r"/(?:dp|gp/product|gp/aw/d|product)/([A-Z0-9]{10})(?:[/?]|$)", re.IGNORECASE)
+
+
+def extract_mlb_id(link: Optional[str]) -> Optional[str]:
+    """
+    Extrai o ID do anúncio do Mercado Livre (ex.: "MLB1234567890").
+
+    Considera os parâmetros `wid`/`item_id` (links de catálogo /p/) antes do path.
+    """
+    if not link or link == "Not Found":
+        return None
+    parsed = urlparse(link)
+    query = parse_qs(parsed.query)
+    for key in ("wid", "item_id"):
+        for value in query.get(key, []):
+            match = MLB_ID_PATTERN.search(value)
+            if match:
+                return f"{match.group(1).upper()}{match.group(2)}"
+    match = MLB_ID_PATTERN.search(parsed.path)
+    if match:
+        return f"{match.group(1).upper()}{match.group(2)}"
+    return None
+
+
+def extract_asin(link: Optional[str]) -> Optional[str]:
+    """Extrai o ASIN de um link da Amazon (também de links /sspa/ com url= codificada)"""
+    if not link or link == "Não encontrado":
+        return None
+    parsed = urlparse(link)
+    match = ASIN_PATH_PATTERN.search(parsed.path)
+    if match:
+        return match.group(1).upper()
+    # Links patrocinados: /sspa/click?...&url=%2Fdp%2FB0...
+    for value in parse_qs(parsed.query).get("url", []):
+        match = ASIN_PATH_PATTERN.search(unquote(value))
+        if match:
+            return match.group(1).upper()
+    return None
+
+
+def canonical_product_id(link: Optional[str], marketplace: str) -> Optional[str]:
+    """
+    ID canônico para o marketplace ("mercadolivre" ou "amazon").
+
+    Sem ID reconhecível, usa um hash estável do link (prefixo "URL:").
+    """
+    if marketplace == "amazon":
+        product_id = extract_asin(link)
+    else:
+        product_id = extract_mlb_id(link)
+    if product_id:
+        return product_id
+    if not link:
+        return None
+    return "URL:" + hashlib.sha1(link.encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Fila persistente (SQLite) de publicações + limitador de taxa (token bucket).
+
+    PublishQueue  → ofertas a publicar; sobrevive a reinícios, ignora
+                    duplicadas (mesma chave) e agenda retentativas
+    TokenBucket   → no máximo `rate` envios por segundo, com rajada de
+                    até `capacity`
+
+Uso:
+    fila = PublishQueue("publicacoes.db")
+    fila.enqueue([("MLB123:129900", oferta)])
+    for chave, oferta, tentativas in fila.claim(10):
+        ...
+        fila.mark_sent(chave)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from common.rate_control import TokenBucket  # noqa: F401 (reexportado: Afiliate/divulgar.py)
+
+DEFAULT_QUEUE_PATH = os.environ.get("FINDPRODUCT_PUBLISH_DB", "publicacoes.db")
+
+# Estados de um item da fila
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS publish_queue (
+    offer_key        TEXT PRIMARY KEY,
+    payload          TEXT NOT NULL,
+    status           TEXT NOT NULL,
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at  REAL NOT NULL,
+    created_at       REAL NOT NULL,
+    sent_at          REAL,
+    last_error       TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_publish_queue_ready ON publish_queue (status, next_attempt_at);
+"""
+
+
+class PublishQueue:
+    """Fila de publicações em SQLite (uma linha por chave de oferta)"""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, items: Iterable[Tuple[str, Dict]]) -> int:
+        """
+        Adiciona ofertas (chave, payload). Chaves já vistas — pendentes,
+        publicadas ou com falha — são ignoradas.
+
+        Retorna:
+              Quantas entraram na fila
+        """
+        now = time.time()
+        rows = [(key, json.dumps(payload, ensure_ascii=False, default=str), PENDING, now, now)
+                for key, payload in items if key]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO publish_queue (offer_key, payload, status, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self._conn.total_changes - before
+
+    def claim(self, limit: int = 10) -> List[Tuple[str, Dict, int]]:
+        """Itens pendentes prontos para envio (ordem de chegada): (chave, payload, tentativas)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT offer_key, payload, attempts FROM publish_queue "
+                "WHERE status = ? AND next_attempt_at <= ? ORDER BY created_at, rowid LIMIT ?",
+                (PENDING, time.time(), limit),
+            ).fetchall()
+        return [(key, json.loads(payload), attempts) for key, payload, attempts in rows]
+
+    def next_ready_in(self) -> Optional[float]:
+        """Segundos até o próximo item pendente ficar pronto (None = fila vazia)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM publish_queue WHERE status = ?", (PENDING,)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def mark_sent(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE publish_queue SET status = ?, sent_at = ?, attempts = attempts + 1, last_error = NULL "
+                "WHERE offer_key = ?",
+                (SENT, time.time(), key),
+            )
+
+    def mark_retry(self, key: str, error: str, delay: float) -> None:
+        """Mantém pendente e só libera de novo após `delay` segundos"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE publish_queue SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? "
+                "WHERE offer_key = ?",
+                (time.time() + delay, error, key),
+            )
+
+    def mark_failed(self, key: str, error: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE publish_queue SET status = ?, attempts = attempts + 1, last_error = ? WHERE offer_key = ?",
+                (FAILED, error, key),
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """Quantidade de itens por estado"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM publish_queue GROUP BY status").fetchall()
+        counts = {PENDING: 0, SENT: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""
+Controle de ritmo adaptativo por domínio (token bucket + AIMD) e detecção
+de páginas de bloqueio/CAPTCHA.
+
+    TokenBucket         → no máximo `rate` requisições por segundo, com
+                          rajada de até `capacity`
+    DomainRateController → um bucket por domínio cuja taxa sobe aos poucos
+                          enquanto o site responde bem (+increase por página
+                          ok) e cai pela metade a cada sinal de throttling
+                          (HTTP 429/503, página de CAPTCHA/bloqueio), com
+                          pausa exponencial do domínio em bloqueios seguidos
+    RateController      → registro dos controladores por domínio
+                          (lista.mercadolivre.com.br → mercadolivre.com.br),
+                          compartilhado por todos os workers do processo
+
+A detecção por conteúdo só roda quando a página veio SEM produtos: uma
+listagem normal pode citar "captcha" nos scripts sem estar bloqueada.
+
+Uso:
+    from common import rate_control
+
+    rate_control.acquire(url)                 # antes de navegar/baixar
+    ...
+    rate_control.check(url, found=bool(products), html=html, status=status)
+"""
+
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from common import instrumentation as metrics
+
+# Limites por domínio (requisições de página por segundo, somando os workers)
+DEFAULT_DOMAIN_LIMITS: Dict[str, Dict] = {
+    "mercadolivre.com.br": {"rate": 1.0, "min_rate": 0.1, "max_rate": 6.0, "increase": 0.1},
+    "amazon.com.br": {"rate": 0.5, "min_rate": 0.05, "max_rate": 2.0, "increase": 0.05},
+}
+
+# Status HTTP tratados como throttling (o 503 da Amazon é a página de robô)
+THROTTLE_STATUSES = {403: "blocked", 429: "rate_limited", 503: "unavailable"}
+
+# Assinaturas de páginas de bloqueio (conteúdo e URL final), por motivo
+BLOCK_SIGNATURES: Dict[str, List[str]] = {
+    "captcha": [
+        r"/errors/validateCaptcha",
+        r"api-services-support@amazon\.com",
+        r"Digite os caracteres que você vê",
+        r"Enter the characters you see below",
+        r"class=[\"']g-recaptcha",
+        r"class=[\"']h-captcha",
+        r"n[ãa]o (?:é|sou) um rob[ôo]",
+        r"not a robot",
+    ],
+    "blocked": [
+        r"/gz/account-verification",
+        r"suspicious[-_ ]traffic",
+        r"<title>\s*Access Denied",
+        r"Request blocked",
+        r"automated access to Amazon data",
+    ],
+}
+
+_BLOCK_PATTERNS = {reason: re.compile("|".join(patterns), re.IGNORECASE)
+                   for reason, patterns in BLOCK_SIGNATURES.items()}
+
+
+class BlockedError(RuntimeError):
+    """Página de bloqueio/CAPTCHA ou throttling (o domínio já foi desacelerado)"""
+
+    def __init__(self, domain: str, reason: str):
+        super().__init__(f"{domain}: {reason}")
+        self.domain = domain
+        self.reason = reason
+
+
+class TokenBucket:
+    """
+    Limitador de taxa thread-safe.
+
+    Args:
+          rate: Tokens repostos por segundo
+          capacity: Máximo acumulado (tamanho da rajada)
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Segundos até haver `tokens` disponíveis (0 = já há)"""
+        with self._lock:
+            self._refill()
+            missing = tokens - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Bloqueia até conseguir `tokens` (pedidos maiores que a capacidade
+        esperam a capacidade cheia e deixam o saldo negativo).
+
+        Retorna:
+              Segundos de espera
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                needed = min(tokens, self.capacity)
+                if self.tokens >= needed:
+                    self.tokens -= tokens
+                    return waited
+                delay = (needed - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Consome `tokens` já (o saldo pode ficar negativo) sem bloquear.
+
+        Retorna:
+              Segundos que o chamador deve esperar antes de usar a vaga
+              (para código assíncrono: `await trio.sleep(bucket.reserve())`)
+        """
+        with self._lock:
+            self._refill()
+            self.tokens -= tokens
+            return max(0.0, -self.tokens / self.rate)
+
+    def set_rate(self, rate: float) -> None:
+        """Troca a taxa (o saldo acumulado até agora usa a taxa antiga)"""
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+
+class DomainRateController:
+    """
+    Ritmo de UM domínio: token bucket com ajuste AIMD e pausa em bloqueios.
+
+    Args:
+          domain: Domínio (para logs/métricas)
+          rate: Taxa inicial (páginas/s)
+          min_rate / max_rate: Limites da taxa
+          increase: Aumento aditivo por página ok
+          decrease: Fator multiplicativo por sinal de throttling
+          cooldown: Pausa do domínio no 1º bloqueio (dobra a cada bloqueio seguido)
+          max_cooldown: Teto da pausa
+          burst: Rajada do bucket
+    """
+
+    def __init__(self, domain: str, rate: float = 1.0, min_rate: float = 0.1, max_rate: float = 5.0,
+                 increase: float = 0.1, decrease: float = 0.5, cooldown: float = 30.0,
+                 max_cooldown: float = 600.0, burst: float = 1.0):
+        self.domain = domain
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.bucket = TokenBucket(rate, capacity=burst)
+        self.paused_until = 0.0
+        self.consecutive_blocks = 0
+        self.stats = {"requests": 0, "ok": 0, "throttled": 0, "waited_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def reserve(self) -> float:
+        """Reserva a próxima vaga; retorna os segundos a esperar (pausa incluída)"""
+        delay = self.bucket.reserve()
+        with self._lock:
+            # Somados: após a pausa os workers voltam espaçados, não todos juntos
+            delay += max(0.0, self.paused_until - time.monotonic())
+            self.stats["requests"] += 1
+            self.stats["waited_seconds"] += max(0.0, delay)
+        return max(0.0, delay)
+
+    def acquire(self) -> float:
+        """Espera a vez desta requisição. Retorna os segundos esperados"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def on_success(self) -> None:
+        """Página ok: aumento aditivo da taxa"""
+        with self._lock:
+            self.stats["ok"] += 1
+            self.consecutive_blocks = 0
+            rate = min(self.max_rate, self.bucket.rate + self.increase)
+        self.bucket.set_rate(rate)
+
+    def on_throttle(self, reason: str, retry_after: Optional[float] = None) -> float:
+        """
+        Sinal de throttling/bloqueio: corte multiplicativo da taxa e, para
+        CAPTCHA/bloqueio, pausa exponencial do domínio (todos os workers).
+
+        Retorna:
+              Segundos de pausa aplicados ao domínio
+        """
+        with self._lock:
+            self.stats["throttled"] += 1
+            rate = max(self.min_rate, self.bucket.rate * self.decrease)
+            pause = 0.0
+            if reason in BLOCK_SIGNATURES: # CAPTCHA / bloqueio (403 incluso)
+                self.consecutive_blocks += 1
+                pause = min(self.max_cooldown, self.cooldown * 2 ** (self.consecutive_blocks - 1))
+            if retry_after:
+                pause = max(pause, retry_after)
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        self.bucket.set_rate(rate)
+        metrics.count("rate_throttled", domain=self.domain, reason=reason)
+        return pause
+
+    def summary(self) -> str:
+        s = self.stats
+        return (f"{self.domain}: {self.rate:.2f} pág/s | {s['ok']}/{s['requests']} ok, "
+                f"{s['throttled']} throttling | {s['waited_seconds']:.1f}s de espera")
+
+
+def registrable_domain(url: str) -> str:
+    """lista.mercadolivre.com.br → mercadolivre.com.br | www.amazon.com.br → amazon.com.br"""
+    host = (urlparse(url).hostname or "").lower()
+    labels = host.split(".")
+    if all(label.isdigit() for label in labels) or ":" in host:
+        return host # Endereço IP (ex.: servidores locais de teste)
+    size = 3 if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in ("com", "net", "org") else 2
+    return ".".join(labels[-size:])
+
+
+def detect_block(html: str = "", url: str = "", status: Optional[int] = None) -> Optional[str]:
+    """
+    Identifica uma página de bloqueio/CAPTCHA.
+
+    Retorna:
+          Motivo ("captcha", "blocked", "rate_limited", "unavailable") ou None
+    """
+    if status in THROTTLE_STATUSES:
+        return THROTTLE_STATUSES[status]
+    for reason, pattern in _BLOCK_PATTERNS.items():
+        if (url and pattern.search(url)) or (html and pattern.search(html)):
+            return reason
+    return None
+
+
+class RateController:
+    """
+    Controladores por domínio, criados sob demanda (thread-safe).
+    Domínios sem limite configurado (ex.: servidores locais) não esperam.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict]] = None):
+        self.limits = DEFAULT_DOMAIN_LIMITS if limits is None else limits
+        self.controllers: Dict[str, DomainRateController] = {}
+        self._lock = threading.Lock()
+
+    def for_url(self, url: str) -> Optional[DomainRateController]:
+        domain = registrable_domain(url)
+        if domain not in self.limits:
+            return None
+        with self._lock:
+            if domain not in self.controllers:
+                self.controllers[domain] = DomainRateController(domain, **self.limits[domain])
+            return self.controllers[domain]
+
+    def reserve(self, url: str) -> float:
+        controller = self.for_url(url)
+        return controller.reserve() if controller is not None else 0.0
+
+    def acquire(self, url: str) -> float:
+        controller = self.for_url(url)
+        if controller is None:
+            return 0.0
+        waited = controller.acquire()
+        if waited:
+            metrics.observe("rate_wait", waited, domain=controller.domain)
+        return waited
+
+    def check(self, url: str, found: bool, html: str = "", final_url: str = "",
+              status: Optional[int] = None, retry_after: Optional[float] = None) -> None:
+        """
+        Registra o resultado de uma página: ok (aumenta a taxa) ou bloqueio
+        (reduz a taxa, pausa o domínio e levanta BlockedError).
+
+        Args:
+              found: A página trouxe produtos
+              html: Conteúdo (só inspecionado quando não há produtos)
+              final_url: URL após redirecionamentos (ex.: /account-verification)
+              status: Status HTTP (modo HTTP)
+
+        Levanta:
+              BlockedError: Throttling ou página de bloqueio/CAPTCHA
+        """
+        reason = detect_block(status=status) if status is not None else None
+        if reason is None and not found:
+            reason = detect_block(html, final_url)
+        controller = self.for_url(url)
+        if reason is None:
+            if found and controller is not None:
+                controller.on_success()
+            return
+        pause = controller.on_throttle(reason, retry_after) if controller is not None else 0.0
+        domain = controller.domain if controller is not None else registrable_domain(url)
+        print(f"     🛑 {domain}: {reason} detectado — ritmo reduzido"
+              f"{f', domínio em pausa por {pause:.0f}s' if pause else ''}")
+        raise BlockedError(domain, reason)
+
+    def summary_lines(self) -> List[str]:
+        with self._lock:
+            return [c.summary() for c in self.controllers.values()]
+
+
+# =====================================================================
+# INSTÂNCIA GLOBAL (compartilhada pelos workers)
+# =====================================================================
+
+_current = RateController()
+
+
+def configure(limits: Optional[Dict[str, Dict]] = None) -> RateController:
+    """Troca a instância global ({} = sem controle de ritmo)"""
+    global _current
+    _current = RateController(limits)
+    return _current
+
+
+def current() -> RateController:
+    return _current
+
+
+def reserve(url: str) -> float:
+    return _current.reserve(url)
+
+
+def acquire(url: str) -> float:
+    return _current.acquire(url)
+
+
+def check(url: str, found: bool, html: str = "", final_url: str = "",
+          status: Optional[int] = None, retry_after: Optional[float] = None) -> None:
+    _current.check(url, found, html, final_url, status, retry_after)
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """Header Retry-After em segundos (formato de data HTTP é ignorado)"""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
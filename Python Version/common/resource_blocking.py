@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Perfil de bloqueio de recursos para os navegadores de scraping.
+
+Os scrapers só leem as URLs de imagem dos atributos `src`/`data-src`; os
+pixels, fontes, vídeos e scripts de analytics nunca são usados. O bloqueio é
+feito via CDP (`Network.setBlockedURLs`) com padrões agrupados por tipo de
+recurso, e os contadores vêm do log de performance do Chrome.
+
+Uso:
+    enable_performance_log(options)          # antes de criar o driver
+    apply_blocking_profile(driver)           # logo após criar o driver
+    stats = collect_blocking_stats(driver)   # após processar cada página
+
+O log de performance é esvaziado a cada leitura; a captura de rede
+(common/network_capture.py) repassa as mensagens que já leu.
+"""
+
+import json
+from typing import Dict, Iterable, List, Optional
+
+# ============================================================================
+# PERFIL PADRÃO (padrões por tipo de recurso)
+# ============================================================================
+
+DEFAULT_BLOCKING_PROFILE: Dict[str, List[str]] = {
+    "image": ["*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "media": ["*.mp4", "*.webm", "*.m3u8", "*.mp3", "*.ts"],
+    "tracker": [
+        "*google-analytics.com*",
+        "*googletagmanager.com*",
+        "*doubleclick.net*",
+        "*googlesyndication.com*",
+        "*facebook.net*",
+        "*connect.facebook.com*",
+        "*hotjar.com*",
+        "*amazon-adsystem.com*",
+        "*criteo.com*",
+        "*clarity.ms*",
+    ],
+}
+
+
+def blocked_url_patterns(profile: Optional[Dict[str, List[str]]] = None,
+                         types: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Monta a lista de padrões a bloquear.
+
+    Args:
+          profile: Perfil {tipo: [padrões]} (padrão: DEFAULT_BLOCKING_PROFILE)
+          types: Tipos a bloquear (padrão: todos os tipos do perfil)
+    """
+    profile = DEFAULT_BLOCKING_PROFILE if profile is None else profile
+    selected = profile.keys() if types is None else types
+    patterns: List[str] = []
+    for resource_type in selected:
+        patterns.extend(profile.get(resource_type, []))
+    return patterns
+
+
+# ============================================================================
+# APLICAÇÃO NO DRIVER
+# ============================================================================
+
+def enable_performance_log(options) -> None:
+    """Liga o log de performance (necessário para os contadores)"""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def apply_blocking_profile(driver, profile: Optional[Dict[str, List[str]]] = None,
+                           types: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Ativa o bloqueio de recursos na sessão CDP do driver.
+
+    Retorna:
+          Lista de padrões efetivamente bloqueados
+    """
+    patterns = blocked_url_patterns(profile, types)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    return patterns
+
+
+def disable_blocking(driver) -> None:
+    """Remove todos os bloqueios da sessão"""
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": []})
+
+
+# ============================================================================
+# CONTADORES
+# ============================================================================
+
+def read_performance_log(driver) -> List[Dict]:
+    """
+    Lê (e esvazia) o log de performance: mensagens CDP desde a última leitura.
+    """
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return [] # Log de performance não habilitado neste driver
+    messages = []
+    for entry in entries:
+        try:
+            messages.append(json.loads(entry["message"])["message"])
+        except (KeyError, ValueError):
+            continue
+    return messages
+
+
+def summarize_network_events(messages: List[Dict]) -> Dict:
+    """
+    Conta requisições bloqueadas/concluídas a partir das mensagens CDP.
+
+    Bytes bloqueados não podem ser medidos (a requisição nunca acontece);
+    por isso o resumo traz os bytes efetivamente transferidos, que é o que
+    comparar com o perfil desligado.
+    """
+    types: Dict[str, str] = {}
+    stats = {
+        "requests": 0,
+        "blocked_requests": 0,
+        "blocked_by_type": {},
+        "transferred_bytes": 0,
+    }
+    for message in messages:
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            stats["requests"] += 1
+            types[params.get("requestId")] = params.get("type", "Other")
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            resource_type = params.get("type") or types.get(params.get("requestId"), "Other")
+            stats["blocked_requests"] += 1
+            stats["blocked_by_type"][resource_type] = stats["blocked_by_type"].get(resource_type, 0) + 1
+        elif method == "Network.loadingFinished":
+            stats["transferred_bytes"] += int(params.get("encodedDataLength", 0))
+    return stats
+
+
+def collect_blocking_stats(driver, messages: Optional[List[Dict]] = None) -> Dict:
+    """
+    Lê (e esvazia) o log de performance e resume o tráfego desde a última
+    chamada — chame após cada página para ter contadores por página.
+
+    Args:
+          messages: Mensagens já lidas do log por outro consumidor (ex.: a
+                    captura de rede), somadas às que ainda estão no log
+    """
+    return summarize_network_events(list(messages or []) + read_performance_log(driver))
+
+
+def format_blocking_stats(stats: Dict) -> str:
+    """Resumo de uma linha para os logs dos scrapers"""
+    by_type = ", ".join(f"{k}: {v}" for k, v in sorted(stats["blocked_by_type"].items())) or "-"
+    return (f"{stats['blocked_requests']}/{stats['requests']} requisições bloqueadas ({by_type}) "
+            f"| {stats['transferred_bytes'] / 1024:.0f} KB transferidos")
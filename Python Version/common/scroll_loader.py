@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Carregador de scroll orientado a eventos (substitui os time.sleep fixos).
+
+Cada scroll roda um script assíncrono no navegador que observa o DOM com um
+MutationObserver e a fila de recursos (performance entries). O script volta
+assim que:
+    • novos cards aparecem e o DOM fica quieto por `settle_ms`, ou
+    • nada muda (sem mutações e sem novas requisições) por `settle_ms`, ou
+    • o teto `timeout` é atingido.
+"""
+
+from typing import Dict, List, Optional
+
+# Tempos padrão (em segundos / milissegundos)
+SCROLL_TIMEOUT = 6.0
+SETTLE_MS = 400
+
+SCROLL_AND_WAIT_SCRIPT = """
+const selector = arguments[0];
+const scrollBy = arguments[1];
+const timeoutMs = arguments[2];
+const settleMs = arguments[3];
+const done = arguments[arguments.length - 1];
+
+const count = () => document.querySelectorAll(selector).length;
+const resources = () => performance.getEntriesByType("resource").length;
+const before = count();
+let lastResources = resources();
+let mutated = false;
+let finished = false;
+let settleTimer = null;
+let idleTimer = null;
+let hardTimer = null;
+let observer = null;
+
+const finish = (timedOut) => {
+    if (finished) { return; }
+    finished = true;
+    if (observer) { observer.disconnect(); }
+    clearTimeout(settleTimer);
+    clearInterval(idleTimer);
+    clearTimeout(hardTimer);
+    done({
+        before: before,
+        after: count(),
+        height: document.body.scrollHeight,
+        timed_out: timedOut
+    });
+};
+
+observer = new MutationObserver(() => {
+    mutated = true;
+    if (count() > before) {
+        clearTimeout(settleTimer);
+        settleTimer = setTimeout(() => finish(false), settleMs);
+    }
+});
+observer.observe(document.body, {childList: true, subtree: true});
+
+// Rede ociosa: nenhuma mutação e nenhuma requisição nova desde a última checagem
+idleTimer = setInterval(() => {
+    const current = resources();
+    if (!mutated && current === lastResources && count() === before) {
+        finish(false);
+    }
+    mutated = false;
+    lastResources = current;
+}, settleMs);
+
+hardTimer = setTimeout(() => finish(true), timeoutMs);
+
+if (scrollBy) {
+    window.scrollBy(0, scrollBy);
+} else {
+    window.scrollTo(0, document.body.scrollHeight);
+}
+"""
+
+
+def scroll_and_wait(driver, css_selector: str, scroll_by: Optional[int] = None,
+                    timeout: float = SCROLL_TIMEOUT, settle_ms: int = SETTLE_MS) -> Dict:
+    """
+    Executa UM scroll e espera pelos sinais reais de carregamento.
+
+    Args:
+          driver: Instância do WebDriver
+          css_selector: Seletor CSS dos cards de produto
+          scroll_by: Pixels a rolar (None = até o fim da página)
+          timeout: Teto de espera em segundos
+          settle_ms: Janela de silêncio (ms) que encerra a espera
+
+    Retorna:
+          Dicionário com before, after, new, height e timed_out
+    """
+    driver.set_script_timeout(timeout + 5)
+    result = driver.execute_async_script(
+        SCROLL_AND_WAIT_SCRIPT, css_selector, scroll_by or 0, int(timeout * 1000), settle_ms
+    ) or {}
+    before = int(result.get("before", 0))
+    after = int(result.get("after", before))
+    return {
+        "before": before,
+        "after": after,
+        "new": max(0, after - before),
+        "height": result.get("height", 0),
+        "timed_out": bool(result.get("timed_out")),
+    }
+
+
+def load_products(driver, css_selector: str, max_scrolls: int = 30, target_count: Optional[int] = None,
+                  stall_limit: int = 3, scroll_by: Optional[int] = None,
+                  timeout: float = SCROLL_TIMEOUT, settle_ms: int = SETTLE_MS,
+                  verbose: bool = True) -> Dict:
+    """
+    Rola a página até atingir `target_count` cards, `stall_limit` scrolls
+    seguidos sem cards novos (e sem mudança de altura) ou `max_scrolls`.
+
+    Args:
+          driver: Instância do WebDriver
+          css_selector: Seletor CSS dos cards de produto
+          max_scrolls: Número máximo de scrolls
+          target_count: Para assim que houver essa quantidade de cards
+          stall_limit: Scrolls seguidos sem novidade antes de parar
+          scroll_by: Pixels por scroll (None = até o fim da página)
+          timeout: Teto de espera por scroll (segundos)
+          settle_ms: Janela de silêncio (ms)
+          verbose: Imprime quantos cards cada scroll trouxe
+
+    Retorna:
+          Dicionário com total, per_scroll (cards novos por scroll) e reason
+    """
+    per_scroll: List[int] = []
+    stalls = 0
+    last_height = None
+    total = 0
+    reason = "max_scrolls"
+
+    for i in range(max_scrolls):
+        step = scroll_and_wait(driver, css_selector, scroll_by, timeout, settle_ms)
+        per_scroll.append(step["new"])
+        total = step["after"]
+
+        if verbose:
+            flag = " (timeout)" if step["timed_out"] else ""
+            print(f"     → Scroll {i+1}/{max_scrolls} | +{step['new']} cards | total: {total}{flag}")
+
+        if target_count is not None and total >= target_count:
+            reason = "target"
+            break
+
+        if step["new"] == 0 and step["height"] == last_height:
+            stalls += 1
+            if stalls >= stall_limit:
+                reason = "stalled"
+                break
+        else:
+            stalls = 0
+        last_height = step["height"]
+
+    return {"total": total, "per_scroll": per_scroll, "reason": reason}
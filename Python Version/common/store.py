@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Armazenamento persistente (SQLite via SQLAlchemy) dos produtos coletados.
+
+    products       → 1 linha por produto (ID canônico: MLB... / ASIN), upsert
+    price_history  → 1 linha por observação de preço (append)
+
+Uso:
+    store = ProductStore()                          # products.db no diretório atual
+    store.save_products(all_products, "mercadolivre")
+    store.price_drops(min_drop_pct=15)
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import (
+    Column, DateTime, Index, Integer, MetaData, String, Table, Text, create_engine, event, func, select, text,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from common.prices import parse_brl_cents
+from common.product_ids import canonical_product_id
+
+DEFAULT_DB_PATH = os.environ.get("FINDPRODUCT_DB", "products.db")
+BATCH_SIZE = 1000
+
+metadata = MetaData()
+
+products_table = Table(
+    "products", metadata,
+    Column("product_id", String(64), primary_key=True),
+    Column("marketplace", String(16), nullable=False),
+    Column("title", Text),
+    Column("link", Text),
+    Column("image_url", Text),
+    Column("price_cents", Integer),
+    Column("original_price_cents", Integer),
+    Column("first_seen", DateTime, nullable=False),
+    Column("last_seen", DateTime, nullable=False),
+)
+
+price_history_table = Table(
+    "price_history", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("product_id", String(64), nullable=False),
+    Column("observed_at", DateTime, nullable=False),
+    Column("price_cents", Integer),
+    Column("original_price_cents", Integer),
+    Index("ix_price_history_product_id", "product_id"),
+    Index("ix_price_history_observed_at", "observed_at"),
+    Index("ix_price_history_product_observed", "product_id", "observed_at"),
+)
+
+Index("ix_products_marketplace", products_table.c.marketplace)
+
+
+def _field(product: Dict, *keys):
+    """Primeiro valor presente entre os nomes de coluna (ML interno, Excel, Amazon)"""
+    for key in keys:
+        value = product.get(key)
+        if value not in (None, "", "Not Found", "Não encontrado"):
+            return value
+    return None
+
+
+def product_record(product: Dict, marketplace: str) -> Optional[Dict]:
+    """
+    Converte um dicionário de scraper (ml.py ou amzn.py) em uma linha do store.
+
+    Retorna:
+          Dicionário com as colunas de `products` ou None se não houver link/ID
+    """
+    link = _field(product, "Link", "Link Afiliado")
+    product_id = canonical_product_id(link, marketplace)
+    if not product_id:
+        return None
+    return {
+        "product_id": product_id,
+        "marketplace": marketplace,
+        "title": _field(product, "Title", "Nome"),
+        "link": link,
+        "image_url": _field(product, "Image_Card", "Imagem"),
+        "price_cents": parse_brl_cents(_field(product, "Discount_Value", "Valor Promoção", "Preço")),
+        "original_price_cents": parse_brl_cents(_field(product, "Original_Value", "Valor Produto")),
+    }
+
+
+class ProductStore:
+    """Store SQLite com upsert de produtos e histórico de preços"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, echo: bool = False):
+        self.path = path
+        self.engine = create_engine(f"sqlite:///{path}", echo=echo, future=True)
+        event.listen(self.engine, "connect", self._configure_connection)
+        metadata.create_all(self.engine)
+
+    @staticmethod
+    def _configure_connection(dbapi_connection, _record) -> None:
+        # WAL + synchronous=NORMAL: commits de lote rápidos e leitura concorrente
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    # --- Escrita ---
+
+    def save_products(self, products: Iterable[Dict], marketplace: str,
+                      observed_at: Optional[datetime] = None, batch_size: int = BATCH_SIZE) -> int:
+        """
+        Faz upsert dos produtos e registra 1 observação de preço por produto.
+
+        Args:
+              products: Dicionários no formato dos scrapers
+              marketplace: "mercadolivre" ou "amazon"
+              observed_at: Momento da coleta (padrão: agora, UTC)
+              batch_size: Linhas por transação
+
+        Retorna:
+              Número de produtos gravados
+        """
+        observed_at = observed_at or datetime.now(timezone.utc).replace(tzinfo=None)
+        batch: Dict[str, Dict] = {}
+        saved = 0
+        for product in products:
+            record = product_record(product, marketplace)
+            if record is None:
+                continue
+            batch[record["product_id"]] = record # Duplicados no lote: vale o último
+            if len(batch) >= batch_size:
+                saved += self._write_batch(list(batch.values()), observed_at)
+                batch = {}
+        if batch:
+            saved += self._write_batch(list(batch.values()), observed_at)
+        return saved
+
+    def _write_batch(self, records: List[Dict], observed_at: datetime) -> int:
+        rows = [dict(r, first_seen=observed_at, last_seen=observed_at) for r in records]
+        stmt = sqlite_insert(products_table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[products_table.c.product_id],
+            set_={
+                "title": stmt.excluded.title,
+                "link": stmt.excluded.link,
+                "image_url": stmt.excluded.image_url,
+                "price_cents": stmt.excluded.price_cents,
+                "original_price_cents": stmt.excluded.original_price_cents,
+                "last_seen": stmt.excluded.last_seen,
+            },
+        )
+        history = [
+            {
+                "product_id": r["product_id"],
+                "observed_at": observed_at,
+                "price_cents": r["price_cents"],
+                "original_price_cents": r["original_price_cents"],
+            }
+            for r in records
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(stmt, rows)
+            conn.execute(price_history_table.insert(), history)
+        return len(records)
+
+    # --- Consultas ---
+
+    def get_product(self, product_id: str) -> Optional[Dict]:
+        """Linha atual de um produto (ou None)"""
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(products_table).where(products_table.c.product_id == product_id)
+            ).mappings().first()
+        return dict(row) if row else None
+
+    def iter_products(self, marketplace: Optional[str] = None, since: Optional[datetime] = None,
+                      batch_size: int = BATCH_SIZE) -> Iterator[Dict]:
+        """
+        Percorre os produtos (em blocos, sem carregar a tabela inteira).
+
+        Args:
+              marketplace: Filtra por marketplace (None = todos)
+              since: Só produtos vistos a partir desse momento (last_seen)
+        """
+        query = select(products_table).order_by(products_table.c.product_id)
+        if marketplace:
+            query = query.where(products_table.c.marketplace == marketplace)
+        if since:
+            query = query.where(products_table.c.last_seen >= since)
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+            for row in result.mappings():
+                yield dict(row)
+
+    def catalog_signature(self) -> tuple:
+        """(nº de produtos, última observação de preço): muda a cada lote gravado"""
+        with self.engine.connect() as conn:
+            count = conn.execute(select(func.count()).select_from(products_table)).scalar()
+            last_id = conn.execute(select(func.max(price_history_table.c.id))).scalar()
+        return count, last_id
+
+    def price_history(self, product_id: str) -> List[Dict]:
+        """Observações de preço de um produto, da mais antiga para a mais recente"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(price_history_table)
+                .where(price_history_table.c.product_id == product_id)
+                .order_by(price_history_table.c.observed_at)
+            ).mappings().all()
+        return [dict(r) for r in rows]
+
+    def price_drops(self, min_drop_pct: float = 10.0, marketplace: Optional[str] = None,
+                    limit: int = 100) -> List[Dict]:
+        """
+        Produtos cuja última observação ficou mais barata que a anterior.
+
+        Retorna:
+              Lista ordenada pela maior queda (%), com preço anterior e atual
+        """
+        query = text("""
+            WITH ranked AS (
+                SELECT
+                    h.product_id,
+                    h.observed_at,
+                    h.price_cents,
+                    LAG(h.price_cents) OVER (PARTITION BY h.product_id ORDER BY h.observed_at) AS previous_cents,
+                    ROW_NUMBER() OVER (PARTITION BY h.product_id ORDER BY h.observed_at DESC) AS rn
+                FROM price_history h
+            )
+            SELECT
+                p.product_id, p.marketplace, p.title, p.link,
+                r.previous_cents, r.price_cents, r.observed_at,
+                100.0 * (r.previous_cents - r.price_cents) / r.previous_cents AS drop_pct
+            FROM ranked r
+            JOIN products p ON p.product_id = r.product_id
+            WHERE r.rn = 1
+              AND r.previous_cents IS NOT NULL
+              AND r.price_cents IS NOT NULL
+              AND r.previous_cents > 0
+              AND 100.0 * (r.previous_cents - r.price_cents) / r.previous_cents >= :min_drop
+              AND (:marketplace IS NULL OR p.marketplace = :marketplace)
+            ORDER BY drop_pct DESC
+            LIMIT :limit
+        """)
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                query, {"min_drop": min_drop_pct, "marketplace": marketplace, "limit": limit}
+            ).mappings().all()
+        return [dict(r) for r in rows]
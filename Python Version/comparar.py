@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Comparação de preços Amazon × Mercado Livre a partir do banco (products.db).
+
+Os dois scrapers gravam no mesmo ProductStore; este script atualiza o
+índice de casamento só com os produtos novos/alterados desde a última
+execução e gera o relatório de diferença de preço.
+
+Uso:
+    python comparar.py                                  # comparacao_precos.xlsx
+    python comparar.py --saida gaps.csv --min-score 0.7 --min-diferenca 10
+"""
+
+import argparse
+import os
+import time
+
+from common.exporters import create_exporter
+from common.matching import DEFAULT_INDEX_PATH, REPORT_COLUMNS, MatchIndex, price_gap_report
+from common.store import DEFAULT_DB_PATH, ProductStore
+
+REPORT_NAMES = {
+    "score": "Similaridade",
+    "left_id": "ID Amazon",
+    "left_title": "Produto Amazon",
+    "left_price_cents": "Preço Amazon (centavos)",
+    "right_id": "ID Mercado Livre",
+    "right_title": "Produto Mercado Livre",
+    "right_price_cents": "Preço Mercado Livre (centavos)",
+    "gap_cents": "Diferença (centavos)",
+    "gap_pct": "Diferença %",
+    "cheaper": "Mais barato em",
+    "left_link": "Link Amazon",
+    "right_link": "Link Mercado Livre",
+}
+
+REPORT_TYPES = {
+    "score": "float64", "left_price_cents": "int64", "right_price_cents": "int64",
+    "gap_cents": "int64", "gap_pct": "float64",
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Casa produtos Amazon × Mercado Livre e compara preços")
+    parser.add_argument("--banco", default=DEFAULT_DB_PATH, help="Banco SQLite dos scrapers")
+    parser.add_argument("--indice", default=DEFAULT_INDEX_PATH, help="Arquivo do índice (incremental)")
+    parser.add_argument("--saida", default="comparacao_precos.xlsx", help="Relatório (.xlsx, .csv, .jsonl, .parquet)")
+    parser.add_argument("--min-score", type=float, default=0.6, help="Similaridade mínima (0-1)")
+    parser.add_argument("--min-diferenca", type=float, default=0.0, help="Diferença mínima de preço (%%)")
+    parser.add_argument("--refazer", action="store_true", help="Reconstrói o índice do zero")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = MatchIndex() if args.refazer or not os.path.isfile(args.indice) else MatchIndex.load(args.indice)
+    updated = index.sync_from_store(ProductStore(args.banco))
+    index.save(args.indice)
+    print(f"🗂️ Índice: {len(index)} produtos ({updated} novos/atualizados) em {time.perf_counter() - start:.1f}s")
+
+    pairs = index.match("amazon", "mercadolivre", min_score=args.min_score)
+    rows = price_gap_report(index, pairs, min_gap_pct=args.min_diferenca)
+    print(f"🔗 {len(pairs)} pares casados, {len(rows)} no relatório (com preço nos dois marketplaces)")
+
+    with create_exporter(args.saida, REPORT_COLUMNS, REPORT_NAMES, REPORT_TYPES) as exporter:
+        exporter.write_rows(rows)
+    print(f"💾 Relatório: {args.saida} ({time.perf_counter() - start:.1f}s no total)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
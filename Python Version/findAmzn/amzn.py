@@ -6,21 +6,65 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service as ChromeService
 import pandas as pd
+import os
+import sys
 import time
-from typing import Tuple
+import trio
+from functools import partial
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Permite importar os módulos compartilhados (pasta common/) rodando o script direto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import instrumentation as metricas
+from common import rate_control
+from common.cdp_tabs import (
+    BACKGROUND_FLAGS, browser_ws_url, default_tab_setup, iter_tab_results, load_products_tab, page_snapshot,
+    wait_for_selector,
+)
+from common.driver_pool import resolve_chromedriver_path
+from common.exporters import create_exporter
+from common.image_cache import ImageCache
+from common.network_capture import NetworkCapture, iter_dicts, parse_json_body
+from common.pipeline import Stage, run_pipeline
+from common.product_ids import extract_asin
+from common.prices import PRICE_COLUMN_NAMES, PRICE_COLUMN_TYPES, PRICE_COLUMNS, normalize_price_columns
+from common.resource_blocking import (
+    apply_blocking_profile, blocked_url_patterns, collect_blocking_stats, enable_performance_log,
+    format_blocking_stats, read_performance_log,
+)
+from common.scroll_loader import scroll_and_wait
+from common.store import ProductStore
 
 # =====================================================================
 # CONFIGURAÇÃO DO DRIVER SELENIUM
 # =====================================================================
-def iniciar_driver() -> webdriver.Chrome:
-    """Inicia o driver do Chrome com opções configuradas."""
+def iniciar_driver(bloquear_recursos: bool = True) -> webdriver.Chrome:
+    """
+    Inicia o driver do Chrome com opções configuradas.
+
+    Com `bloquear_recursos`, imagens, fontes, mídia e trackers não são
+    baixados (as URLs das imagens continuam nos atributos).
+    """
     chrome_options = Options()
     chrome_options.add_argument("--headless")  # opcional: remover se quiser ver o navegador
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
-    driver = webdriver.Chrome(options=chrome_options)
+    # Abas em segundo plano (coletar_varias_urls) sem timers estrangulados
+    for flag in BACKGROUND_FLAGS:
+        chrome_options.add_argument(flag)
+    if bloquear_recursos:
+        enable_performance_log(chrome_options)
+    # Caminho do chromedriver resolvido uma vez e guardado em cache (funciona offline)
+    with metricas.span("chromedriver_resolve"):
+        service = ChromeService(resolve_chromedriver_path())
+    with metricas.span("driver_startup"):
+        driver = webdriver.Chrome(service=service, options=chrome_options)
     driver.set_window_size(1400, 1000)
+    if bloquear_recursos:
+        apply_blocking_profile(driver)
     return driver
 
 # =====================================================================
@@ -28,6 +72,10 @@ def iniciar_driver() -> webdriver.Chrome:
 # =====================================================================
 class Seletores:
     BLOCO_PRODUTO = (By.XPATH, "//div[@data-component-type='s-search-result']")
+    # Mesmo bloco em CSS (usado pelo carregador de scroll no navegador)
+    BLOCO_PRODUTO_CSS = "div[data-component-type='s-search-result']"
+    # Apenas blocos ainda não processados (marcados via JS após a extração)
+    BLOCO_PRODUTO_NOVO = (By.XPATH, "//div[@data-component-type='s-search-result'][not(@data-fp-coletado)]")
     LINK = (By.XPATH, ".//a[@class='a-link-normal s-no-outline']")
     IMAGEM = (By.XPATH, ".//img[contains(@class, 's-image')]")
     PRECO_NOVO = (By.XPATH, ".//span[@class='a-price-whole']")
@@ -38,95 +86,426 @@ class Seletores:
 # =====================================================================
 def get_text(element, by_tuple: Tuple, default: str = "Não encontrado") -> str:
     """Obtém o texto de um elemento, com fallback padrão."""
+    inicio = time.perf_counter() if metricas.enabled() else None
     try:
-        return element.find_element(*by_tuple).text.strip()
+        valor = element.find_element(*by_tuple).text.strip()
     except Exception:
-        return default
+        valor = default
+    if inicio is not None:
+        metricas.selector(by_tuple[1], "text", valor != default, time.perf_counter() - inicio)
+    return valor
 
 def get_attr(element, by_tuple: Tuple, attr: str, default: str = "Não encontrado") -> str:
     """Obtém um atributo de um elemento, com fallback padrão."""
+    inicio = time.perf_counter() if metricas.enabled() else None
     try:
-        return element.find_element(*by_tuple).get_attribute(attr)
+        valor = element.find_element(*by_tuple).get_attribute(attr)
     except Exception:
-        return default
+        valor = default
+    if inicio is not None:
+        metricas.selector(by_tuple[1], f"attr:{attr}", valor != default, time.perf_counter() - inicio)
+    return valor
+
+def marcar_coletados(driver, blocos) -> None:
+    """Marca os blocos já processados para não serem buscados de novo."""
+    if blocos:
+        driver.execute_script(
+            "arguments[0].forEach(b => b.setAttribute('data-fp-coletado', '1'));", blocos
+        )
+
+# =====================================================================
+# CAPTURA DE REDE (RESPOSTAS DA BUSCA)
+# =====================================================================
+# O scroll da busca recebe os resultados de /s/query: vários JSON separados
+# por "&&&", cada um com o HTML de um bloco s-search-result. Os mesmos XPaths
+# são aplicados a esse HTML (e ao documento inicial) sem passar pelo DOM.
+PADROES_CAPTURA = [r"amazon\.com"]
+
+
+def produtos_do_html(html: str, url_base: str = "") -> List[Tuple[str, Dict]]:
+    """
+    Aplica os Seletores ao HTML cru (página ou fragmento de bloco).
+
+    Retorna:
+          Lista de (asin, produto) no formato de iterar_dados
+    """
+    # Import local: lxml só é necessário na captura de rede
+    import lxml.html
+
+    if not html or not html.strip():
+        return []
+    arvore = lxml.html.fromstring(html)
+    if url_base:
+        arvore.make_links_absolute(url_base)
+
+    produtos = []
+    for bloco in arvore.xpath(Seletores.BLOCO_PRODUTO[1]):
+        imagem = bloco.xpath(Seletores.IMAGEM[1])
+        link = bloco.xpath(Seletores.LINK[1])
+        preco = bloco.xpath(Seletores.PRECO_NOVO[1])
+        nome = imagem[0].get("alt") if imagem else None
+        href = link[0].get("href") if link else None
+        if nome is None or href is None:
+            continue
+        produtos.append((bloco.get("data-asin") or extract_asin(href) or "", {
+            "Nome": nome,
+            "Imagem": imagem[0].get("src") or "Não encontrado",
+            "Preço": preco[0].text_content().strip() if preco else "Não encontrado",
+            "Link": href,
+        }))
+    return produtos
+
+
+def produtos_capturados(respostas) -> List[Tuple[str, Dict]]:
+    """Produtos das respostas capturadas (documento HTML ou JSON com fragmentos)"""
+    produtos = []
+    for resposta in respostas:
+        if resposta.resource_type == "Document":
+            encontrados = produtos_do_html(resposta.body, resposta.url)
+        else:
+            encontrados = [
+                item
+                for documento in parse_json_body(resposta.body)
+                for objeto in iter_dicts(documento)
+                if isinstance(objeto.get("html"), str) and "s-search-result" in objeto["html"]
+                for item in produtos_do_html(objeto["html"], resposta.url)
+            ]
+        metricas.count("network_responses", kind=resposta.resource_type, useful=bool(encontrados))
+        produtos.extend(encontrados)
+    return produtos
 
 # =====================================================================
 # FUNÇÃO PRINCIPAL DE COLETA
 # =====================================================================
-def coletar_dados(url: str, limite: int = 50):
-    """Acessa a página de ofertas da Amazon e coleta os primeiros N produtos."""
-    driver = iniciar_driver()
-    driver.get(url)
+def iterar_dados(url: str, limite: int = 50, tolerancia_sem_novos: int = 3, driver=None,
+                 capturar_rede: bool = False):
+    """
+    Acessa a página de ofertas da Amazon e entrega os primeiros N produtos
+    conforme são extraídos (gerador).
 
-    print("🔄 Aguardando carregamento inicial dos produtos...")
-    # Ativa o lazy loading inicial
-    for _ in range(3):
-        driver.execute_script("window.scrollBy(0, 800);")
-        time.sleep(1)
+    A coleta é incremental: a cada scroll só os blocos novos são extraídos
+    (deduplicados por data-asin). Encerra após `tolerancia_sem_novos`
+    scrolls seguidos sem nenhum bloco novo.
 
+    Com `capturar_rede`, os produtos saem primeiro das respostas de rede
+    (documento + /s/query); o DOM só é lido para os blocos cujo ASIN não
+    veio nelas. Requer o log de performance (iniciar_driver com bloqueio).
+
+    Se `driver` for informado (ex.: emprestado de um DriverPool), ele não é
+    fechado ao final.
+
+    Levanta:
+          rate_control.BlockedError: Página de CAPTCHA/bloqueio (os produtos
+                                     já entregues continuam válidos)
+    """
+    driver_proprio = driver is None
+    if driver_proprio:
+        driver = iniciar_driver()
+    captura = None
+    mensagens_rede: List[Dict] = []
     wait = WebDriverWait(driver, 15)
-    produtos = []
+    coletados = 0
 
+    # Tudo dentro do try: um timeout no carregamento também fecha o driver próprio
     try:
-        wait.until(EC.presence_of_all_elements_located(Seletores.BLOCO_PRODUTO))
+        if capturar_rede:
+            captura = NetworkCapture(PADROES_CAPTURA)
+            captura.enable(driver)
+            read_performance_log(driver) # Descarta o tráfego da página anterior
+        rate_control.acquire(url) # Ritmo adaptativo do domínio (compartilhado entre os workers)
+        with metricas.span("page_load", backend="browser"):
+            driver.get(url)
+
+        print("🔄 Aguardando carregamento inicial dos produtos...")
+        # Ativa o lazy loading inicial (espera eventos reais, não pausas fixas)
+        with metricas.span("scroll"):
+            for _ in range(3):
+                scroll_and_wait(driver, Seletores.BLOCO_PRODUTO_CSS, scroll_by=800)
+
+        with metricas.span("wait_cards"):
+            try:
+                wait.until(EC.presence_of_all_elements_located(Seletores.BLOCO_PRODUTO))
+            except Exception:
+                # Sem produtos: página de CAPTCHA/robô? (desacelera o domínio e levanta BlockedError)
+                rate_control.check(url, found=False, html=driver.page_source, final_url=driver.current_url)
+                raise
+        rate_control.check(url, found=True)
+
+        asins_vistos = set()
+        scrolls_sem_novos = 0
+
+        def capturar():
+            """Produtos das respostas que chegaram desde a última leitura"""
+            mensagens = read_performance_log(driver)
+            mensagens_rede.extend(mensagens)
+            with metricas.span("extract", mode="rede"):
+                return produtos_capturados(captura.collect(driver, mensagens))
+
+        while coletados < limite:
+            if captura is not None:
+                for asin, produto in capturar():
+                    if coletados >= limite:
+                        break
+                    if asin in asins_vistos:
+                        continue
+                    if asin:
+                        asins_vistos.add(asin)
+                    coletados += 1
+                    metricas.count("network_captured_products")
+                    yield produto
 
-        while len(produtos) < limite:
-            blocos = driver.find_elements(*Seletores.BLOCO_PRODUTO)
+            # Só os blocos que ainda não foram processados
+            blocos = driver.find_elements(*Seletores.BLOCO_PRODUTO_NOVO)
 
             for bloco in blocos:
-                if len(produtos) >= limite:
+                if coletados >= limite:
                     break
 
-                nome = get_attr(bloco, Seletores.IMAGEM, "alt")
-                imagem = get_attr(bloco, Seletores.IMAGEM, "src")
-                preco = get_text(bloco, Seletores.PRECO_NOVO)
-                link = get_attr(bloco, Seletores.LINK, "href")
+                asin = bloco.get_attribute("data-asin") or ""
+                if asin and asin in asins_vistos:
+                    continue
+
+                # Span só da extração (o tempo do consumidor entre yields fica de fora)
+                with metricas.span("extract", mode="bloco"):
+                    nome = get_attr(bloco, Seletores.IMAGEM, "alt")
+                    imagem = get_attr(bloco, Seletores.IMAGEM, "src")
+                    preco = get_text(bloco, Seletores.PRECO_NOVO)
+                    link = get_attr(bloco, Seletores.LINK, "href")
 
                 if nome != "Não encontrado" and link != "Não encontrado":
-                    produtos.append({
+                    if asin:
+                        asins_vistos.add(asin)
+                    coletados += 1
+                    yield {
                         "Nome": nome,
                         "Imagem": imagem,
                         "Preço": preco,
                         "Link": link
-                    })
+                    }
 
-            # Rola a página para carregar mais produtos (lazy load)
-            driver.execute_script("window.scrollBy(0, 1500);")
-            time.sleep(2)
+            marcar_coletados(driver, blocos)
+
+            if blocos:
+                scrolls_sem_novos = 0
+            else:
+                scrolls_sem_novos += 1
+                if scrolls_sem_novos >= tolerancia_sem_novos:
+                    # Nenhum novo produto apareceu — encerra o loop
+                    break
 
-            # Atualiza blocos após o scroll
-            novos_blocos = driver.find_elements(*Seletores.BLOCO_PRODUTO)
-            if len(novos_blocos) == len(blocos):
-                # Nenhum novo produto apareceu — encerra o loop
+            if coletados >= limite:
                 break
 
-        print(f"✅ Total de produtos coletados: {len(produtos)}")
+            # Rola a página para carregar mais produtos (lazy load)
+            with metricas.span("scroll"):
+                passo = scroll_and_wait(driver, Seletores.BLOCO_PRODUTO_CSS, scroll_by=1500)
+            print(f"   → Scroll: +{passo['new']} produtos na página")
+
+        metricas.count("products_collected", coletados)
+        print(f"✅ Total de produtos coletados: {coletados}")
+        print(f"🚫 Recursos: {format_blocking_stats(collect_blocking_stats(driver, mensagens_rede))}")
+
+    except rate_control.BlockedError:
+        raise # Quem chamou decide (desacelerar, tentar mais tarde) em vez de ver uma coleta "vazia"
 
     except Exception as e:
         print(f"⚠️ Erro durante a coleta: {e}")
 
     finally:
-        driver.quit()
+        if driver_proprio:
+            driver.quit()
 
-    return produtos[:limite]
+
+def coletar_dados(url: str, limite: int = 50, tolerancia_sem_novos: int = 3, driver=None,
+                  capturar_rede: bool = False):
+    """Mesma coleta de iterar_dados, devolvendo a lista completa"""
+    return list(iterar_dados(url, limite, tolerancia_sem_novos, driver, capturar_rede))
 
 # =====================================================================
-# EXPORTAÇÃO DOS DADOS
+# VÁRIAS PÁGINAS EM ABAS SIMULTÂNEAS (CDP)
 # =====================================================================
-def salvar_excel(dados, nome_arquivo: str = "ofertas_amazon.xlsx"):
-    """Salva os dados em um arquivo Excel."""
-    if not dados:
-        print("⚠️ Nenhum dado coletado para exportar.")
-        return
+# Mesma regra de iterar_dados (mesmos XPaths, dedupe por data-asin), rodando
+# inteira na página: uma única chamada por aba
+EXTRAIR_BLOCOS_SCRIPT = """
+const blocoCss = arguments[0];
+const sel = arguments[1];
+const limite = arguments[2];
+const primeiro = (raiz, xpath) =>
+    document.evaluate(xpath, raiz, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const vistos = new Set();
+const produtos = [];
+for (const bloco of document.querySelectorAll(blocoCss)) {
+    if (produtos.length >= limite) { break; }
+    const asin = bloco.getAttribute("data-asin") || "";
+    if (asin && vistos.has(asin)) { continue; }
+    const imagem = primeiro(bloco, sel.imagem);
+    const link = primeiro(bloco, sel.link);
+    const preco = primeiro(bloco, sel.preco);
+    const nome = imagem ? imagem.getAttribute("alt") : null;
+    const href = link ? (link.href || link.getAttribute("href")) : null;
+    if (nome === null || href === null) { continue; }
+    if (asin) { vistos.add(asin); }
+    produtos.push({
+        "Nome": nome,
+        "Imagem": imagem.src || imagem.getAttribute("src") || "Não encontrado",
+        "Preço": preco ? (preco.innerText || preco.textContent || "").trim() : "Não encontrado",
+        "Link": href
+    });
+}
+return produtos;
+"""
+
+
+async def coletar_aba(aba, url: str, limite: int = 50, tolerancia_sem_novos: int = 3) -> List[Dict]:
+    """Versão de coletar_dados para uma aba do motor CDP (common/cdp_tabs.py)"""
+    await trio.sleep(rate_control.reserve(url)) # Ritmo do domínio sem travar as outras abas
+    with metricas.span("page_load", backend="tab"):
+        await aba.navigate(url)
+    with metricas.span("wait_cards"):
+        encontrados = await wait_for_selector(aba, Seletores.BLOCO_PRODUTO_CSS, timeout=15)
+    if not encontrados:
+        url_final, html = await page_snapshot(aba)
+        rate_control.check(url, found=False, html=html, final_url=url_final)
+        return []
+    rate_control.check(url, found=True)
+    with metricas.span("scroll"):
+        await load_products_tab(aba, Seletores.BLOCO_PRODUTO_CSS, target_count=limite,
+                                stall_limit=tolerancia_sem_novos, scroll_by=1500)
+    seletores = {"imagem": Seletores.IMAGEM[1], "link": Seletores.LINK[1], "preco": Seletores.PRECO_NOVO[1]}
+    with metricas.span("extract", mode="tab"):
+        return await aba.call(EXTRAIR_BLOCOS_SCRIPT, Seletores.BLOCO_PRODUTO_CSS, seletores, limite) or []
+
+
+def coletar_varias_urls(urls: Sequence[str], limite: int = 50, abas: int = 4,
+                        driver=None) -> Dict[str, List[Dict]]:
+    """
+    Coleta várias páginas (buscas, categorias, ofertas) com UM Chrome e até
+    `abas` abas navegando/rolando/extraindo ao mesmo tempo.
+
+    Se `driver` for informado ele não é fechado ao final.
+
+    Retorna:
+          {url: produtos} — URLs que falharem ficam com lista vazia
+    """
+    urls = list(urls)
+    driver_proprio = driver is None
+    if driver_proprio:
+        driver = iniciar_driver()
+    resultados: Dict[str, List[Dict]] = {url: [] for url in urls}
+    try:
+        setup = default_tab_setup(blocked_urls=blocked_url_patterns())
+        tarefas = iter_tab_results(browser_ws_url(driver), urls, partial(coletar_aba, limite=limite), abas, setup)
+        for indice, resultado in tarefas:
+            if isinstance(resultado, Exception):
+                print(f"⚠️ Falha em {urls[indice]}: {resultado}")
+                continue
+            resultados[urls[indice]] = resultado
+            metricas.count("products_collected", len(resultado))
+            print(f"✅ {len(resultado)} produtos: {urls[indice]}")
+    finally:
+        if driver_proprio:
+            driver.quit()
+    return resultados
+
+# =====================================================================
+# EXPORTAÇÃO DOS DADOS (STREAMING)
+# =====================================================================
+# Colunas do arquivo: as da coleta + preços numéricos + caminho da imagem local
+COLUNAS_EXPORTACAO = ["Nome", "Imagem", "Preço", "Link"] + PRICE_COLUMNS + ["Imagem Local"]
+TAMANHO_LOTE = 50
+CAMINHO_BANCO = os.environ.get("FINDPRODUCT_DB", "products.db")
+
+
+def normalizar_lote(produtos: List[Dict]) -> List[Dict]:
+    """Adiciona as colunas numéricas de preço (centavos, desconto %) a um lote — vetorizado"""
+    if not produtos:
+        return []
+    df = pd.DataFrame(produtos)
+    normalize_price_columns(df, "Preço")
+    return df.to_dict("records")
 
-    df = pd.DataFrame(dados)
-    df.to_excel(nome_arquivo, index=False)
+def criar_exportador(nome_arquivo: str):
+    """Exportador pelo formato da extensão (.xlsx, .csv, .jsonl, .parquet)"""
+    return create_exporter(nome_arquivo, COLUNAS_EXPORTACAO, PRICE_COLUMN_NAMES, PRICE_COLUMN_TYPES)
+
+def anexar_imagens(cache: ImageCache, dados: List[Dict]) -> List[Dict]:
+    """Baixa (em paralelo) as imagens do lote e grava o caminho local na coluna Imagem Local"""
+    caminhos = cache.fetch_many(p.get("Imagem") for p in dados)
+    for produto in dados:
+        produto["Imagem Local"] = caminhos.get(produto.get("Imagem"))
+    return dados
+
+def coletar_e_salvar(url: str, limite: int = 50, nome_arquivo: str = "ofertas_amazon.xlsx",
+                     caminho_banco: Optional[str] = CAMINHO_BANCO, imagens: bool = True) -> int:
+    """
+    Coleta → normalização → imagens → banco → arquivo, em streaming
+    (common/pipeline.py): cada lote chega ao arquivo enquanto o navegador
+    ainda está rolando a página.
+
+    Falhas no banco ou nas imagens são avisadas e não interrompem a coleta.
+
+    Retorna:
+          Nº de produtos gravados no arquivo
+    """
+    exportador = criar_exportador(nome_arquivo)
+    cache = ImageCache() if imagens else None
+    falhas_banco = []
+
+    def gravar_banco(lote: List[Dict]) -> None:
+        try:
+            banco.save_products(lote, "amazon")
+        except Exception as e:
+            falhas_banco.append(len(lote))
+            print(f"⚠️ Erro ao gravar no banco: {e}")
+
+    def exportar(lote: List[Dict]) -> None:
+        exportador.write_rows(lote)
+
+    try:
+        banco = None
+        if caminho_banco:
+            try:
+                banco = ProductStore(caminho_banco)
+            except Exception as e:
+                print(f"⚠️ Banco indisponível ({e}): seguindo sem gravar no banco")
+
+        etapas = [Stage("normalize", normalizar_lote, batch_size=TAMANHO_LOTE)]
+        if cache is not None:
+            etapas.append(Stage("images", partial(anexar_imagens, cache), batch_size=TAMANHO_LOTE))
+        if banco is not None:
+            etapas.append(Stage("store", gravar_banco, batch_size=TAMANHO_LOTE))
+        etapas.append(Stage("export", exportar, batch_size=TAMANHO_LOTE))
+
+        run_pipeline(iterar_dados(url, limite), etapas)
+    finally:
+        exportador.close()
+        if cache is not None:
+            cache.close()
+
+    if not exportador.rows_written:
+        print("⚠️ Nenhum dado coletado para exportar.")
+        return 0
     print(f"💾 Dados salvos com sucesso em: {nome_arquivo}")
+    if cache is not None:
+        print(f"🖼️ Imagens: {cache.stats['downloaded']} baixadas, {cache.stats['hits']} do cache, "
+              f"{cache.stats['failed']} falhas")
+    if banco is not None:
+        gravados = exportador.rows_written - sum(falhas_banco)
+        print(f"🗄️ {gravados} produtos gravados em: {caminho_banco}")
+    return exportador.rows_written
 
 # =====================================================================
 # EXECUÇÃO PRINCIPAL
 # =====================================================================
 if __name__ == "__main__":
     URL_AMAZON_DEALS = "https://www.amazon.com.br/gp/goldbox"
-    ofertas = coletar_dados(URL_AMAZON_DEALS, limite=50)
-    salvar_excel(ofertas)
+    # Métricas: FINDPRODUCT_METRICS=amazon.jsonl | amazon.prom; FINDPRODUCT_QUIET=1 sem banners
+    try:
+        with metricas.quiet_output():
+            coletar_e_salvar(URL_AMAZON_DEALS, limite=50)
+    except rate_control.BlockedError as e:
+        print(f"🔴 Coleta bloqueada pela Amazon: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        metricas.report()
+        metricas.close()
@@ -10,14 +10,49 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.keys import Keys
 import pyperclip
+import requests
+import argparse
+import copy
+import os
+import queue
+import re
+import socket
+import sys
+import threading
 import time
+import trio
 from urllib.parse import urlparse, parse_qs
-from typing import List, Dict, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Iterator, List, Dict, Set, Tuple, Optional
+
+# Permite importar os módulos compartilhados (pasta common/) rodando o script direto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import instrumentation as metrics
+from common import rate_control
+from common.cdp_tabs import (
+    BACKGROUND_FLAGS, browser_ws_url, default_tab_setup, iter_tab_results, load_products_tab, page_snapshot,
+    wait_for_selector,
+)
+from common.checkpoint import CheckpointJournal, read_journal
+from common.driver_pool import DriverPool, resolve_chromedriver_path
+from common.exporters import Exporter, create_exporter
+from common.image_cache import ImageCache
+from common.network_capture import NetworkCapture, dedupe, iter_dicts, parse_json_body
+from common.pipeline import Stage, dedupe_by, run_pipeline
+from common.prices import PRICE_COLUMN_NAMES, PRICE_COLUMN_TYPES, PRICE_COLUMNS, normalize_price_columns
+from common.product_ids import extract_mlb_id
+from common.resource_blocking import (
+    DEFAULT_BLOCKING_PROFILE, apply_blocking_profile, blocked_url_patterns, collect_blocking_stats,
+    enable_performance_log, format_blocking_stats, read_performance_log,
+)
+from common.scroll_loader import load_products
+from common.store import ProductStore
 
 
 # --- Configuração de Perfil (Opcional - DESATIVADO) ---
@@ -39,15 +74,103 @@ CATEGORY_URLS = [
     # Você pode adicionar mais links de busca/categoria do ML aqui
     # Ex: "https://lista.mercadolivre.com.br/celulares-smartphones"
 ]
+# Buscas pela API pública (sem navegador, ver ml_api.py), coletadas depois
+# das URLs acima: termos de busca ou IDs de categoria
+API_QUERIES = [
+    # "notebook",
+    # "MLB1648",
+]
+API_MAX_RESULTS = 200
+API_DESCRIPTIONS = True
+API_CONCURRENCY = 8
 # Tempos de espera (em segundos)
 WAIT_TIME = 30
 SHORT_WAIT_TIME = 15
 SCROLL_REPETICOES = 30
-SCROLL_PAUSA = 1.5
+# Scroll orientado a eventos: teto por scroll (s) e janela de silêncio (ms)
+SCROLL_TIMEOUT = 6.0
+SCROLL_SETTLE_MS = 400
 
 # Limites
 DESCRIPTION_LIMIT = 500
 
+# Extração em lote (execute_script com todos os cards em vez de 1 por campo).
+# BULK_CHUNK_SIZE divide a página em lotes (entrega os primeiros produtos mais
+# cedo, ao custo de 1 round trip por lote); None = 1 round trip por página
+BULK_EXTRACTION = True
+BULK_CHUNK_SIZE = None
+
+# Modo HTTP (sem navegador): tenta requests + lxml antes do Selenium
+HTTP_FAST_PATH = True
+HTTP_TIMEOUT = 20
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+
+# Paralelismo: nº de navegadores (workers) processando categorias ao mesmo tempo
+PARALLEL_WORKERS = 1
+# Porta de debug base: o worker N usa DEBUG_PORT_BASE + N (se estiver livre)
+DEBUG_PORT_BASE = 9223
+DEBUG_PORT_ATTEMPTS = 5
+
+# Pool de navegadores pré-aquecidos (reaproveitados entre categorias/workers)
+USE_DRIVER_POOL = True
+DRIVER_POOL_MAX_USES = 50
+
+# Paginação: páginas por categoria (1 = só a primeira), orçamento de produtos
+# (None = sem limite) e páginas baixadas ao mesmo tempo
+PAGINATION_MAX_PAGES = 1
+PAGINATION_MAX_PRODUCTS = None
+PAGINATION_WORKERS = 4
+
+# Formatos de saída gravados em streaming (xlsx, csv, jsonl, parquet). O .xlsx
+# só vai para o disco no fim da execução: o .jsonl (flush a cada lote) é o
+# que sobra se a coleta cair no meio
+EXPORT_FORMATS = ["jsonl", "xlsx"]
+
+# Store SQLite persistente (upsert + histórico de preços)
+SAVE_TO_STORE = True
+STORE_PATH = os.environ.get("FINDPRODUCT_DB", "products.db")
+STORE_BATCH_SIZE = 500
+
+# Imagens dos cards: download concorrente + cache em disco (redimensionadas
+# para postagem). O caminho local vai na coluna "Imagem Local"
+DOWNLOAD_IMAGES = True
+IMAGE_WORKERS = 8
+
+# Pipeline em streaming: tamanho dos lotes e das filas entre as etapas
+PIPELINE_BATCH_SIZE = 50
+PIPELINE_QUEUE_SIZE = 200
+
+# Várias abas num único Chrome (CDP, ver common/cdp_tabs.py): as URLs que
+# não saem pelo modo HTTP são abertas em até TAB_CONCURRENCY abas ao mesmo tempo
+# (só a 1ª página; com PAGINATION_MAX_PAGES > 1 as categorias vão em sequência)
+MULTI_TAB = False
+TAB_CONCURRENCY = 4
+
+# Bloqueio de recursos (imagens, fontes, mídia, trackers) via CDP
+RESOURCE_BLOCKING = True
+RESOURCE_BLOCKING_PROFILE = DEFAULT_BLOCKING_PROFILE
+
+# Captura de rede: os produtos saem das respostas (documento + JSON do scroll
+# infinito) lidas via CDP; a extração do DOM só completa os cards que faltarem
+NETWORK_CAPTURE = False
+CAPTURE_URL_PATTERNS = [r"mercadoli(?:vre|bre)\.com", r"mercadolibre\.com"]
+
+# Ritmo adaptativo por domínio (token bucket + AIMD, ver common/rate_control.py),
+# compartilhado por todos os workers: a taxa sobe enquanto o site responde bem e
+# cai (com pausa do domínio) em HTTP 429/503 ou página de CAPTCHA/bloqueio.
+# {} = sem controle de ritmo
+RATE_LIMITS = rate_control.DEFAULT_DOMAIN_LIMITS
+
+# Checkpoint das coletas longas (journal append-only, ver common/checkpoint.py):
+# categorias/páginas concluídas e produtos já extraídos. `python ml.py --resume`
+# pula o que terminou e reaproveita o resto. None desativa
+CHECKPOINT_PATH = os.environ.get("FINDPRODUCT_CHECKPOINT", os.path.join("checkpoints", "mercadolivre.jsonl"))
+CHECKPOINT_BATCH_SIZE = 50
+
+# Instrumentação (tempo por fase e contadores por seletor): .jsonl ou .prom
+METRICS_PATH = os.environ.get("FINDPRODUCT_METRICS")
+QUIET_MODE = metrics.QUIET # Sem banners no console (as métricas continuam)
+
 # ============================================================================
 # SELETORES CSS/XPATH (MERCADO LIVRE - ATUALIZADO Nov/2025)
 # ============================================================================
@@ -79,6 +202,72 @@ class Selectors:
     # Parcelamento
     INSTALLMENTS = (By.CSS_SELECTOR, "span.poly-price__installments")
     
+    # --- Paginação ---
+    PAGINATION_NEXT = (By.CSS_SELECTOR, "li.andes-pagination__button--next a")
+    
+
+# ============================================================================
+# EXTRAÇÃO EM LOTE (JAVASCRIPT)
+# ============================================================================
+
+# Recebe os blocos + seletores e devolve um array JSON com os campos crus de
+# cada card. Campo = null quando o elemento não existe no card.
+BULK_EXTRACT_SCRIPT = """
+const blocks = arguments[0];
+const sel = arguments[1];
+const text = (root, css) => {
+    const el = root.querySelector(css);
+    return el ? (el.innerText || el.textContent || "").trim().replace(/\\n/g, " ") : null;
+};
+const attr = (root, css, name) => {
+    const el = root.querySelector(css);
+    return el ? el.getAttribute(name) : null;
+};
+return blocks.map((block) => {
+    try {
+        let image = attr(block, sel.image, "data-src");
+        if (!image) { image = attr(block, sel.image, "src"); }
+        let link = null;
+        const a = block.querySelector(sel.link);
+        if (a) { link = a.href || a.getAttribute("href"); }
+        return {
+            ok: true,
+            title: text(block, sel.title),
+            link: link,
+            image: image,
+            old_price: text(block, sel.old_price),
+            new_price_whole: text(block, sel.new_price_whole),
+            new_price_cents: text(block, sel.new_price_cents),
+            installments: text(block, sel.installments)
+        };
+    } catch (e) {
+        return {ok: false, error: String(e)};
+    }
+});
+"""
+
+# Campos obrigatórios: se vierem vazios do JS, o card passa pelo caminho antigo
+BULK_REQUIRED_FIELDS = ("title", "link", "new_price_whole")
+
+# Campo → seletor CSS repassado ao BULK_EXTRACT_SCRIPT
+BULK_SELECTORS = {
+    "title": Selectors.TITLE[1],
+    "link": Selectors.LINK[1],
+    "image": Selectors.IMAGE_CARD[1],
+    "old_price": Selectors.OLD_PRICE[1],
+    "new_price_whole": Selectors.NEW_PRICE_WHOLE[1],
+    "new_price_cents": Selectors.NEW_PRICE_CENTS[1],
+    "installments": Selectors.INSTALLMENTS[1],
+}
+
+# Mesmo script, buscando os blocos na própria página (abas CDP não recebem WebElements)
+TAB_EXTRACT_SCRIPT = (
+    "return (function() {" + BULK_EXTRACT_SCRIPT + "\n})"
+    ".apply(null, [Array.from(document.querySelectorAll(arguments[0])), arguments[1]]);"
+)
+
+HIDE_WEBDRIVER_SCRIPT = "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+
 
 # ============================================================================
 # FUNÇÕES AUXILIARES
@@ -86,18 +275,26 @@ class Selectors:
 
 def get_text_or_default(element, by_tuple: Tuple, default: str = "Not Found") -> str:
     """Extrai texto de um elemento ou retorna um valor padrão"""
+    start = time.perf_counter() if metrics.enabled() else None
     try:
-        return element.find_element(*by_tuple).text.strip().replace("\n", " ")
+        value = element.find_element(*by_tuple).text.strip().replace("\n", " ")
     except Exception:
-        return default
+        value = default
+    if start is not None:
+        metrics.selector(by_tuple[1], "text", value != default, time.perf_counter() - start)
+    return value
 
 
 def get_attr_or_default(element, by_tuple: Tuple, attr: str = "href", default: str = "Not Found") -> str:
     """Extrai um atributo de um elemento ou retorna um valor padrão"""
+    start = time.perf_counter() if metrics.enabled() else None
     try:
-        return element.find_element(*by_tuple).get_attribute(attr)
+        value = element.find_element(*by_tuple).get_attribute(attr)
     except Exception:
-        return default
+        value = default
+    if start is not None:
+        metrics.selector(by_tuple[1], f"attr:{attr}", value != default, time.perf_counter() - start)
+    return value
 
 
 def save_error_screenshot(driver, base_name: str) -> str:
@@ -110,16 +307,155 @@ def save_error_screenshot(driver, base_name: str) -> str:
     except Exception:
         return "Não foi possível salvar o screenshot"
 
+def extract_card_fields(block) -> Dict:
+    """
+    Extrai os campos crus de UM card (caminho antigo, 1 round trip por campo).
+    
+    Args:
+          block: WebElement do card (Selectors.PRODUCT_BLOCK)
+          
+    Retorna:
+          Dicionário com os campos crus do card
+    """
+    title = get_text_or_default(block, Selectors.TITLE)
+    link = get_attr_or_default(block, Selectors.LINK, "href")
+    
+    # --- LÓGICA DE IMAGEM (Lazy Load) ---
+    image_url = get_attr_or_default(block, Selectors.IMAGE_CARD, "data-src")
+    if image_url == "Not Found" or not image_url:
+        # Fallback: Tenta pegar o 'src' se 'data-src' falhar
+        image_url = get_attr_or_default(block, Selectors.IMAGE_CARD, "src")
+
+    return {
+        "title": title,
+        "link": link,
+        "image": image_url,
+        "installments": get_text_or_default(block, Selectors.INSTALLMENTS, default="Não informado"),
+        "old_price": get_text_or_default(block, Selectors.OLD_PRICE, default="Não informado"),
+        "new_price_whole": get_text_or_default(block, Selectors.NEW_PRICE_WHOLE),
+        "new_price_cents": get_text_or_default(block, Selectors.NEW_PRICE_CENTS, default=None),
+    }
+
+
+def extract_cards_bulk(driver, blocks: List) -> List[Dict]:
+    """
+    Extrai os campos de TODOS os cards com um único execute_script.
+    
+    Cards que falharem no JS (ou sem título/link/preço) caem no caminho
+    antigo (extract_card_fields) individualmente.
+    
+    Args:
+          driver: Instância do WebDriver
+          blocks: Lista de WebElements dos cards
+          
+    Retorna:
+          Lista de dicionários com os campos crus, na mesma ordem de `blocks`
+    """
+    try:
+        raw_cards = driver.execute_script(BULK_EXTRACT_SCRIPT, blocks, BULK_SELECTORS) or []
+    except Exception as e:
+        print(f"     ⚠️ Extração em lote falhou ({e}), usando extração por card...")
+        raw_cards = []
+
+    cards = []
+    fallbacks = 0
+    for idx, block in enumerate(blocks):
+        fields = bulk_card_fields(raw_cards[idx] if idx < len(raw_cards) else None)
+        if fields is None:
+            fallbacks += 1
+            cards.append(extract_card_fields(block))
+            continue
+        cards.append(fields)
+
+    if fallbacks:
+        metrics.count("bulk_fallback_cards", fallbacks)
+        print(f"     ℹ️ {fallbacks} card(s) extraídos pelo caminho antigo (fallback)")
+    return cards
+
+
+def bulk_card_fields(raw: Optional[Dict]) -> Optional[Dict]:
+    """
+    Campos de UM card vindos do BULK_EXTRACT_SCRIPT, com os mesmos defaults do
+    caminho antigo. None se o card falhou no JS ou faltar campo obrigatório.
+    """
+    if not raw or not raw.get("ok"):
+        return None
+    if metrics.enabled():
+        for field, css in BULK_SELECTORS.items():
+            metrics.selector(css, f"bulk:{field}", bool(raw.get(field)))
+    if any(not raw.get(f) for f in BULK_REQUIRED_FIELDS):
+        return None
+
+    # Campos opcionais ausentes recebem os mesmos defaults do caminho antigo
+    return {
+        "title": raw["title"],
+        "link": raw["link"],
+        "image": raw.get("image") or "Not Found",
+        "installments": raw.get("installments") or "Não informado",
+        "old_price": raw.get("old_price") or "Não informado",
+        "new_price_whole": raw["new_price_whole"],
+        "new_price_cents": raw.get("new_price_cents"),
+    }
+
+
+def build_product(idx: int, fields: Dict) -> Dict:
+    """Monta o dicionário de produto (nomes internos) a partir dos campos crus"""
+    new_price_whole = fields["new_price_whole"]
+    new_price_cents = fields["new_price_cents"]
+
+    new_price = "Not Found"
+    if new_price_whole != "Not Found":
+        if new_price_cents:
+            new_price = f"{new_price_whole},{new_price_cents}"
+        else:
+            new_price = new_price_whole
+
+    return {
+        "ID": idx,
+        "Title": fields["title"],
+        "Original_Value": fields["old_price"],
+        "Discount_Value": new_price,
+        "Installments": fields["installments"],
+        "Link": fields["link"],
+        "Image_Card": fields["image"],
+    }
+
 # ============================================================================
 # CONFIGURAÇÃO DO DRIVER
 # ============================================================================
 
-def initialize_driver() -> webdriver.Chrome:
+def find_free_debug_port(worker_id: int = 0, stride: int = PARALLEL_WORKERS) -> Optional[int]:
+    """
+    Procura uma porta de debug livre para o worker.
+    
+    Args:
+          worker_id: Índice do worker (0 = primeiro)
+          stride: Distância entre as tentativas (evita colisão entre workers)
+          
+    Retorna:
+          Porta livre ou None se nenhuma das tentativas estiver disponível
+    """
+    stride = max(1, stride)
+    for attempt in range(DEBUG_PORT_ATTEMPTS):
+        port = DEBUG_PORT_BASE + worker_id + attempt * stride
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            try:
+                sock.bind(("127.0.0.1", port))
+                return port
+            except OSError:
+                continue
+    return None
+
+
+def initialize_driver(debug_port: Optional[int] = None) -> webdriver.Chrome:
     """
     Inicializa o ChromeDriver com configurações otimizadas e anti-detecção.
     
     ⚠️ IMPORTANTE: Feche TODAS as janelas do Chrome antes de rodar!
     
+    Args:
+          debug_port: Porta de remote debugging (None = primeira porta livre)
+    
     Retorna:
           webdriver.Chrome: Instância do driver configurada
           
@@ -131,7 +467,7 @@ def initialize_driver() -> webdriver.Chrome:
     print("="*80)
     
     global chrome_options # Usa as opções globais definidas com a config de perfil
-    options = chrome_options # Começa com as opções já configuradas para o perfil
+    options = copy.deepcopy(chrome_options) # Cópia: cada driver/worker tem as suas opções
 
     # Configurações anti-detecção
     print("   → Aplicando configurações anti-detecção...")
@@ -143,42 +479,58 @@ def initialize_driver() -> webdriver.Chrome:
     options.add_argument("--disable-extensions")
     options.add_argument("--disable-notifications")
     options.add_argument("--disable-popup-blocking")
+    # Abas em segundo plano (motor de várias abas) sem timers estrangulados
+    for flag in BACKGROUND_FLAGS:
+        options.add_argument(flag)
     
     # Remove detecção de automação
     options.add_experimental_option("excludeSwitches", ["enable-automation"])
     options.add_experimental_option('useAutomationExtension', False)
+
+    # Log de performance: contadores de requisições bloqueadas e captura de rede
+    if RESOURCE_BLOCKING or NETWORK_CAPTURE:
+        enable_performance_log(options)
     
     # User agent realista
-    user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+    user_agent = USER_AGENT
     options.add_argument(f"user-agent={user_agent}")
 
-    # Porta de debug (tenta várias portas)
+    # Porta de debug (cada worker precisa da sua)
     print("   → Configurando porta de debug...")
-    port_found = False
-    for port in [9223, 9224, 9225, 9226, 9227]:
-        try:
-            options.add_argument(f"--remote-debugging-port={port}")
-            print(f"   ✅ Porta {port} configurada")
-            port_found = True
-            break
-        except Exception:
-            continue
-    
-    if not port_found:
+    port = debug_port if debug_port is not None else find_free_debug_port()
+    if port:
+        options.add_argument(f"--remote-debugging-port={port}")
+        print(f"   ✅ Porta {port} configurada")
+    else:
         print("   ⚠️ Nenhuma porta de debug disponível")
 
     # Inicialização
     try:
-        print("   → Instalando/Atualizando ChromeDriver...")
-        service = ChromeService(ChromeDriverManager().install())
+        print("   → Localizando ChromeDriver (cache local)...")
+        with metrics.span("chromedriver_resolve"):
+            service = ChromeService(resolve_chromedriver_path())
         
         print("   → Iniciando navegador...")
-        driver = webdriver.Chrome(service=service, options=options)
+        with metrics.span("driver_startup"):
+            driver = webdriver.Chrome(service=service, options=options)
         
         # Remove propriedades de automação via JavaScript
         print("   → Aplicando máscaras anti-detecção via JavaScript...")
         driver.execute_cdp_cmd('Network.setUserAgentOverride', {"userAgent": user_agent})
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        driver.execute_script(HIDE_WEBDRIVER_SCRIPT)
+        # Mantém a máscara em todas as navegações (drivers reaproveitados pelo pool)
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+            "source": HIDE_WEBDRIVER_SCRIPT
+        })
+
+        if RESOURCE_BLOCKING:
+            print("   → Bloqueando imagens, fontes, mídia e trackers...")
+            apply_blocking_profile(driver, RESOURCE_BLOCKING_PROFILE)
+
+        if NETWORK_CAPTURE:
+            # Depois do bloqueio: o Network.enable dele não tem os buffers maiores
+            print("   → Ativando captura das respostas de rede...")
+            NetworkCapture().enable(driver)
         
         print("\n" + "✅"*40)
         print("✅ DRIVER INICIADO COM SUCESSO!")
@@ -207,43 +559,33 @@ def initialize_driver() -> webdriver.Chrome:
 # FUNÇÕES DE NAVEGAÇÃO
 # ============================================================================
 
-def scroll_page(driver, repetitions: int = SCROLL_REPETICOES) -> None:
+def scroll_page(driver, repetitions: int = SCROLL_REPETICOES, target_count: Optional[int] = None) -> Dict:
     """
-    Realiza um scroll suave na página para carregar produtos dinamicamente.
+    Rola a página para carregar produtos dinamicamente.
+    
+    Cada scroll espera sinais reais (novos cards via MutationObserver ou
+    rede ociosa) em vez de uma pausa fixa, com teto de SCROLL_TIMEOUT.
     
     Args:
           driver: Instância do WebDriver
           repetitions: Número máximo de scrolls
+          target_count: Para assim que houver essa quantidade de cards
+          
+    Retorna:
+          Resumo do carregamento (total, cards por scroll e motivo da parada)
     """
     print(f"\n   📜 Iniciando scroll da página (max: {repetitions} repetições)...")
-    last_height = 0
-    scrolls_without_change = 0
-    
-    for i in range(repetitions):
-        # Scroll até o fim
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(SCROLL_PAUSA)
-        
-        # Checa nova altura
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        
-        if i % 5 == 0:  # Log a cada 5 scrolls
-            print(f"     → Scroll {i+1}/{repetitions} | Altura: {new_height}px")
-        
-        # Checa se chegou ao fim
-        if new_height == last_height:
-            scrolls_without_change += 1
-            if scrolls_without_change >= 3:
-                print(f"   ✅ Fim da página alcançado (scroll {i+1})")
-                break
-        else:
-            scrolls_without_change = 0
-            
-        last_height = new_height
+    with metrics.span("scroll"):
+        summary = load_products(
+            driver, Selectors.PRODUCT_BLOCK[1],
+            max_scrolls=repetitions, target_count=target_count,
+            timeout=SCROLL_TIMEOUT, settle_ms=SCROLL_SETTLE_MS,
+        )
+    print(f"   ✅ Scroll encerrado ({summary['reason']}) após {len(summary['per_scroll'])} scrolls "
+          f"| {summary['total']} cards")
     
-    # Scroll de volta ao topo
+    # Scroll de volta ao topo (os cards já estão no DOM: não precisa esperar)
     driver.execute_script("window.scrollTo(0, 0);")
-    time.sleep(1)
     
     # Tenta fechar pop-up de CEP (comum no ML)
     try:
@@ -252,33 +594,51 @@ def scroll_page(driver, repetitions: int = SCROLL_REPETICOES) -> None:
     except Exception:
         pass # Ignora se não encontrar
 
+    return summary
+
 # ============================================================================
 # FUNÇÕES DE COLETA DE DADOS (MERCADO LIVRE)
 # ============================================================================
 
-def collect_mercadolivre_data(driver, wait: WebDriverWait, wait_short: WebDriverWait, url: str) -> List[Dict]:
+def iter_mercadolivre_data(driver, wait: WebDriverWait, wait_short: WebDriverWait, url: str,
+                           bulk: bool = BULK_EXTRACTION, target_count: Optional[int] = None,
+                           chunk_size: Optional[int] = BULK_CHUNK_SIZE) -> Iterator[Dict]:
     """
-    Coleta TODOS os dados dos produtos da página de listagem do Mercado Livre.
+    Versão gerador de collect_mercadolivre_data: entrega cada produto assim
+    que o seu card é extraído.
     
     Args:
           driver: Instância do WebDriver
           wait: WebDriverWait longo
           wait_short: WebDriverWait curto
           url: URL da Categoria
+          bulk: Extrai os cards via execute_script (em lotes)
+          target_count: Para o scroll ao atingir essa quantidade de cards
+          chunk_size: Cards por execute_script no modo bulk (None = todos de uma vez)
           
-    Retorna:
-          Lista de dicionários com os dados completos dos produtos
+    Gera:
+          Dicionários com os dados completos dos produtos
+          
+    Levanta:
+          Exception: Falha na página (timeout dos cards, driver caído...),
+                     depois de salvar o screenshot; os produtos já entregues
+                     continuam válidos
     """
-    products = []
-
     print("\n" + "━"*80)
     print(f"🔗 URL: {url}")
     print("━"*80)
     
     # Acessa a página
     print("\n   → Carregando página...")
-    driver.get(url)
+    if RESOURCE_BLOCKING or NETWORK_CAPTURE:
+        read_performance_log(driver) # Descarta o tráfego da página anterior
+    rate_control.acquire(url) # Ritmo do domínio (compartilhado entre os workers)
+    with metrics.span("page_load", backend="browser"):
+        driver.get(url)
 
+    collected = 0
+    network_messages: List[Dict] = []
+    captured_ids: Set[str] = set()
     try:
         # Espera os produtos carregarem
         print("     → Esperando produtos carregarem...")
@@ -291,79 +651,1168 @@ def collect_mercadolivre_data(driver, wait: WebDriverWait, wait_short: WebDriver
             print("   ℹ️ Pop-up de Cookies não encontrado/ignorado.")
             
         # Agora espera o bloco principal de produtos
-        wait.until(EC.presence_of_element_located(Selectors.PRODUCT_BLOCK))
-        time.sleep(2)
+        with metrics.span("wait_cards"):
+            try:
+                wait.until(EC.presence_of_element_located(Selectors.PRODUCT_BLOCK))
+            except Exception:
+                # Sem cards: página de CAPTCHA/bloqueio? (desacelera o domínio e levanta BlockedError)
+                rate_control.check(url, found=False, html=driver.page_source, final_url=driver.current_url)
+                raise
+        rate_control.check(url, found=True)
         
         # Rola a página para carregar mais produtos
-        scroll_page(driver)
+        scroll_page(driver, target_count=target_count)
+
+        # Captura de rede: produtos das respostas já recebidas (antes do DOM)
+        if NETWORK_CAPTURE:
+            network_messages = read_performance_log(driver)
+            with metrics.span("extract", mode="network"):
+                captured = capture_listing_products(driver, network_messages)
+            for product in dedupe(captured, captured_product_id, captured_ids):
+                collected += 1
+                product["ID"] = collected
+                yield product
+            metrics.count("network_captured_products", collected)
+            print(f"\n   📡 {collected} produtos capturados das respostas de rede")
 
         # Encontra todos os blocos de produto
         blocks = driver.find_elements(*Selectors.PRODUCT_BLOCK)
         total_products = len(blocks)
         print(f"\n   ✅ {total_products} produtos encontrados!")
+        if captured_ids and collected >= total_products:
+            # A rede já trouxe todos os cards: o DOM (fallback) não é lido
+            blocks = []
+        elif captured_ids:
+            metrics.count("network_dom_fallback")
+            print(f"     → Completando pelo DOM os cards fora das respostas capturadas...")
         print(f"\n   → Extraindo dados...")
 
-        for idx, block in enumerate(blocks, 1):
-            if idx % 20 == 0:
-                print(f"           → Processando produto {idx}/{total_products}...")
-                
-            # --- Coleta de Dados Básicos ---
-            title = get_text_or_default(block, Selectors.TITLE)
-            link = get_attr_or_default(block, Selectors.LINK, "href")
-            
-            # --- LÓGICA DE IMAGEM ATUALIZADA (Lazy Load) ---
-            image_url = get_attr_or_default(block, Selectors.IMAGE_CARD, "data-src")
-            if image_url == "Not Found" or not image_url:
-                # Fallback: Tenta pegar o 'src' se 'data-src' falhar
-                image_url = get_attr_or_default(block, Selectors.IMAGE_CARD, "src")
-            # --- FIM DA LÓGICA DE IMAGEM ---
-
-            installments = get_text_or_default(block, Selectors.INSTALLMENTS, default="Não informado")
-            
-            # --- Lógica de Preço (Mercado Livre) ---
-            old_price = get_text_or_default(block, Selectors.OLD_PRICE, default="Não informado")
-            
-            new_price_whole = get_text_or_default(block, Selectors.NEW_PRICE_WHOLE)
-            new_price_cents = get_text_or_default(block, Selectors.NEW_PRICE_CENTS, default=None)
-            
-            new_price = "Not Found"
-            if new_price_whole != "Not Found":
-                if new_price_cents:
-                    new_price = f"{new_price_whole},{new_price_cents}"
-                else:
-                    new_price = new_price_whole
-            
-            # --- Monta o dicionário (Nomes internos) ---
-            product = {
-                "ID": idx,
-                "Title": title,
-                "Original_Value": old_price,
-                "Discount_Value": new_price,
-                "Installments": installments,
-                "Link": link,
-                "Image_Card": image_url,
-            }
-            products.append(product)
+        def already_captured(fields: Dict) -> bool:
+            card_id = extract_item_id(fields["link"]) if captured_ids else None
+            if card_id is None:
+                return False
+            if card_id in captured_ids:
+                return True
+            captured_ids.add(card_id)
+            return False
+
+        # Os spans cobrem só a extração (o tempo do consumidor entre yields fica de fora)
+        if bulk:
+            # 1 round trip por página (ou por lote de chunk_size cards)
+            step = chunk_size or max(1, total_products)
+            for start in range(0, total_products, step):
+                with metrics.span("extract", mode="bulk"):
+                    chunk = extract_cards_bulk(driver, blocks[start:start + step])
+                for fields in chunk:
+                    if already_captured(fields):
+                        continue # Já veio das respostas de rede
+                    collected += 1
+                    yield build_product(collected, fields)
+        else:
+            for position, block in enumerate(blocks, 1):
+                if position % 20 == 0:
+                    print(f"           → Processando produto {position}/{total_products}...")
+                with metrics.span("extract", mode="card"):
+                    fields = extract_card_fields(block)
+                if already_captured(fields):
+                    continue # Já veio das respostas de rede
+                collected += 1
+                yield build_product(collected, fields)
         
-        print(f"     ✅ Dados coletados: {len(products)} produtos")
+        print(f"     ✅ Dados coletados: {collected} produtos")
+
+        if RESOURCE_BLOCKING:
+            stats = collect_blocking_stats(driver, network_messages)
+            print(f"     🚫 Recursos: {format_blocking_stats(stats)}")
+
+    except rate_control.BlockedError:
+        raise # Vira erro da categoria (fica pendente no checkpoint para o --resume)
             
     except Exception as e:
         print(f"\n   ❌ ERRO ao processar categoria")
         print(f"     🔴 Detalhes: {str(e)}")
         screenshot = save_error_screenshot(driver, f"error_category_generic")
         print(f"     📸 Screenshot: {screenshot}")
+        raise # Coleta incompleta: a categoria não pode ser marcada como concluída
 
+
+def collect_mercadolivre_data(driver, wait: WebDriverWait, wait_short: WebDriverWait, url: str,
+                              bulk: bool = BULK_EXTRACTION, target_count: Optional[int] = None) -> List[Dict]:
+    """
+    Coleta TODOS os dados dos produtos da página de listagem do Mercado Livre.
+    
+    Args:
+          driver: Instância do WebDriver
+          wait: WebDriverWait longo
+          wait_short: WebDriverWait curto
+          url: URL da Categoria
+          bulk: Extrai os cards via execute_script (em lotes)
+          target_count: Para o scroll ao atingir essa quantidade de cards
+          
+    Retorna:
+          Lista de dicionários com os dados completos dos produtos
+    """
+    return list(iter_mercadolivre_data(driver, wait, wait_short, url, bulk, target_count))
+
+
+# ============================================================================
+# MODO HTTP (SEM NAVEGADOR)
+# ============================================================================
+
+def create_http_session() -> requests.Session:
+    """Cria uma sessão HTTP (keep-alive) com headers de navegador real"""
+    session = requests.Session()
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7",
+    })
+    return session
+
+
+def _html_text(root, by_tuple: Tuple, default: Optional[str] = "Not Found") -> Optional[str]:
+    """Equivalente de get_text_or_default para HTML estático (lxml)"""
+    found = root.cssselect(by_tuple[1])
+    metrics.selector(by_tuple[1], "html:text", bool(found))
+    if not found:
+        return default
+    return " ".join(found[0].text_content().split())
+
+
+def _html_attr(root, by_tuple: Tuple, attr: str, default: str = "Not Found") -> str:
+    """Equivalente de get_attr_or_default para HTML estático (lxml)"""
+    found = root.cssselect(by_tuple[1])
+    ok = bool(found) and found[0].get(attr) is not None
+    metrics.selector(by_tuple[1], f"html:attr:{attr}", ok)
+    if not ok:
+        return default
+    return found[0].get(attr)
+
+
+def parse_listing_page(html: str, base_url: str = "") -> Tuple[List[Dict], Optional[str]]:
+    """
+    Aplica os mesmos Selectors ao HTML cru de uma listagem do Mercado Livre.
+    
+    Args:
+          html: Conteúdo HTML da página
+          base_url: URL da página (para resolver links relativos)
+          
+    Retorna:
+          (produtos no formato de collect_mercadolivre_data, link da próxima página ou None)
+    """
+    # Import local: lxml só é necessário no modo HTTP
+    import lxml.html
+
+    if not html or not html.strip():
+        return [], None
+
+    tree = lxml.html.fromstring(html)
+    if base_url:
+        tree.make_links_absolute(base_url, resolve_base_href=True)
+
+    products = []
+    for idx, block in enumerate(tree.cssselect(Selectors.PRODUCT_BLOCK[1]), 1):
+        image_url = _html_attr(block, Selectors.IMAGE_CARD, "data-src")
+        if image_url == "Not Found" or not image_url:
+            image_url = _html_attr(block, Selectors.IMAGE_CARD, "src")
+
+        fields = {
+            "title": _html_text(block, Selectors.TITLE),
+            "link": _html_attr(block, Selectors.LINK, "href"),
+            "image": image_url,
+            "installments": _html_text(block, Selectors.INSTALLMENTS, default="Não informado"),
+            "old_price": _html_text(block, Selectors.OLD_PRICE, default="Não informado"),
+            "new_price_whole": _html_text(block, Selectors.NEW_PRICE_WHOLE),
+            "new_price_cents": _html_text(block, Selectors.NEW_PRICE_CENTS, default=None),
+        }
+        products.append(build_product(idx, fields))
+
+    next_url = _html_attr(tree, Selectors.PAGINATION_NEXT, "href", default=None)
+    return products, next_url
+
+
+def parse_listing_html(html: str, base_url: str = "") -> List[Dict]:
+    """Atalho de parse_listing_page que devolve só os produtos"""
+    return parse_listing_page(html, base_url)[0]
+
+
+def fetch_listing_page(url: str, session: requests.Session) -> Tuple[List[Dict], Optional[str], str]:
+    """
+    Baixa e interpreta UMA página de listagem via HTTP.
+    
+    Retorna:
+          (produtos, link da próxima página, URL final após redirecionamentos)
+    
+    Levanta:
+          requests.RequestException: Em erro de rede/HTTP
+          rate_control.BlockedError: HTTP 429/403/503 ou página de bloqueio/CAPTCHA
+    """
+    rate_control.acquire(url)
+    with metrics.span("page_load", backend="http"):
+        response = session.get(url, timeout=HTTP_TIMEOUT)
+    if response.status_code in rate_control.THROTTLE_STATUSES:
+        rate_control.check(url, found=False, status=response.status_code,
+                           retry_after=rate_control.retry_after_seconds(response.headers.get("Retry-After")))
+    response.raise_for_status()
+    with metrics.span("extract", mode="html"):
+        products, next_url = parse_listing_page(response.text, base_url=response.url)
+    rate_control.check(url, found=bool(products), html=response.text, final_url=response.url)
+    return products, next_url, response.url
+
+
+def collect_mercadolivre_static(url: str, session: Optional[requests.Session] = None) -> List[Dict]:
+    """
+    Coleta os produtos de uma listagem via HTTP puro (sem Chrome).
+    
+    Args:
+          url: URL da Categoria
+          session: Sessão HTTP reaproveitada entre categorias
+          
+    Retorna:
+          Lista de produtos (vazia se a página não trouxer cards no HTML)
+    """
+    session = session or create_http_session()
+    print(f"\n   ⚡ Modo HTTP: {url}")
+    try:
+        products = fetch_listing_page(url, session)[0]
+    except Exception as e:
+        print(f"     ⚠️ Modo HTTP falhou: {e}")
+        return []
+
+    print(f"     ✅ {len(products)} produtos no HTML estático")
     return products
 
 
+# ============================================================================
+# CAPTURA DE REDE (RESPOSTAS DO SCROLL INFINITO)
+# ============================================================================
+
+# Imagem de um poly-card a partir do ID da foto ("123456-MLB78901234_012025")
+POLYCARD_IMAGE_URL = "https://http2.mlstatic.com/D_NQ_NP_{id}-O.webp"
+
+POLYCARD_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+def polycard_installments(component: Optional[Dict]) -> str:
+    """
+    Texto do componente de parcelamento ("em {installments}" + valores) no
+    mesmo formato do card renderizado.
+    """
+    if not component or not component.get("text"):
+        return "Não informado"
+    # Import local: ml_api só é necessário na captura/API
+    from ml_api import format_price
+
+    values = {}
+    for value in component.get("values") or []:
+        if not isinstance(value, dict) or not value.get("key"):
+            continue
+        if isinstance(value.get("price"), dict) and value["price"].get("value") is not None:
+            amount = format_price(value["price"]["value"])
+            values[value["key"]] = f"R$ {amount}" if "," in amount else f"R$ {amount},00"
+        elif value.get("text"):
+            values[value["key"]] = value["text"]
+    text = POLYCARD_PLACEHOLDER.sub(lambda m: values.get(m.group(1), m.group(0)), component["text"])
+    if POLYCARD_PLACEHOLDER.search(text):
+        return "Não informado"
+    return " ".join(text.split())
+
+
+def polycard_product(card: Dict) -> Optional[Dict]:
+    """
+    Produto a partir do JSON de um poly-card (metadata + components), o mesmo
+    objeto que a página renderiza no DOM. None se faltar título, link ou preço.
+    """
+    from ml_api import format_price
+
+    metadata = card.get("metadata") or {}
+    components = {}
+    for component in card.get("components") or []:
+        if isinstance(component, dict) and component.get("type"):
+            components[component["type"]] = component.get(component["type"]) or {}
+
+    title = (components.get("title") or {}).get("text")
+    price = components.get("price") or {}
+    current = (price.get("current_price") or {}).get("value")
+    previous = (price.get("previous_price") or {}).get("value")
+    link = metadata.get("url")
+    if not title or not link or current is None:
+        return None
+    if not link.startswith("http"):
+        link = "https://" + link.lstrip("/")
+    if metadata.get("url_params") and "?" not in link:
+        link += metadata["url_params"] if metadata["url_params"].startswith("?") else f"?{metadata['url_params']}"
+
+    pictures = (card.get("pictures") or {}).get("pictures") or []
+    image = POLYCARD_IMAGE_URL.format(id=pictures[0]["id"]) if pictures and pictures[0].get("id") else "Not Found"
+
+    return {
+        "ID": 0,
+        "Title": title,
+        "Original_Value": format_price(previous) if previous else "Não informado",
+        "Discount_Value": format_price(current),
+        "Installments": polycard_installments(components.get("installments")),
+        "Link": link,
+        "Image_Card": image,
+    }
+
+
+def payload_products(document) -> List[Dict]:
+    """
+    Produtos de um documento JSON capturado: poly-cards (scroll infinito da
+    listagem) ou resultados no formato da API de busca (id/title/price/permalink).
+    """
+    from ml_api import api_product
+
+    products = []
+    for node in iter_dicts(document):
+        if isinstance(node.get("metadata"), dict) and isinstance(node.get("components"), list):
+            product = polycard_product(node)
+        elif (str(node.get("id", "")).startswith("MLB") and node.get("title")
+              and node.get("permalink") and node.get("price") is not None):
+            product = api_product(0, node)
+        else:
+            continue
+        if product is not None:
+            products.append(product)
+    return products
+
+
+def captured_product_id(product: Dict) -> Optional[str]:
+    """Chave de dedupe: mesmo ID que o link do card renderizado daria"""
+    return extract_item_id(product["Link"])
+
+
+def capture_listing_products(driver, messages: List[Dict]) -> List[Dict]:
+    """
+    Lê as respostas da página atual (documento HTML + JSON do scroll infinito)
+    e converte os produtos, na ordem em que chegaram.
+    
+    Args:
+          driver: WebDriver com o log de performance ligado
+          messages: Mensagens já lidas do log (repassadas depois aos contadores)
+          
+    Retorna:
+          Produtos (com repetidos; IDs numéricos atribuídos por quem consome)
+    """
+    capture = NetworkCapture(CAPTURE_URL_PATTERNS)
+    products = []
+    for response in capture.collect(driver, messages):
+        if response.resource_type == "Document":
+            found = parse_listing_html(response.body, base_url=response.url)
+        else:
+            found = [p for document in parse_json_body(response.body) for p in payload_products(document)]
+        metrics.count("network_responses", kind=response.resource_type, useful=bool(found))
+        products.extend(found)
+    return products
+
+
+# ============================================================================
+# PAGINAÇÃO (HTTP OU NAVEGADOR)
+# ============================================================================
+
+DESDE_PATTERN = re.compile(r"_Desde_(\d+)")
+
+
+def extract_item_id(link: str) -> Optional[str]:
+    """Extrai o ID canônico do anúncio (ex.: "MLB1234567890") a partir do link"""
+    return extract_mlb_id(link)
+
+
+def product_key(product: Dict) -> Optional[str]:
+    """
+    Chave de dedupe de um produto: ID do anúncio, senão o link; sem link,
+    título + preço.
+    
+    Retorna:
+          None se o card não tiver nem link nem título (não é deduplicado:
+          cards quebrados diferentes não podem virar um só)
+    """
+    link = product.get("Link")
+    if link and link != "Not Found":
+        return extract_item_id(link) or link
+    title = product.get("Title")
+    if title and title != "Not Found":
+        return f"{title}|{product.get('Discount_Value')}"
+    return None
+
+
+def page_url_builder(first_url: str, next_url: Optional[str], page_size: int) -> Optional[Callable[[int], str]]:
+    """
+    Descobre o padrão de paginação a partir do link "Seguinte" da página 1.
+    
+    Suporta o offset `_Desde_N` (listas/categorias) e o parâmetro `page=N`
+    (ofertas). Sem link, supõe `_Desde_N` com `page_size` itens por página
+    para URLs de lista.mercadolivre.com.br.
+    
+    Retorna:
+          Função page (2, 3, ...) → URL, ou None se não houver paginação
+    """
+    if next_url:
+        desde = DESDE_PATTERN.search(next_url)
+        if desde:
+            step = int(desde.group(1)) - 1
+            return lambda page: DESDE_PATTERN.sub(f"_Desde_{(page - 1) * step + 1}", next_url)
+        parsed = urlparse(next_url)
+        if "page" in parse_qs(parsed.query):
+            base = re.sub(r"([?&])page=\d+", r"\1page={page}", next_url)
+            return lambda page: base.format(page=page)
+        return None
+
+    parsed = urlparse(first_url)
+    if parsed.netloc.startswith("lista.") and page_size > 0:
+        path = DESDE_PATTERN.sub("", parsed.path.rstrip("/")).replace("_NoIndex_True", "")
+        return lambda page: parsed._replace(
+            path=f"{path}_Desde_{(page - 1) * page_size + 1}_NoIndex_True"
+        ).geturl()
+    return None
+
+
+def http_page_fetcher() -> Callable:
+    """Backend HTTP: uma sessão keep-alive por thread"""
+    local = threading.local()
+
+    def fetch(url: str) -> Tuple[List[Dict], Optional[str], str]:
+        if not hasattr(local, "session"):
+            local.session = create_http_session()
+        return fetch_listing_page(url, local.session)
+
+    fetch.close = lambda: None
+    return fetch
+
+
+def browser_page_fetcher(browser: Optional["LazyDriver"] = None, pool: Optional[DriverPool] = None,
+                         size: int = PAGINATION_WORKERS) -> Callable:
+    """
+    Backend navegador. Com `browser`, usa sempre esse driver (sequencial);
+    senão cada thread empresta o seu de `pool` (criado aqui se não informado).
+    """
+    local = threading.local()
+    leased: List = []
+    own_pool = None
+    if browser is None and pool is None:
+        own_pool = pool = DriverPool(initialize_driver, size=size, max_uses=DRIVER_POOL_MAX_USES)
+
+    def fetch(url: str) -> Tuple[List[Dict], Optional[str], str]:
+        worker = browser
+        if worker is None:
+            worker = getattr(local, "browser", None)
+            if worker is None:
+                worker = local.browser = LazyDriver(pool=pool)
+                leased.append(worker)
+        driver, wait, wait_short = worker.get()
+        products = collect_mercadolivre_data(driver, wait, wait_short, url)
+        next_url = get_attr_or_default(driver, Selectors.PAGINATION_NEXT, "href", default=None)
+        return products, next_url, driver.current_url
+
+    def close() -> None:
+        for worker in leased:
+            worker.release()
+        if own_pool is not None:
+            own_pool.close()
+
+    fetch.close = close
+    return fetch
+
+
+def crawl_listing_pages(url: str, fetch_page: Callable, max_pages: int = PAGINATION_MAX_PAGES,
+                        max_products: Optional[int] = PAGINATION_MAX_PRODUCTS,
+                        workers: int = PAGINATION_WORKERS,
+                        saved_pages: Optional[Dict[int, Dict]] = None,
+                        on_page: Optional[Callable[..., None]] = None,
+                        on_page_error: Optional[Callable[[int, str], None]] = None) -> List[Dict]:
+    """
+    Percorre as páginas de uma listagem, baixando várias ao mesmo tempo.
+    
+    A página 1 define o padrão de paginação; as seguintes são buscadas em
+    lotes de `workers`. Produtos são deduplicados pelo ID do anúncio (MLB)
+    entre páginas. Para ao atingir `max_pages`, `max_products`, uma página
+    vazia ou um lote sem nenhum produto novo.
+    
+    Args:
+          url: URL da Categoria (página 1)
+          fetch_page: Backend (http_page_fetcher / browser_page_fetcher)
+          max_pages: Profundidade máxima
+          max_products: Orçamento de produtos únicos (None = sem limite)
+          workers: Páginas baixadas em paralelo
+          saved_pages: Páginas já concluídas ({página: {"products", ...}}) —
+                       usadas no lugar do download (retomada do checkpoint)
+          on_page: Chamado como on_page(página, produtos, **info) a cada
+                   página baixada com produtos (ex.: CheckpointJournal.record_page);
+                   páginas vazias não são gravadas, para o resume tentar de novo
+          on_page_error: Chamado como on_page_error(página, erro) para cada
+                         página que falhou (a coleta segue sem ela)
+          
+    Retorna:
+          Produtos únicos, na ordem das páginas, com "ID" renumerado
+    """
+    saved_pages = saved_pages or {}
+    seen = set()
+    products: List[Dict] = []
+
+    def add(page_products: List[Dict]) -> int:
+        added = 0
+        for product in page_products:
+            key = product_key(product)
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            products.append(product)
+            added += 1
+        return added
+
+    def budget_reached() -> bool:
+        return max_products is not None and len(products) >= max_products
+
+    if 1 in saved_pages:
+        first = saved_pages[1]
+        first_products, next_url, final_url = first["products"], first.get("next_url"), first.get("final_url", url)
+    else:
+        first_products, next_url, final_url = fetch_page(url)
+        if on_page is not None and first_products:
+            on_page(1, first_products, next_url=next_url, final_url=final_url)
+    add(first_products)
+    build_url = page_url_builder(final_url, next_url, len(first_products))
+    print(f"   📄 Página 1: {len(first_products)} produtos"
+          f"{'' if build_url else ' (sem paginação detectada)'}")
+
+    page = 2
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while build_url and page <= max_pages and not budget_reached():
+            batch = list(range(page, min(page + workers, max_pages + 1)))
+            missing = [p for p in batch if p not in saved_pages]
+            fetched = dict(zip(missing, executor.map(_safe_fetch(fetch_page), [build_url(p) for p in missing])))
+            outcomes = [(saved_pages[p]["products"], None) if p in saved_pages else fetched[p] for p in batch]
+
+            new_in_batch = 0
+            empty_page = False
+            for p, (page_products, error) in zip(batch, outcomes):
+                if error:
+                    print(f"   ⚠️ Página {p} falhou: {error}")
+                    if on_page_error is not None:
+                        on_page_error(p, error)
+                    continue
+                if on_page is not None and p in fetched and page_products:
+                    on_page(p, page_products)
+                added = add(page_products)
+                new_in_batch += added
+                print(f"   📄 Página {p}: {len(page_products)} produtos (+{added} novos)")
+                empty_page = empty_page or not page_products
+
+            if empty_page or new_in_batch == 0:
+                break
+            page += len(batch)
+
+    if max_products is not None:
+        products = products[:max_products]
+    for idx, product in enumerate(products, 1):
+        product["ID"] = idx
+    return products
+
+
+def _safe_fetch(fetch_page: Callable) -> Callable:
+    """Isola falhas de uma página (retorna (produtos, erro))"""
+    def run(page_url: str) -> Tuple[List[Dict], Optional[str]]:
+        try:
+            return fetch_page(page_url)[0], None
+        except Exception as e:
+            return [], str(e)
+    return run
+
+
+# ============================================================================
+# ORQUESTRAÇÃO POR CATEGORIA (SEQUENCIAL OU POOL DE WORKERS)
+# ============================================================================
+
+class LazyDriver:
+    """
+    Driver iniciado só quando o fallback Selenium é realmente necessário.
+    Com `pool`, o driver é emprestado de um DriverPool em vez de criado.
+    """
+
+    def __init__(self, debug_port: Optional[int] = None, pool: Optional[DriverPool] = None):
+        self.debug_port = debug_port
+        self.pool = pool
+        self.driver = None
+        self.wait = None
+        self.wait_short = None
+
+    def get(self) -> Tuple:
+        """Retorna (driver, wait, wait_short), iniciando o Chrome se preciso"""
+        if self.driver is None:
+            if self.pool is not None:
+                self.driver = self.pool.acquire()
+            else:
+                self.driver = initialize_driver(self.debug_port)
+            self.wait = WebDriverWait(self.driver, WAIT_TIME)
+            self.wait_short = WebDriverWait(self.driver, SHORT_WAIT_TIME)
+        return self.driver, self.wait, self.wait_short
+
+    def release(self) -> None:
+        """Devolve o driver ao pool (sem pool, fecha o navegador)"""
+        if self.driver is not None and self.pool is not None:
+            self.pool.release(self.driver)
+            self.driver = self.wait = self.wait_short = None
+        else:
+            self.quit()
+
+    def quit(self) -> None:
+        """Fecha (ou descarta do pool) o navegador, se estiver aberto"""
+        if self.driver is not None:
+            try:
+                if self.pool is not None:
+                    self.pool.discard(self.driver)
+                else:
+                    self.driver.quit()
+            except Exception:
+                pass
+        self.driver = self.wait = self.wait_short = None
+
+
+def new_category_result(idx: int, url: str) -> Dict:
+    """Registro de resultado de uma categoria (preenchido por iter_category)"""
+    return {"idx": idx, "url": url, "products": [], "count": 0, "seconds": 0.0, "error": None}
+
+
+def iter_category(result: Dict, session: Optional[requests.Session], browser: LazyDriver,
+                  journal: Optional[CheckpointJournal] = None) -> Iterator[Dict]:
+    """
+    Processa UMA categoria de forma isolada (erros não derrubam o lote),
+    entregando os produtos conforme são extraídos.
+    
+    Args:
+          result: Registro de new_category_result (recebe count, seconds e error)
+          session: Sessão HTTP do modo sem navegador (None = desativado)
+          browser: Driver preguiçoso do worker
+          journal: Checkpoint (páginas/produtos gravados; categoria marcada
+                   como concluída só se terminar sem erro, sem página com
+                   falha e com pelo menos um produto)
+          
+    Gera:
+          Produtos da categoria
+    """
+    idx, url = result["idx"], result["url"]
+    start = time.perf_counter()
+    pending: List[Dict] = [] # Produtos ainda não gravados no checkpoint
+    failed_pages: List[int] = []
+    record_products = journal is not None
+
+    def flush() -> None:
+        if pending:
+            journal.record_products(url, list(pending))
+            pending.clear()
+
+    try:
+        if PAGINATION_MAX_PAGES > 1:
+            # Várias páginas: HTTP em paralelo; navegador do worker como fallback
+            # (com checkpoint, as páginas já concluídas não são baixadas de novo)
+            options = {"max_pages": PAGINATION_MAX_PAGES,
+                       "on_page_error": lambda page, error: failed_pages.append(page)}
+            if journal is not None:
+                options.update(saved_pages=journal.saved_pages(url), on_page=partial(journal.record_page, url))
+            products = []
+            if session is not None:
+                fetcher = http_page_fetcher()
+                try:
+                    products = crawl_listing_pages(url, fetcher, **options)
+                except Exception as e:
+                    print(f"     ⚠️ Paginação HTTP falhou: {e}")
+            if not products:
+                failed_pages.clear() # O navegador refaz a listagem inteira
+                products = crawl_listing_pages(url, browser_page_fetcher(browser), workers=1, **options)
+            source = iter(products)
+            record_products = False # Já gravados página a página (on_page)
+
+        else:
+            # Tenta primeiro o HTML estático (sem navegador)
+            products = []
+            if session is not None:
+                products = collect_mercadolivre_static(url, session)
+            source = iter(products)
+
+            # Fallback: Selenium (driver só é iniciado se for necessário)
+            if not products:
+                driver, wait, wait_short = browser.get()
+                source = iter_mercadolivre_data(driver, wait, wait_short, url)
+
+        for product in source:
+            result["count"] += 1
+            if record_products:
+                pending.append(product)
+                if len(pending) >= CHECKPOINT_BATCH_SIZE:
+                    flush()
+            yield product
+
+        if failed_pages:
+            # Coleta parcial: fica pendente para o --resume buscar as páginas que faltaram
+            result["error"] = f"página(s) {', '.join(map(str, sorted(failed_pages)))} falharam"
+            metrics.count("category_errors")
+            print(f"\n   ⚠️ Categoria {idx} incompleta: {result['error']}")
+        elif journal is not None and result["count"]:
+            flush()
+            journal.mark_done(url, result["count"])
+
+    except Exception as e:
+        result["error"] = str(e)
+        metrics.count("category_errors")
+        print(f"\n   ❌ Categoria {idx} falhou: {e}")
+        if browser.driver is not None:
+            print(f"     📸 Screenshot: {save_error_screenshot(browser.driver, f'error_category_{idx}')}")
+        # Navegador pode ter ficado em estado ruim: o próximo job abre outro
+        browser.quit()
+
+    finally:
+        # Interrompida (erro/Ctrl+C): o que já foi extraído fica no checkpoint
+        if journal is not None:
+            flush()
+        result["seconds"] = time.perf_counter() - start
+        metrics.observe("category", result["seconds"])
+        metrics.count("products_collected", result["count"])
+
+
+def run_category(idx: int, url: str, session: Optional[requests.Session], browser: LazyDriver,
+                 journal: Optional[CheckpointJournal] = None) -> Dict:
+    """
+    Processa UMA categoria e devolve o resultado completo (lista de produtos).
+    
+    Retorna:
+          Dicionário com idx, url, products, count, seconds e error
+    """
+    result = new_category_result(idx, url)
+    result["products"] = list(iter_category(result, session, browser, journal))
+    return result
+
+
+def tab_setup() -> List:
+    """Comandos CDP de cada aba nova: mesmas máscaras e bloqueios de initialize_driver"""
+    blocked = blocked_url_patterns(RESOURCE_BLOCKING_PROFILE) if RESOURCE_BLOCKING else None
+    return default_tab_setup(USER_AGENT, blocked, [HIDE_WEBDRIVER_SCRIPT])
+
+
+async def scrape_listing_tab(tab, url: str) -> List[Dict]:
+    """
+    Equivalente de collect_mercadolivre_data numa aba CDP: navega, espera os
+    cards, rola e extrai tudo com UM Runtime.evaluate.
+    
+    Retorna:
+          Produtos (cards sem título/link/preço são descartados: não há
+          o fallback por elemento do Selenium)
+          
+    Levanta:
+          TimeoutError: Os cards não apareceram em WAIT_TIME (como o
+                        wait_cards do Selenium)
+    """
+    await trio.sleep(rate_control.reserve(url)) # Ritmo do domínio (sem bloquear as outras abas)
+    with metrics.span("page_load", backend="tab"):
+        await tab.navigate(url, timeout=WAIT_TIME)
+    with metrics.span("wait_cards"):
+        found = await wait_for_selector(tab, Selectors.PRODUCT_BLOCK[1], timeout=WAIT_TIME)
+    if not found:
+        final_url, html = await page_snapshot(tab)
+        rate_control.check(url, found=False, html=html, final_url=final_url)
+        raise TimeoutError(f"cards não carregaram em {WAIT_TIME}s")
+    rate_control.check(url, found=True)
+    with metrics.span("scroll"):
+        await load_products_tab(tab, Selectors.PRODUCT_BLOCK[1], max_scrolls=SCROLL_REPETICOES,
+                                timeout=SCROLL_TIMEOUT, settle_ms=SCROLL_SETTLE_MS)
+    with metrics.span("extract", mode="tab"):
+        raw_cards = await tab.call(TAB_EXTRACT_SCRIPT, Selectors.PRODUCT_BLOCK[1], BULK_SELECTORS) or []
+
+    products = []
+    for raw in raw_cards:
+        fields = bulk_card_fields(raw)
+        if fields is not None:
+            products.append(build_product(len(products) + 1, fields))
+    if len(products) < len(raw_cards):
+        metrics.count("tab_dropped_cards", len(raw_cards) - len(products))
+    return products
+
+
+def iter_categories_tabs(urls: List[str], session: Optional[requests.Session], browser: LazyDriver,
+                         results: List[Dict], tabs: int = TAB_CONCURRENCY,
+                         journal: Optional[CheckpointJournal] = None) -> Iterator[Dict]:
+    """
+    Processa as categorias com UM navegador e várias abas simultâneas.
+    
+    Cada URL tenta primeiro o modo HTTP; as que não trouxerem cards vão
+    para o motor de abas (common/cdp_tabs.py), que entrega cada categoria
+    assim que ela termina.
+    
+    As abas só leem a 1ª página da listagem: com PAGINATION_MAX_PAGES > 1
+    as categorias seguem por iter_category (paginação HTTP em paralelo,
+    navegador como fallback), uma de cada vez.
+    
+    Args:
+          urls: URLs das categorias
+          session: Sessão HTTP do modo sem navegador (None = desativado)
+          browser: Driver preguiçoso (o Chrome só abre se alguma URL precisar)
+          results: Lista que recebe os registros de new_category_result
+          tabs: Abas simultâneas
+          journal: Checkpoint (cada categoria é gravada ao terminar)
+          
+    Gera:
+          Produtos, na ordem em que as categorias terminam
+    """
+    def checkpoint(url: str, products: List[Dict]) -> None:
+        # Sem produtos a categoria fica pendente (o --resume tenta de novo)
+        if journal is not None and products:
+            journal.record_products(url, products)
+            journal.mark_done(url, len(products))
+
+    if PAGINATION_MAX_PAGES > 1:
+        print(f"\n🗂️ Paginação ativa ({PAGINATION_MAX_PAGES} páginas): abas desativadas, categorias em sequência")
+        for idx, url in enumerate(urls, 1):
+            result = new_category_result(idx, url)
+            results.append(result)
+            yield from iter_category(result, session, browser, journal)
+        return
+
+    pending = []
+    for idx, url in enumerate(urls, 1):
+        result = new_category_result(idx, url)
+        results.append(result)
+        products = collect_mercadolivre_static(url, session) if session is not None else []
+        if not products:
+            pending.append(result)
+            continue
+        result["count"] = len(products)
+        checkpoint(url, products)
+        yield from products
+
+    if not pending:
+        return
+
+    start = time.perf_counter()
+    print(f"\n🗂️ Modo várias abas: {len(pending)} URL(s) em até {tabs} abas")
+    try:
+        driver, _, _ = browser.get()
+        outcomes = iter_tab_results(browser_ws_url(driver), [r["url"] for r in pending],
+                                    scrape_listing_tab, tabs, tab_setup())
+        for index, outcome in outcomes:
+            result = pending[index]
+            result["seconds"] = time.perf_counter() - start
+            if isinstance(outcome, Exception):
+                result["error"] = str(outcome)
+                metrics.count("category_errors")
+                print(f"\n   ❌ Categoria {result['idx']} falhou: {outcome}")
+                continue
+            result["count"] = len(outcome)
+            metrics.count("products_collected", result["count"])
+            print(f"   ✅ Categoria {result['idx']}: {result['count']} produtos ({result['seconds']:.1f}s)")
+            checkpoint(result["url"], outcome)
+            yield from outcome
+    except Exception as e:
+        # Motor indisponível (ex.: Chrome não abriu, sem porta de debug): cai para uma aba por vez
+        print(f"   ⚠️ Motor de abas indisponível ({e}), processando em sequência...")
+        for result in pending:
+            if result["count"] or result["error"]:
+                continue
+            yield from iter_category(result, None, browser, journal)
+
+
+CATEGORY_ID_PATTERN = re.compile(r"MLB\d+")
+
+
+def iter_api_query(result: Dict, query: str, journal: Optional[CheckpointJournal] = None) -> Iterator[Dict]:
+    """
+    Coleta UMA busca de API_QUERIES pela API pública (ml_api.py), com o
+    mesmo isolamento de erros de iter_category.
+    
+    Args:
+          result: Registro de new_category_result (recebe count, seconds e error)
+          query: Termo de busca ou ID de categoria ("MLB1648")
+          journal: Checkpoint (a busca inteira é gravada ao terminar)
+          
+    Gera:
+          Produtos no formato de collect_mercadolivre_data
+    """
+    # Import local: o cliente da API só é necessário com API_QUERIES
+    from ml_api import collect_mercadolivre_api
+
+    start = time.perf_counter()
+    print(f"\n   🔌 API pública: {query}")
+    try:
+        is_category = CATEGORY_ID_PATTERN.fullmatch(query) is not None
+        products = collect_mercadolivre_api(
+            None if is_category else query, query if is_category else None,
+            max_results=API_MAX_RESULTS, descriptions=API_DESCRIPTIONS, concurrency=API_CONCURRENCY,
+        )
+        if journal is not None and products:
+            journal.record_products(result["url"], products)
+            journal.mark_done(result["url"], len(products))
+        for product in products:
+            result["count"] += 1
+            yield product
+
+    except Exception as e:
+        result["error"] = str(e)
+        metrics.count("category_errors")
+        print(f"\n   ❌ Busca na API '{query}' falhou: {e}")
+
+    finally:
+        result["seconds"] = time.perf_counter() - start
+        metrics.observe("category", result["seconds"], source="api")
+        metrics.count("products_collected", result["count"])
+
+
+def crawl_categories_parallel(urls: List[str], workers: int = PARALLEL_WORKERS,
+                              pool: Optional[DriverPool] = None,
+                              on_result: Optional[Callable[[Dict], None]] = None,
+                              journal: Optional[CheckpointJournal] = None,
+                              stop: Optional[threading.Event] = None) -> List[Dict]:
+    """
+    Processa as categorias com N navegadores independentes (fila compartilhada).
+    
+    Args:
+          urls: Lista de URLs de categoria
+          workers: Número de workers (cada um com seu Chrome e porta de debug)
+          pool: Pool de drivers pré-aquecidos (opcional)
+          on_result: Chamado (serializado) a cada categoria concluída
+          journal: Checkpoint compartilhado pelos workers (thread-safe)
+          stop: Quando sinalizado, os workers terminam a categoria atual e
+                não pegam outra (Ctrl+C)
+          
+    Retorna:
+          Resultados de run_category na MESMA ordem de `urls`
+    """
+    jobs = queue.Queue()
+    for idx, url in enumerate(urls, 1):
+        jobs.put((idx, url))
+
+    results: Dict[int, Dict] = {}
+    lock = threading.Lock()
+    workers = max(1, min(workers, len(urls)))
+    stop = stop or threading.Event()
+
+    def worker(worker_id: int) -> None:
+        browser = LazyDriver(find_free_debug_port(worker_id, workers), pool)
+        session = create_http_session() if HTTP_FAST_PATH else None
+        try:
+            while not stop.is_set():
+                try:
+                    idx, url = jobs.get_nowait()
+                except queue.Empty:
+                    break
+                print(f"\n🧵 Worker {worker_id + 1}: categoria {idx}/{len(urls)}")
+                result = run_category(idx, url, session, browser, journal)
+                with lock:
+                    results[idx] = result
+                    if on_result is not None:
+                        on_result(result)
+        finally:
+            browser.release()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        stop.set() # Os workers largam a fila depois da categoria atual
+        raise
+
+    return [results[idx] for idx in sorted(results)]
+
+
+def iter_categories_parallel(urls: List[str], workers: int = PARALLEL_WORKERS,
+                             pool: Optional[DriverPool] = None,
+                             results: Optional[List[Dict]] = None,
+                             journal: Optional[CheckpointJournal] = None) -> Iterator[Dict]:
+    """
+    Versão gerador de crawl_categories_parallel: entrega os produtos de cada
+    categoria assim que ela termina (ordem de conclusão).
+    
+    Interrompido (Ctrl+C), os workers param de pegar categorias novas; as que
+    já terminaram (ou estavam em andamento) ainda são entregues antes de o
+    KeyboardInterrupt seguir adiante.
+    
+    Args:
+          results: Lista que recebe os resultados (na ordem de `urls`) ao final
+    """
+    done = queue.Queue()
+    stop = threading.Event()
+    end = object()
+    finished = False
+    closing = False
+
+    def crawl() -> None:
+        try:
+            ordered = crawl_categories_parallel(urls, workers, pool, on_result=done.put,
+                                                journal=journal, stop=stop)
+            if results is not None:
+                results.extend(ordered)
+        finally:
+            done.put(end)
+
+    def deliver(result: Dict) -> Iterator[Dict]:
+        yield from result["products"]
+        # Os produtos já seguiram pelo pipeline: não mantém a lista em memória
+        result["products"] = []
+
+    thread = threading.Thread(target=crawl, daemon=True)
+    thread.start()
+    try:
+        while True:
+            result = done.get()
+            if result is end:
+                finished = True
+                break
+            yield from deliver(result)
+    except GeneratorExit:
+        closing = True # Consumidor desistiu (erro no pipeline): nada mais a entregar
+        raise
+    finally:
+        if not finished:
+            stop.set()
+            print("\n   ⏳ Aguardando os workers terminarem a categoria atual (Ctrl+C de novo aborta)...")
+            thread.join()
+            # Categorias concluídas que ainda estavam na fila
+            while not closing:
+                result = done.get()
+                if result is end:
+                    break
+                yield from deliver(result)
+        thread.join()
+
+
+def print_category_summary(results: List[Dict]) -> None:
+    """Imprime tempo e status de cada categoria"""
+    print("\n⏱️ RESUMO POR CATEGORIA:")
+    for result in results:
+        status = f"❌ {result['error']}" if result["error"] else f"{result['count']} produtos"
+        print(f"   • [{result['idx']}] {result['seconds']:.1f}s | {status} | {result['url']}")
+
+
+# ============================================================================
+# EXPORTAÇÃO (STREAMING)
+# ============================================================================
+
+# Colunas (nomes internos) — numéricas ao final, para não mudar a posição
+# das colunas usadas pelo Afiliate
+EXPORT_COLUMNS = [
+    "ID", "Title",
+    "Original_Value", "Discount_Value", "Installments",
+    "Link", "Image_Card"
+] + PRICE_COLUMNS + ["Image_Path"]
+
+# Nomes das colunas no arquivo
+EXPORT_RENAME_MAP = {
+    "Title": "Nome",
+    "Original_Value": "Valor Produto",
+    "Discount_Value": "Valor Promoção",
+    "Installments": "Descrição",
+    "Link": "Link Afiliado",
+    "Image_Card": "Imagem",
+    **PRICE_COLUMN_NAMES,
+    "Image_Path": "Imagem Local",
+}
+
+EXPORT_COLUMN_TYPES = {"ID": "int64", **PRICE_COLUMN_TYPES}
+
+
+def open_exporters(base_name: str, formats: Optional[List[str]] = None) -> List[Exporter]:
+    """
+    Abre um exportador por formato ("xlsx", "csv", "jsonl", "parquet").
+    
+    Args:
+          base_name: Nome do arquivo sem extensão
+          formats: Formatos desejados (padrão: EXPORT_FORMATS)
+    """
+    exporters = []
+    for fmt in formats or EXPORT_FORMATS:
+        try:
+            exporter = create_exporter(f"{base_name}.{fmt}", EXPORT_COLUMNS, EXPORT_RENAME_MAP, EXPORT_COLUMN_TYPES)
+            exporters.append(exporter.open())
+        except Exception as e:
+            print(f"   ⚠️ Exportação '{fmt}' desativada: {e}")
+    return exporters
+
+
+def normalize_products(products: List[Dict]) -> List[Dict]:
+    """Adiciona as colunas numéricas de preço a um lote (vetorizado)"""
+    if not products:
+        return []
+    df = pd.DataFrame(products)
+    normalize_price_columns(df, "Discount_Value", "Original_Value", "Installments")
+    return df.to_dict("records")
+
+
+def attach_images(cache: ImageCache, products: List[Dict]) -> List[Dict]:
+    """Baixa (em paralelo) as imagens do lote e grava o caminho local em Image_Path"""
+    paths = cache.fetch_many(p.get("Image_Card") for p in products)
+    for product in products:
+        product["Image_Path"] = paths.get(product.get("Image_Card"))
+    return products
+
+
+def write_products(exporters: List[Exporter], rows: List[Dict]) -> None:
+    """
+    Grava um lote (já normalizado) em todos os exportadores. Um formato que
+    falhar é fechado e sai da lista; os outros continuam recebendo os lotes.
+    """
+    for exporter in list(exporters):
+        try:
+            exporter.write_rows(rows)
+        except Exception as e:
+            print(f"\n❌ ERRO AO SALVAR {exporter.path}: {e} (formato desativado)")
+            exporters.remove(exporter)
+            try:
+                exporter.close()
+            except Exception:
+                pass
+
+
+def close_exporters(exporters: List[Exporter]) -> List[str]:
+    """Fecha os exportadores e retorna os arquivos gerados (com alguma linha)"""
+    files = []
+    for exporter in exporters:
+        try:
+            exporter.close()
+            if exporter.rows_written:
+                files.append(exporter.path)
+        except Exception as e:
+            print(f"\n❌ ERRO AO FECHAR {exporter.path}: {e}")
+    return files
+
+
+def export_checkpoint(checkpoint_path: str = CHECKPOINT_PATH, formats: Optional[List[str]] = None) -> List[str]:
+    """
+    Exporta os produtos já gravados no checkpoint, sem coletar nada (funciona
+    com a coleta parada ou ainda em andamento).
+    
+    Retorna:
+          Arquivos gerados (vazio se o checkpoint não tiver produtos)
+    """
+    unique = dedupe_by(product_key)
+    products = [p for record in read_journal(checkpoint_path) if record["type"] in ("products", "page")
+                for p in record.get("products", []) if unique(p) is not None]
+    print(f"📦 Checkpoint {checkpoint_path}: {len(products)} produtos únicos")
+    if not products:
+        return []
+    exporters = open_exporters(f"mercadolivre_checkpoint_{time.strftime('%Y%m%d_%H%M%S')}", formats)
+    for start in range(0, len(products), PIPELINE_BATCH_SIZE):
+        write_products(exporters, normalize_products(products[start:start + PIPELINE_BATCH_SIZE]))
+    files = close_exporters(exporters)
+    for file_name in files:
+        print(f"   • Arquivo gerado: {file_name}")
+    return files
+
+
 # ============================================================================
 # FUNÇÃO PRINCIPAL
 # ============================================================================
 
-def main():
+def main(resume: bool = False, checkpoint_path: Optional[str] = CHECKPOINT_PATH):
     """
     Função principal do scraper.
     Orquestra todo o processo de coleta de dados.
+    
+    Args:
+          resume: Retoma a coleta do checkpoint (pula categorias/buscas
+                  concluídas e reentrega os produtos já salvos)
+          checkpoint_path: Journal de checkpoint (None = sem checkpoint)
     """
     print("\n" + "="*80)
     print("🚀 BOT DE SCRAPING - MERCADO LIVRE v4.6-ML")
@@ -373,100 +1822,187 @@ def main():
     print(f"   • Tempo máx. espera: {WAIT_TIME}s")
     print(f"   • Tempo curto espera: {SHORT_WAIT_TIME}s")
     print(f"   • Repetições de scroll: {SCROLL_REPETICOES}")
+    print(f"   • Modo HTTP (sem navegador): {'Sim' if HTTP_FAST_PATH else 'Não'}")
+    print(f"   • Workers paralelos: {PARALLEL_WORKERS}")
+    print(f"   • Páginas por categoria: {PAGINATION_MAX_PAGES}")
+    print(f"   • Várias abas (CDP): {f'Sim, {TAB_CONCURRENCY} abas' if MULTI_TAB else 'Não'}")
+    print(f"   • Baixar imagens: {'Sim' if DOWNLOAD_IMAGES else 'Não'}")
+    print(f"   • Checkpoint: {checkpoint_path or 'Não'}{' (retomando)' if resume and checkpoint_path else ''}")
     print("\n" + "="*80 + "\n")
     
     # input("⚠️ IMPORTANTE: Feche TODAS as janelas do Chrome e pressione ENTER para continuar...")
     
-    driver = None
-    all_products = []
+    if METRICS_PATH and metrics.current().path != METRICS_PATH:
+        metrics.configure(METRICS_PATH)
+    rate_control.configure(RATE_LIMITS)
+
+    pool = None
+    if USE_DRIVER_POOL:
+        pool = DriverPool(initialize_driver, size=PARALLEL_WORKERS, max_uses=DRIVER_POOL_MAX_USES)
+        if not HTTP_FAST_PATH:
+            # Sem modo HTTP o Chrome é certo: abre já, em segundo plano
+            pool.prewarm()
+    browser = LazyDriver(pool=pool)
+    session = create_http_session() if HTTP_FAST_PATH else None
+    results = []
+    stats = None
+    journal = CheckpointJournal(checkpoint_path, resume=resume) if checkpoint_path else None
+
+    base_name = f"mercadolivre_products_{time.strftime('%Y%m%d_%H%M%S')}"
+    exporters: List[Exporter] = []
+    files: List[str] = []
+    store = None
+    images = None
+    stages: List[Stage] = []
+    store_failed: List[int] = [] # Tamanho dos lotes que o banco recusou
+    store_saved: List[int] = []
+    replayed_stored: Set[str] = set() # Reentregues pelo checkpoint que o journal confirma no banco
+
+    def store_batch(rows: List[Dict]) -> None:
+        if replayed_stored:
+            rows = [row for row in rows if product_key(row) not in replayed_stored]
+        if not rows:
+            return
+        # Banco com erro (travado, disco cheio...) não derruba a coleta: avisa e segue
+        try:
+            store.save_products(rows, "mercadolivre")
+            store_saved.append(len(rows))
+            if journal is not None:
+                journal.record_stored(product_key(row) for row in rows)
+        except Exception as e:
+            store_failed.append(len(rows))
+            print(f"     ⚠️ Erro ao gravar {len(rows)} produtos no banco: {e}")
+
+    def iter_all_products() -> Iterator[Dict]:
+        urls, queries = CATEGORY_URLS, API_QUERIES
+        if journal is not None and resume:
+            # Reentrega o que já foi extraído (o dedupe descarta o que for coletado de novo).
+            # Vão todos para os arquivos; para o banco, só os que a execução anterior não
+            # chegou a gravar (lote recusado, processo morto antes do lote do store)
+            print(f"♻️ Retomando do checkpoint: {journal.summary()}")
+            for product in journal.saved_products(list(CATEGORY_URLS) + [f"api:{q}" for q in API_QUERIES]):
+                key = product_key(product)
+                if key is not None and journal.is_stored(key):
+                    replayed_stored.add(key)
+                yield product
+            urls = [u for u in CATEGORY_URLS if not journal.is_done(u)]
+            queries = [q for q in API_QUERIES if not journal.is_done(f"api:{q}")]
+            print(f"   → Restam {len(urls)} categoria(s) e {len(queries)} busca(s) na API")
+
+        if PARALLEL_WORKERS > 1 and urls:
+            print(f"🧵 Modo paralelo: {PARALLEL_WORKERS} workers")
+            yield from iter_categories_parallel(urls, PARALLEL_WORKERS, pool, results, journal)
+        elif MULTI_TAB and urls:
+            yield from iter_categories_tabs(urls, session, browser, results, journal=journal)
+        else:
+            # Processa cada categoria
+            for idx, url in enumerate(urls, 1):
+                print(f"\n{'█'*80}")
+                print(f"█ PROCESSANDO CATEGORIA {idx}/{len(urls)}")
+                print(f"{'█'*80}")
+
+                result = new_category_result(idx, url)
+                results.append(result)
+                yield from iter_category(result, session, browser, journal)
+
+                if result["count"]:
+                    print(f"\n{'✅'*40}")
+                    print(f"✅ Categoria {idx} CONCLUÍDA! {result['count']} produtos processados.")
+                    print(f"{'✅'*40}\n")
+                else:
+                    print(f"\n⚠️ Nenhum produto encontrado na categoria {idx}\n")
+
+        # Buscas pela API pública (não precisam de navegador)
+        for query in queries:
+            result = new_category_result(len(results) + 1, f"api:{query}")
+            results.append(result)
+            yield from iter_api_query(result, query, journal)
     
     try:
-        # Inicializa driver
-        driver = initialize_driver()
-        wait = WebDriverWait(driver, WAIT_TIME)
-        wait_short = WebDriverWait(driver, SHORT_WAIT_TIME)
-
-        # Processa cada categoria
-        for idx, url in enumerate(CATEGORY_URLS, 1):
-            print(f"\n{'█'*80}")
-            print(f"█ PROCESSANDO CATEGORIA {idx}/{len(CATEGORY_URLS)}")
-            print(f"{'█'*80}")
-            
-            # Coleta dados (lógica de 1 passagem)
-            complete_products = collect_mercadolivre_data(driver, wait, wait_short, url)
-            
-            if complete_products:
-                all_products.extend(complete_products)
-                
-                print(f"\n{'✅'*40}")
-                print(f"✅ Categoria {idx} CONCLUÍDA! {len(complete_products)} produtos processados.")
-                print(f"{'✅'*40}\n")
-            else:
-                print(f"\n⚠️ Nenhum produto encontrado na categoria {idx}\n")
+        # Arquivos de saída abertos desde o início: cada lote é gravado ao chegar
+        exporters = open_exporters(base_name)
+        if SAVE_TO_STORE:
+            try:
+                store = ProductStore(STORE_PATH)
+            except Exception as e:
+                print(f"   ⚠️ Banco {STORE_PATH} indisponível ({e}): seguindo sem gravar no banco")
+        images = ImageCache(workers=IMAGE_WORKERS) if DOWNLOAD_IMAGES else None
+
+        # coleta → dedupe → normalização → store → exportação (filas limitadas)
+        stages = [
+            Stage("dedupe", dedupe_by(product_key)),
+            Stage("normalize", normalize_products, batch_size=PIPELINE_BATCH_SIZE),
+        ]
+        if images is not None:
+            stages.append(Stage("images", lambda rows: attach_images(images, rows), batch_size=PIPELINE_BATCH_SIZE))
+        if store is not None:
+            stages.append(Stage("store", store_batch, batch_size=STORE_BATCH_SIZE))
+        stages.append(Stage("export", lambda rows: write_products(exporters, rows), batch_size=PIPELINE_BATCH_SIZE))
+
+        stats = run_pipeline(iter_all_products(), stages, queue_size=PIPELINE_QUEUE_SIZE)
+        print_category_summary(results)
 
     except KeyboardInterrupt:
+        # O pipeline já esvaziou as filas: o que foi coletado está salvo
         print("\n\n⚠️ PROCESSO INTERROMPIDO PELO USUÁRIO (Ctrl+C)")
         
     except Exception as e:
         print(f"\n\n❌ ERRO FATAL: {e}")
-        if driver:
+        if browser.driver:
             screenshot_name = f"fatal_error_{int(time.time())}.png"
-            driver.save_screenshot(screenshot_name)
+            browser.driver.save_screenshot(screenshot_name)
             print(f"📸 Screenshot do erro: {screenshot_name}")
             
     finally:
-        if driver:
+        if browser.driver or pool:
             print("\n🛑 Fechando navegador...")
-            driver.quit()
+            browser.release()
+            if pool:
+                pool.close()
             print("✅ Navegador fechado.\n")
+        # Fecha os arquivos mesmo em caso de erro (o que já foi gravado fica salvo)
+        files = close_exporters(exporters)
+        if images is not None:
+            images.close()
+        if journal is not None:
+            journal.close()
 
-    # Salva resultados
+    # Resultados
     print("\n" + "="*80)
-    print("💾 SALVANDO RESULTADOS")
+    print("💾 RESULTADOS")
     print("="*80)
-    
-    if all_products:
-        try:
-            df = pd.DataFrame(all_products)
-            
-            # Reorganiza colunas (nomes internos)
-            column_order = [
-                "ID", "Title", 
-                "Original_Value", "Discount_Value", "Installments",
-                "Link", "Image_Card"
-            ]
-            
-            # Filtra colunas para garantir que só as existentes sejam usadas
-            final_columns = [col for col in column_order if col in df.columns]
-            df = df[final_columns]
-            
-            # Renomeia as colunas para o Excel
-            rename_map = {
-                "Title": "Nome",
-                "Original_Value": "Valor Produto",
-                "Discount_Value": "Valor Promoção",
-                "Installments": "Descrição",
-                "Link": "Link Afiliado",
-                "Image_Card": "Imagem"
-            }
-            df.rename(columns=rename_map, inplace=True)
-            
-            # Nome do arquivo com timestamp
-            file_name = f"mercadolivre_products_{time.strftime('%Y%m%d_%H%M%S')}.xlsx"
-            
-            print(f"\n   → Criando arquivo Excel...")
-            df.to_excel(file_name, index=False, engine='openpyxl')
-            
+
+    total_products = stages[-1].items_out if stages else 0
+    if stats:
+        for name, stage_stats in stats["stages"].items():
+            metrics.observe("pipeline_stage", stage_stats["seconds"], stage=name)
+            print(f"   • Etapa {name}: {stage_stats['in']} → {stage_stats['out']} ({stage_stats['seconds']:.2f}s)")
+    if store is not None and total_products:
+        print(f"   • Banco: {STORE_PATH} ({sum(store_saved)} produtos, histórico de preços atualizado)")
+        if store_failed:
+            print(f"     ⚠️ {sum(store_failed)} produtos não foram gravados no banco (ver avisos acima)")
+    for line in rate_control.current().summary_lines():
+        print(f"   • Ritmo {line}")
+    if journal is not None:
+        print(f"   • Checkpoint: {journal.summary()}")
+        if any(r["error"] for r in results):
+            print(f"     💡 Categorias com erro ficam pendentes: rode com --resume para tentar de novo")
+    if images is not None and total_products:
+        print(f"   • Imagens: {images.stats['downloaded']} baixadas, {images.stats['hits']} do cache, "
+              f"{images.stats['failed']} falhas — {images.root}")
+
+    if total_products:
+        if files:
             print(f"\n{'🎉'*40}")
             print(f"✅ PROCESSO CONCLUÍDO COM SUCESSO!")
             print(f"{'🎉'*40}")
             print(f"\n📊 ESTATÍSTICAS:")
-            print(f"   • Total de produtos: {len(all_products)}")
-            print(f"   • Arquivo gerado: {file_name}")
+            print(f"   • Total de produtos: {total_products}")
+            for file_name in files:
+                print(f"   • Arquivo gerado: {file_name}")
             print(f"\n{'='*80}\n")
-            
-        except Exception as e:
-            print(f"\n❌ ERRO AO SALVAR ARQUIVO EXCEL: {e}")
+        else:
+            print(f"\n❌ ERRO AO SALVAR ARQUIVOS DE SAÍDA")
             print(f"💡 Os dados foram coletados, mas não puderam ser salvos.\n")
             
     else:
@@ -481,14 +2017,33 @@ def main():
         print("   ✓ Verifique os screenshots de erro salvos para análise visual (pode ser CAPTCHA)")
         print(f"\n{'='*80}\n")
 
+    metrics.report()
+    metrics_file = metrics.close()
+    if metrics_file:
+        print(f"📈 Métricas gravadas em: {metrics_file}")
+
 
 # ============================================================================
 # PONTO DE ENTRADA
 # ============================================================================
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scraper de ofertas do Mercado Livre")
+    parser.add_argument("--resume", action="store_true",
+                        help="Retoma do checkpoint: pula categorias concluídas e reaproveita os produtos salvos")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="Journal de checkpoint (JSON lines)")
+    parser.add_argument("--sem-checkpoint", action="store_true", help="Não grava checkpoint")
+    parser.add_argument("--exportar-checkpoint", action="store_true",
+                        help="Só exporta os produtos já gravados no checkpoint (sem coletar)")
+    args = parser.parse_args()
+
+    if args.exportar_checkpoint:
+        export_checkpoint(args.checkpoint)
+        sys.exit(0)
+
     try:
-        main()
+        with metrics.quiet_output(QUIET_MODE):
+            main(resume=args.resume, checkpoint_path=None if args.sem_checkpoint else args.checkpoint)
     except KeyboardInterrupt:
         print("\n\n" + "⚠️"*40)
         print("⚠️ PROCESSO INTERROMPIDO PELO USUÁRIO (Ctrl+C)")
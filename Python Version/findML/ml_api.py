@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+Cliente assíncrono da API pública do Mercado Livre (sem navegador).
+
+Fluxo (mesmo caminho do Node Version/run.js, sem o limite de 5 itens):
+
+    /sites/MLB/search     → páginas por offset, buscadas em paralelo
+    /items?ids=a,b,...    → detalhes em lotes de 20 (multi-get)
+    /items/{id}/description → descrições concorrentes
+
+Todas as chamadas passam por um semáforo (`concurrency`) e por UMA sessão
+HTTP keep-alive (requests, pool de conexões do tamanho da concorrência),
+executada em threads pelo asyncio — sem dependência nova.
+
+Os produtos saem no mesmo formato de collect_mercadolivre_data (ml.py),
+então entram direto no pipeline/exportação.
+
+Uso:
+    products = collect_mercadolivre_api("notebook", max_results=200)
+
+    async with MercadoLivreAPI(concurrency=16) as api:
+        products = await api.collect(category="MLB1648")
+"""
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Permite importar os módulos compartilhados (pasta common/) rodando o script direto
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import instrumentation as metrics
+
+API_BASE_URL = os.environ.get("ML_API_URL", "https://api.mercadolibre.com")
+API_ACCESS_TOKEN = os.environ.get("ML_ACCESS_TOKEN") # Opcional (Bearer)
+SITE_ID = "MLB"
+
+SEARCH_PAGE_SIZE = 50       # Máximo aceito pela busca
+SEARCH_MAX_OFFSET = 1000    # A busca pública não passa de offset + limit = 1000
+MULTIGET_BATCH_SIZE = 20    # Máximo de IDs por /items?ids=
+CONCURRENCY = 8
+REQUEST_TIMEOUT = 20
+MAX_RETRIES = 3
+RETRY_BACKOFF = 1.0
+DESCRIPTION_LIMIT = 500
+
+ITEM_ATTRIBUTES = "id,title,price,original_price,permalink,thumbnail,secure_thumbnail,pictures,status"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+
+
+class MercadoLivreAPIError(RuntimeError):
+    """Resposta de erro da API (status HTTP em `status`)"""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+# ============================================================================
+# CONVERSÃO PARA O FORMATO DO SCRAPER
+# ============================================================================
+
+def format_price(value) -> str:
+    """1299.9 → "1.299,90" | 1299 → "1.299" (mesmo texto exibido na listagem)"""
+    if value is None:
+        return "Not Found"
+    cents = int(round(float(value) * 100))
+    whole, frac = divmod(cents, 100)
+    text = f"{whole:,}".replace(",", ".")
+    return f"{text},{frac:02d}" if frac else text
+
+
+def format_installments(installments: Optional[Dict]) -> str:
+    """{"quantity": 10, "amount": 39.9, "rate": 0} → "em 10x R$ 39,90 sem juros" """
+    if not installments or not installments.get("quantity") or installments.get("amount") is None:
+        return "Não informado"
+    amount = format_price(installments["amount"])
+    if "," not in amount:
+        amount += ",00"
+    text = f"em {installments['quantity']}x R$ {amount}"
+    return f"{text} sem juros" if not installments.get("rate") else text
+
+
+def api_product(idx: int, result: Dict, item: Optional[Dict] = None,
+                description: Optional[str] = None) -> Dict:
+    """
+    Monta o produto (nomes internos de ml.py) a partir do resultado da busca
+    e, se houver, dos detalhes do multi-get (mais atuais).
+    """
+    data = {**result, **(item or {})}
+    pictures = (item or {}).get("pictures") or []
+    image = (pictures[0].get("secure_url") or pictures[0].get("url")) if pictures else None
+    image = image or data.get("secure_thumbnail") or data.get("thumbnail") or "Not Found"
+
+    product = {
+        "ID": idx,
+        "Title": data.get("title") or "Not Found",
+        "Original_Value": format_price(data["original_price"]) if data.get("original_price") else "Não informado",
+        "Discount_Value": format_price(data.get("price")),
+        "Installments": format_installments(result.get("installments")),
+        "Link": data.get("permalink") or "Not Found",
+        "Image_Card": image,
+    }
+    if description is not None:
+        product["Description"] = description[:DESCRIPTION_LIMIT]
+    return product
+
+
+# ============================================================================
+# CLIENTE
+# ============================================================================
+
+class MercadoLivreAPI:
+    """
+    Cliente assíncrono (asyncio) com sessão keep-alive compartilhada.
+
+    Args:
+          base_url: Raiz da API (um stub local nos testes)
+          site: Site da busca (MLB = Brasil)
+          concurrency: Requisições simultâneas (semáforo + pool de conexões)
+          access_token: Token OAuth (opcional)
+          timeout: Timeout por requisição (s)
+    """
+
+    def __init__(self, base_url: str = API_BASE_URL, site: str = SITE_ID, concurrency: int = CONCURRENCY,
+                 access_token: Optional[str] = API_ACCESS_TOKEN, timeout: float = REQUEST_TIMEOUT,
+                 max_retries: int = MAX_RETRIES, retry_backoff: float = RETRY_BACKOFF):
+        self.base_url = base_url.rstrip("/")
+        self.site = site
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"User-Agent": USER_AGENT, "Accept": "application/json"})
+        if access_token:
+            self.session.headers["Authorization"] = f"Bearer {access_token}"
+
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ml-api")
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.stats = {"requests": 0, "retries": 0, "errors": 0}
+
+    async def __aenter__(self) -> "MercadoLivreAPI":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    # --- HTTP ---
+
+    def _get(self, url: str, params: Optional[Dict]) -> requests.Response:
+        return self.session.get(url, params=params, timeout=self.timeout)
+
+    async def get_json(self, path: str, params: Optional[Dict] = None, endpoint: str = "other"):
+        """
+        GET com retentativa em 429/5xx/erro de rede (respeita Retry-After).
+
+        Levanta:
+              MercadoLivreAPIError: Erro 4xx ou retentativas esgotadas
+        """
+        url = f"{self.base_url}{path}"
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            async with self._semaphore:
+                start = time.perf_counter()
+                self.stats["requests"] += 1
+                try:
+                    response = await loop.run_in_executor(self._executor, self._get, url, params)
+                except requests.RequestException as e:
+                    response, error = None, e
+                metrics.observe("api_request", time.perf_counter() - start, endpoint=endpoint)
+
+            if response is not None:
+                if response.status_code == 200:
+                    return response.json()
+                error = MercadoLivreAPIError(f"HTTP {response.status_code} em {path}", response.status_code)
+                if response.status_code != 429 and response.status_code < 500:
+                    self.stats["errors"] += 1
+                    raise error
+                try:
+                    retry_after = float(response.headers.get("Retry-After", ""))
+                except ValueError:
+                    pass
+
+            if attempt == self.max_retries:
+                break
+            self.stats["retries"] += 1
+            # Espera fora do semáforo: as outras requisições continuam
+            await asyncio.sleep(retry_after if retry_after is not None else self.retry_backoff * 2 ** attempt)
+
+        self.stats["errors"] += 1
+        if isinstance(error, MercadoLivreAPIError):
+            raise error
+        raise MercadoLivreAPIError(f"Falha de rede em {path}: {error}") from error
+
+    # --- Endpoints ---
+
+    async def search_page(self, query: Optional[str] = None, category: Optional[str] = None,
+                          offset: int = 0, limit: int = SEARCH_PAGE_SIZE) -> Dict:
+        params = {"offset": offset, "limit": limit}
+        if query:
+            params["q"] = query
+        if category:
+            params["category"] = category
+        return await self.get_json(f"/sites/{self.site}/search", params, endpoint="search")
+
+    async def search(self, query: Optional[str] = None, category: Optional[str] = None,
+                     max_results: int = 200) -> List[Dict]:
+        """
+        Resultados da busca, na ordem da API (deduplicados por ID).
+
+        A 1ª página informa o total; as demais são buscadas em paralelo.
+        """
+        if not query and not category:
+            raise ValueError("Informe query e/ou category")
+        max_results = min(max_results, SEARCH_MAX_OFFSET)
+        first = await self.search_page(query, category, 0, min(SEARCH_PAGE_SIZE, max_results))
+        total = min(max_results, (first.get("paging") or {}).get("total") or 0)
+
+        offsets = range(SEARCH_PAGE_SIZE, total, SEARCH_PAGE_SIZE)
+        pages = await asyncio.gather(*(
+            self.search_page(query, category, offset, min(SEARCH_PAGE_SIZE, total - offset))
+            for offset in offsets
+        ))
+
+        results, seen = [], set()
+        for page in [first, *pages]:
+            for result in page.get("results") or []:
+                if result.get("id") and result["id"] not in seen:
+                    seen.add(result["id"])
+                    results.append(result)
+        return results[:max_results]
+
+    async def get_items(self, ids: Iterable[str], attributes: str = ITEM_ATTRIBUTES) -> Dict[str, Dict]:
+        """
+        Detalhes via multi-get (lotes de 20 IDs, em paralelo).
+
+        Retorna:
+              {id: body} só dos itens com code 200 (lotes com erro são ignorados)
+        """
+        ids = list(dict.fromkeys(ids))
+        batches = [ids[i:i + MULTIGET_BATCH_SIZE] for i in range(0, len(ids), MULTIGET_BATCH_SIZE)]
+        responses = await asyncio.gather(*(
+            self.get_json("/items", {"ids": ",".join(batch), "attributes": attributes}, endpoint="items")
+            for batch in batches
+        ), return_exceptions=True)
+
+        items = {}
+        for response in responses:
+            if isinstance(response, Exception):
+                print(f"     ⚠️ Multi-get falhou: {response}")
+                continue
+            for entry in response or []:
+                body = entry.get("body") or {}
+                if entry.get("code") == 200 and body.get("id"):
+                    items[body["id"]] = body
+        return items
+
+    async def get_description(self, item_id: str) -> Optional[str]:
+        """Texto da descrição (None se o item não tiver ou der erro)"""
+        try:
+            data = await self.get_json(f"/items/{item_id}/description", endpoint="description")
+        except MercadoLivreAPIError:
+            return None
+        return (data or {}).get("plain_text") or None
+
+    async def get_descriptions(self, ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        ids = list(ids)
+        texts = await asyncio.gather(*(self.get_description(item_id) for item_id in ids))
+        return dict(zip(ids, texts))
+
+    async def collect(self, query: Optional[str] = None, category: Optional[str] = None,
+                      max_results: int = 200, descriptions: bool = True) -> List[Dict]:
+        """
+        Busca + multi-get + descrições → produtos no formato de ml.py.
+
+        Args:
+              query: Termo de busca
+              category: ID da categoria (ex.: "MLB1648")
+              max_results: Teto de produtos (a API não passa de 1000)
+              descriptions: Busca também as descrições (1 requisição por item)
+        """
+        results = await self.search(query, category, max_results)
+        ids = [r["id"] for r in results]
+        if descriptions:
+            items, texts = await asyncio.gather(self.get_items(ids), self.get_descriptions(ids))
+        else:
+            items, texts = await self.get_items(ids), {}
+        return [
+            api_product(idx, result, items.get(result["id"]), texts.get(result["id"]))
+            for idx, result in enumerate(results, 1)
+        ]
+
+
+def collect_mercadolivre_api(query: Optional[str] = None, category: Optional[str] = None,
+                             max_results: int = 200, descriptions: bool = True, **client_options) -> List[Dict]:
+    """
+    Versão síncrona de MercadoLivreAPI.collect (para o pipeline de ml.py).
+
+    Args:
+          client_options: Repassados a MercadoLivreAPI (base_url, concurrency, ...)
+
+    Retorna:
+          Lista de produtos no formato de collect_mercadolivre_data
+    """
+    async def run() -> List[Dict]:
+        async with MercadoLivreAPI(**client_options) as api:
+            start = time.perf_counter()
+            products = await api.collect(query, category, max_results, descriptions)
+            print(f"     ✅ API: {len(products)} produtos em {time.perf_counter() - start:.2f}s "
+                  f"({api.stats['requests']} requisições, {api.stats['retries']} retentativas)")
+            return products
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Busca produtos pela API pública do Mercado Livre")
+    parser.add_argument("termo", nargs="?", help="Termo de busca")
+    parser.add_argument("--categoria", help="ID da categoria (ex.: MLB1648)")
+    parser.add_argument("--max", type=int, default=50, help="Máximo de produtos")
+    parser.add_argument("--sem-descricao", action="store_true")
+    parser.add_argument("--concorrencia", type=int, default=CONCURRENCY)
+    parser.add_argument("--api-url", default=API_BASE_URL)
+    args = parser.parse_args()
+
+    for product in collect_mercadolivre_api(args.termo, args.categoria, args.max, not args.sem_descricao,
+                                            base_url=args.api_url, concurrency=args.concorrencia):
+        print(f"{product['ID']:>4} | R$ {product['Discount_Value']:>10} | {product['Title'][:70]}")
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+API do Mercado Livre falsa (local) para testar o ml_api.py sem rede.
+
+Responde no mesmo formato da API pública:
+    GET /sites/MLB/search?q=&offset=&limit=  →  {"paging": {...}, "results": [...]}
+    GET /items?ids=A,B,...                   →  [{"code": 200, "body": {...}}, ...]
+    GET /items/{id}/description              →  {"plain_text": "..."}
+
+Uso:
+    python stub_api.py --porta 8766 --itens 500 --latencia 0.05
+    python ml_api.py notebook --api-url http://127.0.0.1:8766
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BASE_ID = 5000000000
+
+
+def fake_item(index: int) -> dict:
+    """Item determinístico (mesmo índice → mesmos dados)"""
+    item_id = f"MLB{BASE_ID + index}"
+    price = round(49.9 + (index * 37.3) % 4000, 2)
+    return {
+        "id": item_id,
+        "title": f"Produto de Teste {index} Notebook {8 + index % 3 * 8}GB",
+        "price": price,
+        "original_price": round(price * 1.25, 2) if index % 3 else None,
+        "permalink": f"https://produto.mercadolivre.com.br/MLB-{BASE_ID + index}-produto-de-teste-{index}-_JM",
+        "thumbnail": f"http://http2.mlstatic.com/D_{item_id}-I.jpg",
+        "secure_thumbnail": f"https://http2.mlstatic.com/D_{item_id}-I.jpg",
+        "pictures": [{"secure_url": f"https://http2.mlstatic.com/D_{item_id}-O.jpg"}],
+        "status": "active",
+    }
+
+
+def search_result(index: int) -> dict:
+    item = fake_item(index)
+    result = {k: item[k] for k in ("id", "title", "price", "original_price", "permalink", "thumbnail")}
+    result["installments"] = {"quantity": 10, "amount": round(item["price"] / 10, 2), "rate": 0, "currency_id": "BRL"}
+    return result
+
+
+def create_stub_server(port: int = 0, items: int = 200, latency: float = 0.0,
+                       rate_limit_every: int = 0, missing_description_every: int = 7) -> ThreadingHTTPServer:
+    """
+    Cria o servidor (porta 0 = livre). Use `server.server_address[1]` para a porta.
+
+    Args:
+          items: Total de itens da busca
+          latency: Atraso por requisição (s)
+          rate_limit_every: Responde HTTP 429 a cada N requisições (testa retentativas)
+          missing_description_every: Itens sem descrição (404) a cada N
+    """
+    state = {"requests": 0, "in_flight": 0, "max_in_flight": 0, "paths": {}}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Keep-alive (o cliente reaproveita as conexões)
+
+        def _send(self, status: int, payload, headers: dict = None) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            query = parse_qs(parsed.query)
+            with lock:
+                state["requests"] += 1
+                current = state["requests"]
+                state["in_flight"] += 1
+                state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+                endpoint = re.sub(r"MLB\d+", "{id}", parsed.path)
+                state["paths"][endpoint] = state["paths"].get(endpoint, 0) + 1
+            try:
+                if latency:
+                    time.sleep(latency)
+                if rate_limit_every and current % rate_limit_every == 0:
+                    self._send(429, {"message": "too_many_requests"}, {"Retry-After": "0"})
+                    return
+                self._route(parsed.path, query)
+            finally:
+                with lock:
+                    state["in_flight"] -= 1
+
+        def _route(self, path: str, query: dict) -> None:
+            if re.fullmatch(r"/sites/MLB/search", path):
+                offset = int(query.get("offset", ["0"])[0])
+                limit = int(query.get("limit", ["50"])[0])
+                if limit > 50 or offset + limit > 1000:
+                    self._send(400, {"message": "invalid limit/offset"})
+                    return
+                results = [search_result(i) for i in range(offset, min(items, offset + limit))]
+                self._send(200, {
+                    "site_id": "MLB", "query": query.get("q", [""])[0],
+                    "paging": {"total": items, "primary_results": items, "offset": offset, "limit": limit},
+                    "results": results,
+                })
+                return
+
+            if path == "/items":
+                ids = [i for i in query.get("ids", [""])[0].split(",") if i]
+                if len(ids) > 20:
+                    self._send(400, {"message": "max 20 ids"})
+                    return
+                entries = []
+                for item_id in ids:
+                    index = int(item_id[3:]) - BASE_ID if item_id[3:].isdigit() else -1
+                    if 0 <= index < items:
+                        entries.append({"code": 200, "body": fake_item(index)})
+                    else:
+                        entries.append({"code": 404, "body": {"message": f"Item with id {item_id} not found"}})
+                self._send(200, entries)
+                return
+
+            match = re.fullmatch(r"/items/MLB(\d+)/description", path)
+            if match:
+                index = int(match.group(1)) - BASE_ID
+                if not 0 <= index < items or (missing_description_every and index % missing_description_every == 0):
+                    self._send(404, {"message": "description not found"})
+                    return
+                self._send(200, {"plain_text": f"Descrição do produto de teste {index}. " * 5})
+                return
+
+            self._send(404, {"message": "not_found"})
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API do Mercado Livre falsa para testes locais")
+    parser.add_argument("--porta", type=int, default=8766)
+    parser.add_argument("--itens", type=int, default=200)
+    parser.add_argument("--latencia", type=float, default=0.0)
+    parser.add_argument("--limitar-a-cada", type=int, default=0, help="HTTP 429 a cada N requisições")
+    args = parser.parse_args()
+
+    server = create_stub_server(args.porta, args.itens, args.latencia, args.limitar_a_cada)
+    print(f"🧪 Stub da API em http://127.0.0.1:{args.porta}/sites/MLB/search (Ctrl+C para sair)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
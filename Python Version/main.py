@@ -1,5 +1,24 @@
+import argparse
+
+from common.store import DEFAULT_DB_PATH
+
+
 def main():
-    print("Hello from findprodct!")
+    parser = argparse.ArgumentParser(description="findprodct: API de consulta dos produtos coletados")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--banco", default=DEFAULT_DB_PATH, help="Banco SQLite gravado pelos scrapers")
+    parser.add_argument("--intervalo", type=float, default=5.0,
+                        help="Segundos entre verificações de nova coleta (remonta o índice)")
+    args = parser.parse_args()
+
+    from common.api import create_app
+
+    app = create_app(args.banco, poll_interval=args.intervalo)
+    index = app.config["CATALOG_SERVICE"].index
+    print(f"📚 Catálogo: {len(index)} produtos indexados em {index.build_seconds * 1000:.0f} ms")
+    print(f"🌐 API em http://{args.host}:{args.port}/products")
+    app.run(host=args.host, port=args.port, threaded=True)
 
 
 if __name__ == "__main__":
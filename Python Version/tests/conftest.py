@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Configuração comum dos testes (rodar de "Python Version": python -m pytest).
+
+Os scripts importam os módulos irmãos direto (ex.: ml.py faz `from ml_api
+import ...`), então as pastas deles entram no sys.path como ao rodar o script.
+"""
+
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for folder in ("", "findML", "findAmzn", "Afiliate"):
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def local_server():
+    """
+    Sobe servidores HTTP locais (stubs) em segundo plano e os encerra no fim
+    do teste. Recebe o servidor já criado e devolve o mesmo, com `base_url`.
+    """
+    servers = []
+
+    def serve(server):
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        servers.append(server)
+        return server
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Geração de links de afiliado (app.py) contra o serviço falso (stub_afiliados.py)"""
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import app
+from common.link_cache import LinkCache
+from stub_afiliados import create_stub_server, fake_short_url
+
+BASE_ID = 4000000000
+
+
+def product_url(index: int, tracking: str = "abc") -> str:
+    return f"https://produto.mercadolivre.com.br/MLB-{BASE_ID + index}-produto-{index}-_JM?tracking_id={tracking}"
+
+
+def make_sheet(path, urls) -> str:
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Nome", app.SOURCE_COLUMN])
+    for idx, url in enumerate(urls):
+        sheet.append([f"Produto {idx}", url])
+    workbook.save(path)
+    return str(path)
+
+
+def shared_links(path) -> list:
+    sheet = load_workbook(path).active
+    target = app.column_index(sheet, app.TARGET_COLUMN)
+    return [sheet.cell(row=row, column=target).value for row in range(2, sheet.max_row + 1)]
+
+
+@pytest.fixture
+def affiliates(local_server, monkeypatch):
+    monkeypatch.setattr(app, "RETRY_BACKOFF", 0)
+
+    def start(**kwargs):
+        server = local_server(create_stub_server(**kwargs))
+        server.endpoint = f"{server.base_url}/links"
+        return server
+
+    return start
+
+
+def process(path, server, **kwargs):
+    kwargs.setdefault("workers", 4)
+    kwargs.setdefault("batch_size", 10)
+    return app.process_sheet(path, app.create_affiliate_session(pool_size=4), server.endpoint, **kwargs)
+
+
+def test_links_are_generated_in_batches_and_written_back(affiliates, tmp_path):
+    server = affiliates(latency=0.02)
+    urls = [product_url(i) for i in range(45)]
+    # O mesmo produto em duas categorias e uma linha sem link
+    path = make_sheet(tmp_path / "produtos.xlsx", urls + [urls[0], "Not Found"])
+
+    stats = process(path, server)
+
+    assert stats["generated"] == 45 and stats["errors"] == []
+    assert server.requests["requests"] == 5 # 45 links em lotes de 10
+    assert shared_links(path) == [fake_short_url(u) for u in urls] + [fake_short_url(urls[0]), None]
+
+
+def test_link_cache_skips_products_already_generated(affiliates, tmp_path):
+    server = affiliates()
+    cache = LinkCache(str(tmp_path / "links.db"))
+    first = make_sheet(tmp_path / "coleta1.xlsx", [product_url(i) for i in range(30)])
+    process(first, server, cache=cache)
+    assert server.requests["requests"] == 3
+
+    # Nova coleta: mesmos produtos com outro tracking_id + 5 novos
+    urls = [product_url(i, tracking="xyz") for i in range(35)]
+    second = make_sheet(tmp_path / "coleta2.xlsx", urls)
+    stats = process(second, server, cache=cache)
+
+    assert stats["cached"] == 30 and stats["generated"] == 5
+    assert server.requests["requests"] == 4 # Só os 5 novos foram ao serviço
+    links = shared_links(second)
+    assert links[:30] == [fake_short_url(product_url(i)) for i in range(30)]
+    assert links[30:] == [fake_short_url(u) for u in urls[30:]]
+    cache.close()
+
+
+def test_transient_errors_are_retried(affiliates, tmp_path):
+    server = affiliates(fail_every=3)
+    urls = [product_url(i) for i in range(40)]
+    path = make_sheet(tmp_path / "produtos.xlsx", urls)
+
+    stats = process(path, server, workers=1)
+    assert stats["errors"] == []
+    assert shared_links(path) == [fake_short_url(u) for u in urls]
+
+
+def test_failed_batches_leave_cells_empty_without_aborting(affiliates, tmp_path):
+    server = affiliates(fail_every=1) # Toda requisição responde 503
+    path = make_sheet(tmp_path / "produtos.xlsx", [product_url(i) for i in range(25)])
+
+    stats = process(path, server)
+
+    assert stats["generated"] == 0
+    assert len(stats["errors"]) == 3 # Um erro por lote, depois de esgotar as tentativas
+    assert server.requests["requests"] == 3 * app.MAX_RETRIES
+    assert shared_links(path) == [None] * 25
+
+    # As linhas vazias ficam pendentes: uma nova execução gera os links
+    healthy = affiliates()
+    assert process(path, healthy)["generated"] == 25
+    assert all(shared_links(path))
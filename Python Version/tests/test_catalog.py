@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""Paginação por cursor do índice do catálogo (common.catalog)"""
+
+import pytest
+
+from common.catalog import CatalogIndex, CatalogQueryError
+
+
+def product(product_id: str, price_cents, title: str = "Produto") -> dict:
+    return {
+        "product_id": product_id,
+        "marketplace": "mercadolivre",
+        "title": title,
+        "price_cents": price_cents,
+        "original_price_cents": None,
+        "last_seen": "2026-01-01T00:00:00",
+    }
+
+
+def catalog(prices: dict) -> CatalogIndex:
+    # Inserção fora de ordem: o desempate tem que vir do ID, não da posição
+    return CatalogIndex([product(pid, price) for pid, price in reversed(list(prices.items()))])
+
+
+def page_ids(index: CatalogIndex, **kwargs) -> tuple:
+    page = index.query(**kwargs)
+    return [p["product_id"] for p in page["items"]], page["next_cursor"]
+
+
+def walk(index: CatalogIndex, **kwargs) -> list:
+    ids, cursor = page_ids(index, **kwargs)
+    while cursor:
+        more, cursor = page_ids(index, cursor=cursor, **kwargs)
+        ids.extend(more)
+    return ids
+
+
+PRICES = {"MLB1": 100, "MLB2": 200, "MLB3": 200, "MLB4": 200, "MLB5": 300, "MLB6": None}
+
+
+@pytest.mark.parametrize("order, expected", [
+    ("asc", ["MLB1", "MLB2", "MLB3", "MLB4", "MLB5", "MLB6"]),
+    ("desc", ["MLB5", "MLB4", "MLB3", "MLB2", "MLB1", "MLB6"]),
+])
+def test_ties_are_ordered_by_product_id(order, expected):
+    assert walk(catalog(PRICES), sort="price", order=order, limit=2) == expected
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_cursor_keeps_ties_when_its_product_disappears(order):
+    index = catalog(PRICES)
+    first, cursor = page_ids(index, sort="price", order=order, limit=3)
+    expected = walk(index, sort="price", order=order, limit=100)[3:]
+
+    # Remontagem entre as páginas sem o último produto entregue
+    rebuilt = catalog({pid: price for pid, price in PRICES.items() if pid != first[-1]})
+    rest, _ = page_ids(rebuilt, sort="price", order=order, limit=100, cursor=cursor)
+    assert rest == expected
+
+
+def test_cursor_continues_among_missing_values():
+    index = catalog(PRICES | {"MLB7": None, "MLB8": None})
+    first, cursor = page_ids(index, sort="price", limit=6)
+    assert first[-1] == "MLB6"
+
+    rebuilt = catalog({pid: price for pid, price in (PRICES | {"MLB7": None, "MLB8": None}).items() if pid != "MLB6"})
+    assert page_ids(rebuilt, sort="price", limit=100, cursor=cursor)[0] == ["MLB7", "MLB8"]
+
+
+def test_title_ties_resume_after_rebuild():
+    products = {f"MLB{i}": 100 for i in range(1, 6)}
+    index = CatalogIndex([product(pid, price, title="Mesmo título") for pid, price in products.items()])
+    first, cursor = page_ids(index, sort="title", limit=2)
+    assert first == ["MLB1", "MLB2"]
+
+    rebuilt = CatalogIndex([product(pid, 100, title="Mesmo título") for pid in products if pid != "MLB2"])
+    assert page_ids(rebuilt, sort="title", limit=100, cursor=cursor)[0] == ["MLB3", "MLB4", "MLB5"]
+
+
+def test_invalid_cursor():
+    with pytest.raises(CatalogQueryError):
+        catalog(PRICES).query(cursor="nao-e-um-cursor")
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Publicação no Telegram (divulgar.py) contra a Bot API falsa (stub_telegram.py)"""
+
+import time
+
+import pytest
+import telebot
+from telebot import apihelper
+
+import divulgar
+from common.publish_queue import FAILED, PENDING, SENT, PublishQueue
+from stub_telegram import create_stub_server
+
+CHAT = "@canal_teste"
+
+
+@pytest.fixture
+def telegram(local_server, monkeypatch):
+    def start(**kwargs):
+        server = local_server(create_stub_server(**kwargs))
+        monkeypatch.setattr(apihelper, "API_URL", f"{server.base_url}/bot{{0}}/{{1}}")
+        return server
+
+    return start
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "publicacoes.db")
+
+
+def offer(index: int, images: int = 1) -> dict:
+    return {
+        "product_id": f"MLB{1000 + index}",
+        "title": f"Oferta {index}",
+        "price_cents": 10000 + index,
+        "original_price_cents": 20000,
+        "discount_pct": 50.0,
+        "installments": None,
+        "link": f"https://produto.mercadolivre.com.br/MLB-{1000 + index}-oferta-_JM",
+        "images": [f"https://http2.mlstatic.com/D_{index}_{n}.jpg" for n in range(images)],
+    }
+
+
+def enqueue(publish_queue: PublishQueue, offers) -> int:
+    return publish_queue.enqueue((divulgar.offer_key(o), o) for o in offers)
+
+
+def publisher(publish_queue: PublishQueue, **kwargs) -> divulgar.TelegramPublisher:
+    bot = telebot.TeleBot("1:TESTE", threaded=False)
+    # Sem o limite por chat (20/min) o teste não espera minutos
+    kwargs.setdefault("chat_rate_per_minute", 60000)
+    return divulgar.TelegramPublisher(bot, CHAT, publish_queue, **kwargs)
+
+
+def sent_titles(server) -> list:
+    titles = []
+    for post in server.sent:
+        captions = [m.get("caption") for m in post["media"]] if "media" in post else [post.get("caption") or post.get("text")]
+        titles.extend(c.split("</b>")[0].replace("🔥 <b>", "") for c in captions if c)
+    return titles
+
+
+def test_publishes_in_queue_order(telegram, queue_path):
+    server = telegram()
+    fila = PublishQueue(queue_path)
+    offers = [offer(i) for i in range(7)]
+    assert enqueue(fila, offers) == 7
+
+    assert publisher(fila).publish_pending() == 7
+    assert sent_titles(server) == [o["title"] for o in offers]
+    assert all(post["chat_id"] == CHAT for post in server.sent)
+    assert fila.counts() == {PENDING: 0, SENT: 7, FAILED: 0}
+
+
+def test_albums_keep_order(telegram, queue_path):
+    server = telegram()
+    fila = PublishQueue(queue_path)
+    offers = [offer(i) for i in range(5)]
+    enqueue(fila, offers)
+
+    publisher(fila, album_size=2).publish_pending()
+    assert [post["method"] for post in server.sent] == ["sendMediaGroup", "sendMediaGroup", "sendPhoto"]
+    assert sent_titles(server) == [o["title"] for o in offers]
+
+
+def test_flood_control_waits_retry_after_and_keeps_order(telegram, queue_path):
+    server = telegram(rate_limit_every=3, retry_after=1)
+    fila = PublishQueue(queue_path)
+    offers = [offer(i) for i in range(4)]
+    enqueue(fila, offers)
+    pub = publisher(fila)
+
+    start = time.monotonic()
+    assert pub.publish_pending() == 4
+    elapsed = time.monotonic() - start
+
+    # O 3º envio recebeu 429: pausa de retry_after e reenvio da mesma oferta, na mesma posição
+    assert elapsed >= 1.0
+    assert pub.stats["retried"] == 1
+    assert sent_titles(server) == [o["title"] for o in offers]
+    assert fila.counts()[SENT] == 4
+
+
+def test_rejected_photo_falls_back_to_text(telegram, queue_path):
+    server = telegram(reject_photo="D_1_")
+    fila = PublishQueue(queue_path)
+    enqueue(fila, [offer(0), offer(1), offer(2)])
+
+    assert publisher(fila).publish_pending() == 3
+    assert [post["method"] for post in server.sent] == ["sendPhoto", "sendMessage", "sendPhoto"]
+
+
+def test_queue_survives_restart_without_duplicates(telegram, queue_path):
+    server = telegram()
+    offers = [offer(i) for i in range(6)]
+
+    fila = PublishQueue(queue_path)
+    enqueue(fila, offers)
+    assert publisher(fila).publish_pending(limit=2) == 2
+    fila.close()
+
+    # Reinício: as pendentes continuam na fila e as já publicadas não voltam
+    fila = PublishQueue(queue_path)
+    assert fila.counts() == {PENDING: 4, SENT: 2, FAILED: 0}
+    assert enqueue(fila, offers) == 0
+    assert publisher(fila).publish_pending() == 4
+    assert sent_titles(server) == [o["title"] for o in offers]
+    fila.close()
+
+
+def test_queue_requeues_offer_with_new_price(queue_path):
+    fila = PublishQueue(queue_path)
+    enqueue(fila, [offer(0)])
+    cheaper = dict(offer(0), price_cents=5000)
+    assert enqueue(fila, [offer(0), cheaper]) == 1
+    assert [payload["price_cents"] for _, payload, _ in fila.claim()] == [10000, 5000]
+
+
+def test_retry_is_persisted(queue_path):
+    fila = PublishQueue(queue_path)
+    enqueue(fila, [offer(0)])
+    key = divulgar.offer_key(offer(0))
+    fila.mark_retry(key, "timeout", delay=60)
+    fila.close()
+
+    fila = PublishQueue(queue_path)
+    assert fila.claim() == []
+    assert 0 < fila.next_ready_in() <= 60
+    fila.close()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Cache de imagens (common.image_cache) contra um servidor local de imagens"""
+
+import io
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from common.image_cache import POST_SIZE, ImageCache
+
+
+def image_bytes(color, size=(400, 300), fmt="JPEG") -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", size, color).save(output, fmt)
+    return output.getvalue()
+
+
+def create_image_server(files: dict, latency: float = 0.0) -> ThreadingHTTPServer:
+    """
+    Serve `files` (caminho → (content-type, bytes)); o resto responde 404.
+    `server.hits` conta as requisições por caminho.
+    """
+    hits = {}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                hits[self.path] = hits.get(self.path, 0) + 1
+            if latency:
+                time.sleep(latency)
+            if self.path not in files:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            content_type, body = files[self.path]
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.hits = hits
+    return server
+
+
+RED = image_bytes("red")
+FILES = {
+    "/red.jpg": ("image/jpeg", RED),
+    "/red-copy.jpg": ("image/jpeg", RED), # Mesmo conteúdo, outra URL (outra categoria)
+    "/green.png": ("image/png", image_bytes("green", fmt="PNG")),
+    "/blue.jpg": ("image/jpeg", image_bytes("blue")),
+    "/big.jpg": ("image/jpeg", image_bytes("navy", size=(2400, 1600))),
+    "/page.html": ("text/html", b"<html><body>not an image</body></html>"),
+}
+
+
+@pytest.fixture
+def images(local_server):
+    server = local_server(create_image_server(FILES, latency=0.05))
+    server.url = lambda path: f"{server.base_url}{path}"
+    return server
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ImageCache(str(tmp_path / "images"), workers=8)
+    yield cache
+    cache.close()
+
+
+def test_concurrent_fetches_download_each_url_once(images, cache):
+    urls = [images.url(p) for p in ("/red.jpg", "/green.png", "/blue.jpg")]
+    paths = cache.fetch_many(urls * 4)
+    assert all(paths[u] and os.path.isfile(paths[u]) for u in urls)
+
+    # Várias threads pedindo a mesma URL ao mesmo tempo: uma baixa, as outras esperam
+    url = images.url("/big.jpg")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.fetch(url))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(results)) == 1 and results[0]
+    assert images.hits == {"/red.jpg": 1, "/green.png": 1, "/blue.jpg": 1, "/big.jpg": 1}
+    assert cache.stats["downloaded"] == 4
+
+    # Já em cache: nenhuma requisição nova
+    assert cache.fetch_many(urls) == {u: paths[u] for u in urls}
+    assert sum(images.hits.values()) == 4
+
+
+def test_same_bytes_from_two_urls_share_one_blob(images, cache):
+    first = cache.fetch(images.url("/red.jpg"))
+    second = cache.fetch(images.url("/red-copy.jpg"))
+
+    assert first == second
+    assert cache.stats["downloaded"] == 1 and cache.stats["deduplicated"] == 1
+    assert len(os.listdir(os.path.dirname(first))) == 1
+
+
+def test_images_are_resized_to_post_size(images, cache):
+    path = cache.fetch(images.url("/big.jpg"))
+    with Image.open(path) as image:
+        assert image.format == "JPEG"
+        assert image.width <= POST_SIZE[0] and image.height <= POST_SIZE[1]
+        assert image.size == (1080, 720) # Mantém a proporção 3:2
+
+    with Image.open(cache.fetch(images.url("/blue.jpg"))) as image:
+        assert image.size == (400, 300) # Nunca amplia
+
+
+def test_lru_eviction_under_small_max_bytes(images, cache):
+    red = cache.fetch(images.url("/red.jpg"))
+    time.sleep(0.01)
+    green = cache.fetch(images.url("/green.png"))
+    time.sleep(0.01)
+    assert cache.path_for(images.url("/red.jpg")) == red # Vermelha passa a ser a mais recente
+    time.sleep(0.01)
+
+    # Espaço para as duas atuais e pouco mais: a terceira tira a menos usada (verde)
+    smallest = min(os.path.getsize(red), os.path.getsize(green))
+    cache.max_bytes = cache.total_bytes() + smallest // 2
+    blue = cache.fetch(images.url("/blue.jpg"))
+
+    assert cache.stats["evicted"] == 1
+    assert not os.path.exists(green)
+    assert cache.path_for(images.url("/green.png")) is None
+    assert os.path.isfile(red) and os.path.isfile(blue)
+    assert cache.total_bytes() <= cache.max_bytes
+
+
+def test_missing_and_non_image_responses_count_as_failed(images, cache):
+    paths = cache.fetch_many([images.url("/missing.jpg"), images.url("/page.html"), images.url("/red.jpg")])
+
+    assert paths[images.url("/missing.jpg")] is None
+    assert paths[images.url("/page.html")] is None
+    assert paths[images.url("/red.jpg")]
+    assert cache.stats["failed"] == 2 and cache.stats["downloaded"] == 1
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Exposição Prometheus e modo quieto (common.instrumentation)"""
+
+from common import instrumentation
+from common.instrumentation import Instrumentation
+
+
+def test_prometheus_counter_help_and_type_once_per_metric():
+    metrics = Instrumentation(enabled=True)
+    metrics.count("pages", site="mercadolivre")
+    metrics.count("pages", site="amazon")
+    metrics.count("pages", 2, site="mercadolivre")
+    metrics.count("blocked")
+
+    lines = metrics.prometheus_text().splitlines()
+    assert lines.count("# TYPE findprodct_pages_total counter") == 1
+    assert sum(line.startswith("# HELP findprodct_pages_total ") for line in lines) == 1
+    assert lines.count("# TYPE findprodct_blocked_total counter") == 1
+
+    # As séries vêm logo depois do cabeçalho da própria métrica
+    start = lines.index("# TYPE findprodct_pages_total counter")
+    assert sorted(lines[start + 1:start + 3]) == [
+        'findprodct_pages_total{site="amazon"} 1',
+        'findprodct_pages_total{site="mercadolivre"} 3',
+    ]
+
+
+def test_quiet_output_keeps_errors_on_stderr(capsys):
+    with instrumentation.quiet_output(True):
+        print("🚀 Iniciando coleta")
+        print("\n\n❌ ERRO FATAL: boom")
+        print("⚠️ Erro durante a coleta: ", end="")
+        print("timeout")
+        print("✅ 10 produtos")
+
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert captured.err.splitlines() == ["❌ ERRO FATAL: boom", "⚠️ Erro durante a coleta: timeout"]
+
+
+def test_quiet_output_disabled_passes_everything(capsys):
+    with instrumentation.quiet_output(False):
+        print("🚀 Iniciando coleta")
+    assert capsys.readouterr().out == "🚀 Iniciando coleta\n"
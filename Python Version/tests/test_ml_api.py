@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""Cliente da API do Mercado Livre (ml_api.py) contra a API falsa (stub_api.py)"""
+
+import asyncio
+
+import pytest
+
+import ml
+import ml_api
+from stub_api import BASE_ID, create_stub_server, fake_item
+
+
+@pytest.fixture
+def stub_api(local_server):
+    def start(**kwargs):
+        kwargs.setdefault("missing_description_every", 0)
+        return local_server(create_stub_server(**kwargs))
+
+    return start
+
+
+def collect(server, query="notebook", **kwargs):
+    kwargs.setdefault("retry_backoff", 0.01)
+    return ml_api.collect_mercadolivre_api(query, base_url=server.base_url, **kwargs)
+
+
+def test_search_pages_past_first_50_results(stub_api):
+    server = stub_api(items=180)
+    products = collect(server, max_results=130, descriptions=False)
+
+    assert [p["ID"] for p in products] == list(range(1, 131))
+    assert [ml.extract_item_id(p["Link"]) for p in products] == [f"MLB{BASE_ID + i}" for i in range(130)]
+    assert server.state["paths"]["/sites/MLB/search"] == 3 # 50 + 50 + 30
+
+
+def test_search_stops_at_total(stub_api):
+    server = stub_api(items=60)
+    assert len(collect(server, max_results=500, descriptions=False)) == 60
+
+
+def test_multiget_batches_of_at_most_20(stub_api):
+    server = stub_api(items=100)
+    products = collect(server, max_results=45, descriptions=False)
+
+    # O stub responde 400 a lotes com mais de 20 IDs: a imagem -O só vem do multi-get
+    assert server.state["paths"]["/items"] == 3 # 20 + 20 + 5
+    assert all(p["Image_Card"].endswith("-O.jpg") for p in products)
+
+
+def test_missing_description_is_none(stub_api):
+    server = stub_api(items=20, missing_description_every=4)
+
+    async def run():
+        async with ml_api.MercadoLivreAPI(base_url=server.base_url) as api:
+            return await api.get_descriptions([f"MLB{BASE_ID + i}" for i in range(5)])
+
+    texts = list(asyncio.run(run()).values())
+    assert texts[0] is None and texts[4] is None
+    assert all(texts[1:4])
+
+    products = collect(server, max_results=8)
+    assert ["Description" in p for p in products] == [i % 4 != 0 for i in range(8)]
+
+
+def test_rate_limited_requests_are_retried(stub_api):
+    server = stub_api(items=120, rate_limit_every=4)
+    products = collect(server, max_results=120)
+
+    # 3 buscas + 6 multi-gets + 120 descrições sem retentativa; a cada 4 o stub devolve 429
+    assert server.state["requests"] > 129
+    assert len(products) == 120
+    assert all(p["Image_Card"].endswith("-O.jpg") for p in products)
+    assert all("Description" in p for p in products)
+
+
+def test_in_flight_requests_never_exceed_concurrency(stub_api):
+    server = stub_api(items=100, latency=0.02)
+    collect(server, max_results=100, concurrency=3)
+
+    assert 1 < server.state["max_in_flight"] <= 3
+
+
+def test_output_schema_matches_scraper(stub_api):
+    server = stub_api(items=10)
+    products = collect(server, max_results=10, descriptions=False)
+
+    scraped = ml.build_product(1, {
+        "title": "x", "old_price": "x", "new_price_whole": "1", "new_price_cents": "",
+        "installments": "x", "link": "x", "image": "x",
+    })
+    assert all(p.keys() == scraped.keys() for p in products)
+    assert products[1]["Discount_Value"] == ml_api.format_price(fake_item(1)["price"])
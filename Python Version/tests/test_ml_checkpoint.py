@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Checkpoint por categoria (iter_category): só categorias completas são marcadas como concluídas"""
+
+import sqlite3
+
+import pytest
+from selenium.common.exceptions import TimeoutException
+
+import ml
+import ml_api
+from common.checkpoint import CheckpointJournal
+from common.store import ProductStore
+from test_ml_pagination import ListingServer
+
+
+class TimeoutWait:
+    def until(self, *args, **kwargs):
+        raise TimeoutException("cards não carregaram")
+
+
+class StuckDriver:
+    """Driver cuja listagem nunca mostra os cards"""
+    page_source = "<html><body>carregando...</body></html>"
+    current_url = "https://lista.mercadolivre.com.br/notebook"
+
+    def get(self, url):
+        pass
+
+    def save_screenshot(self, path):
+        return False
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.driver = None
+
+    def get(self):
+        self.driver = StuckDriver()
+        return self.driver, TimeoutWait(), TimeoutWait()
+
+    def quit(self):
+        self.driver = None
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(ml, "RESOURCE_BLOCKING", False)
+    monkeypatch.setattr(ml, "NETWORK_CAPTURE", False)
+    monkeypatch.setattr(ml, "save_error_screenshot", lambda driver, name: "sem screenshot")
+
+
+def run_category(url, journal, session=None):
+    result = ml.new_category_result(1, url)
+    products = list(ml.iter_category(result, session, FakeBrowser(), journal))
+    return result, products
+
+
+def test_timed_out_category_stays_pending_on_resume(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    url = "https://lista.mercadolivre.com.br/notebook"
+
+    result, products = run_category(url, CheckpointJournal(path))
+    assert products == []
+    assert "cards não carregaram" in result["error"]
+
+    resumed = CheckpointJournal(path, resume=True)
+    assert not resumed.is_done(url)
+    resumed.close()
+
+
+@pytest.fixture
+def paginated(monkeypatch):
+    monkeypatch.setattr(ml, "PAGINATION_MAX_PAGES", 3)
+    server = ListingServer(total=12, page_size=4)
+    yield server
+    server.close()
+
+
+def test_failed_page_keeps_category_pending_until_it_is_fetched(paginated, tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoint.jsonl")
+    fetch = ml.http_page_fetcher()
+
+    def flaky():
+        def run(url):
+            if "_Desde_5_" in url:
+                raise ConnectionError("reset")
+            return fetch(url)
+        return run
+
+    monkeypatch.setattr(ml, "http_page_fetcher", flaky)
+    journal = CheckpointJournal(path)
+    result, products = run_category(paginated.first_url, journal, ml.create_http_session())
+    journal.close()
+
+    assert len(products) == 8
+    assert result["error"] == "página(s) 2 falharam"
+
+    # Resume: só a página que faltou é baixada, e aí a categoria fica concluída
+    monkeypatch.setattr(ml, "http_page_fetcher", lambda: fetch)
+    paginated.requests.clear()
+    journal = CheckpointJournal(path, resume=True)
+    assert not journal.is_done(paginated.first_url)
+    result, products = run_category(paginated.first_url, journal, ml.create_http_session())
+    journal.close()
+
+    assert result["error"] is None
+    assert len(products) == 12
+    assert paginated.requests == [2]
+    assert CheckpointJournal(path, resume=True).is_done(paginated.first_url)
+
+
+def test_complete_category_is_marked_done(paginated, tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    journal = CheckpointJournal(path)
+    result, products = run_category(paginated.first_url, journal, ml.create_http_session())
+    journal.close()
+
+    assert len(products) == 12 and result["error"] is None
+    assert CheckpointJournal(path, resume=True).done == {paginated.first_url: 12}
+
+
+def test_tabs_leave_empty_and_failed_categories_pending(tmp_path, monkeypatch):
+    urls = [f"https://lista.mercadolivre.com.br/categoria-{i}" for i in range(3)]
+    product = ml.build_product(1, {
+        "title": "Produto", "old_price": "Não informado", "new_price_whole": "100", "new_price_cents": "",
+        "installments": "em 10x", "link": "https://produto.mercadolivre.com.br/MLB-1-produto-_JM", "image": "x",
+    })
+    outcomes = [(0, []), (1, TimeoutError("cards não carregaram")), (2, [product])]
+    monkeypatch.setattr(ml, "iter_tab_results", lambda *args: iter(outcomes))
+    monkeypatch.setattr(ml, "browser_ws_url", lambda driver: "ws://127.0.0.1/devtools")
+    monkeypatch.setattr(ml, "tab_setup", lambda: None)
+
+    path = str(tmp_path / "checkpoint.jsonl")
+    journal = CheckpointJournal(path)
+    results = []
+    assert list(ml.iter_categories_tabs(urls, None, FakeBrowser(), results, journal=journal)) == [product]
+    journal.close()
+
+    assert results[1]["error"] == "cards não carregaram"
+    assert CheckpointJournal(path, resume=True).done == {urls[2]: 1}
+
+
+def test_api_query_without_results_stays_pending(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml_api, "collect_mercadolivre_api", lambda *args, **kwargs: [])
+    path = str(tmp_path / "checkpoint.jsonl")
+    journal = CheckpointJournal(path)
+    result = ml.new_category_result(1, "api:notebook")
+    assert list(ml.iter_api_query(result, "notebook", journal)) == []
+    journal.close()
+
+    assert not CheckpointJournal(path, resume=True).is_done("api:notebook")
+
+
+def test_resume_stores_replayed_products_only_if_they_never_reached_the_db(tmp_path, monkeypatch):
+    server = ListingServer(total=6, page_size=10)
+    monkeypatch.chdir(tmp_path)
+    for name, value in {"CATEGORY_URLS": [server.first_url], "API_QUERIES": [], "USE_DRIVER_POOL": False,
+                        "DOWNLOAD_IMAGES": False, "EXPORT_FORMATS": ["jsonl"],
+                        "STORE_PATH": str(tmp_path / "products.db")}.items():
+        monkeypatch.setattr(ml, name, value)
+    checkpoint = str(tmp_path / "checkpoint.jsonl")
+
+    def history_rows() -> int:
+        with sqlite3.connect(ml.STORE_PATH) as conn:
+            return conn.execute("SELECT COUNT(*) FROM price_history").fetchone()[0]
+
+    # 1ª execução: a categoria termina, mas o banco recusa o lote
+    def locked(self, rows, marketplace):
+        raise sqlite3.OperationalError("database is locked")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ProductStore, "save_products", locked)
+        ml.main(checkpoint_path=checkpoint)
+    assert history_rows() == 0
+
+    # Resume: os produtos reentregues que não chegaram ao banco são gravados agora...
+    ml.main(resume=True, checkpoint_path=checkpoint)
+    assert history_rows() == 6
+
+    # ...e só uma vez: no próximo resume o journal já os tem como gravados
+    ml.main(resume=True, checkpoint_path=checkpoint)
+    assert history_rows() == 6
+    assert server.requests == [1] # A categoria foi concluída na 1ª execução
+    server.close()
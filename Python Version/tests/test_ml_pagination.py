@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""Paginação das listagens do ML (crawl_listing_pages) contra um servidor local de fixtures"""
+
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import ml
+
+BASE_ID = 4000000000
+
+CARD_HTML = """
+<li class="ui-search-layout__item"><div class="andes-card poly-card">
+<img class="poly-component__picture" src="https://http2.mlstatic.com/D_{id}-O.webp">
+<a href="{link}" class="poly-component__title">Produto {index}</a>
+<div class="poly-price__current"><span class="andes-money-amount__fraction">{price}</span></div>
+<span class="poly-price__installments">em 10x sem juros</span>
+</div></li>
+"""
+
+NEXT_HTML = '<li class="andes-pagination__button--next"><a href="{href}">Seguinte</a></li>'
+
+
+def card(index: int, link: str = None) -> str:
+    item_id = BASE_ID + index
+    if link is None:
+        link = f"https://produto.mercadolivre.com.br/MLB-{item_id}-produto-{index}-_JM"
+    return CARD_HTML.format(id=item_id, link=link, index=index, price=100 + index)
+
+
+class ListingServer:
+    """
+    Listagem falsa com `total` itens, `page_size` por página.
+
+    Modos: "desde" (/lista_Desde_N_NoIndex_True, como lista.mercadolivre)
+    ou "page" (/ofertas?page=N, como a página de ofertas).
+    """
+
+    def __init__(self, total: int, page_size: int, mode: str = "desde", extra_cards=None):
+        self.total = total
+        self.page_size = page_size
+        self.mode = mode
+        self.extra_cards = extra_cards or {} # página → HTML adicional
+        self.requests = []
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    @property
+    def first_url(self) -> str:
+        return f"{self.base}/notebook" if self.mode == "desde" else f"{self.base}/ofertas"
+
+    def page_of(self, path: str, query: dict) -> int:
+        if self.mode == "page":
+            return int(query.get("page", ["1"])[0])
+        desde = re.search(r"_Desde_(\d+)", path)
+        offset = int(desde.group(1)) if desde else 1
+        return (offset - 1) // self.page_size + 1
+
+    def next_href(self, page: int) -> str:
+        if self.mode == "page":
+            return f"{self.base}/ofertas?page={page + 1}"
+        return f"{self.base}/notebook_Desde_{page * self.page_size + 1}_NoIndex_True"
+
+    def render(self, page: int) -> str:
+        start = (page - 1) * self.page_size
+        indexes = range(start, min(self.total, start + self.page_size))
+        cards = "".join(card(i) for i in indexes) + self.extra_cards.get(page, "")
+        has_next = start + self.page_size < self.total
+        return (f"<html><body><ol>{cards}</ol>"
+                f"{NEXT_HTML.format(href=self.next_href(page)) if has_next else ''}</body></html>")
+
+    def _handler(self):
+        listing = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                page = listing.page_of(parsed.path, parse_qs(parsed.query))
+                with listing._lock:
+                    listing.requests.append(page)
+                body = listing.render(page).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def close(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def listing():
+    servers = []
+
+    def start(*args, **kwargs) -> ListingServer:
+        server = ListingServer(*args, **kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def crawl(server: ListingServer, **kwargs):
+    kwargs.setdefault("max_pages", 10)
+    kwargs.setdefault("max_products", None)
+    kwargs.setdefault("workers", 1)
+    return ml.crawl_listing_pages(server.first_url, ml.http_page_fetcher(), **kwargs)
+
+
+# --- page_url_builder ---
+
+def test_page_url_builder_uses_desde_offset_from_next_link():
+    build = ml.page_url_builder(
+        "https://lista.mercadolivre.com.br/notebook",
+        "https://lista.mercadolivre.com.br/notebook_Desde_49_NoIndex_True", 48)
+    assert build(2) == "https://lista.mercadolivre.com.br/notebook_Desde_49_NoIndex_True"
+    assert build(3) == "https://lista.mercadolivre.com.br/notebook_Desde_97_NoIndex_True"
+
+
+def test_page_url_builder_uses_page_parameter():
+    build = ml.page_url_builder(
+        "https://www.mercadolivre.com.br/ofertas",
+        "https://www.mercadolivre.com.br/ofertas?container_id=MLB779362-1&page=2", 54)
+    assert build(5) == "https://www.mercadolivre.com.br/ofertas?container_id=MLB779362-1&page=5"
+
+
+def test_page_url_builder_guesses_desde_for_lista_without_next_link():
+    build = ml.page_url_builder("https://lista.mercadolivre.com.br/celulares_Desde_1_NoIndex_True", None, 50)
+    assert build(2) == "https://lista.mercadolivre.com.br/celulares_Desde_51_NoIndex_True"
+
+
+def test_page_url_builder_without_pagination():
+    assert ml.page_url_builder("https://www.mercadolivre.com.br/ofertas", None, 54) is None
+    assert ml.page_url_builder("https://x/ofertas", "https://x/ofertas?sort=price", 54) is None
+
+
+# --- crawl_listing_pages ---
+
+def test_crawl_follows_desde_offsets_until_empty_page(listing):
+    server = listing(total=10, page_size=4)
+    products = crawl(server)
+
+    # Páginas 1-3 com produtos (4 + 4 + 2); a página 4 vem vazia e encerra
+    assert server.requests == [1, 2, 3, 4]
+    assert [p["ID"] for p in products] == list(range(1, 11))
+    assert [ml.extract_item_id(p["Link"]) for p in products] == [f"MLB{BASE_ID + i}" for i in range(10)]
+
+
+def test_crawl_follows_page_parameter(listing):
+    server = listing(total=7, page_size=3, mode="page")
+    products = crawl(server, workers=2)
+
+    assert len(products) == 7
+    assert sorted(set(server.requests)) == [1, 2, 3, 4, 5]
+
+
+def test_crawl_fetches_pages_concurrently_in_batches(listing):
+    server = listing(total=40, page_size=4)
+    products = crawl(server, max_pages=6, workers=3)
+
+    assert len(products) == 24
+    assert sorted(server.requests) == [1, 2, 3, 4, 5, 6]
+
+
+def test_crawl_stops_at_product_budget(listing):
+    server = listing(total=40, page_size=4)
+    products = crawl(server, max_products=6)
+
+    assert len(products) == 6
+    assert [p["ID"] for p in products] == list(range(1, 7))
+    assert server.requests == [1, 2] # O orçamento fecha na página 2
+
+
+def test_crawl_respects_max_pages(listing):
+    server = listing(total=40, page_size=4)
+    assert len(crawl(server, max_pages=1)) == 4
+    assert server.requests == [1]
+
+
+def test_crawl_deduplicates_by_item_id_across_pages(listing):
+    # A página 2 repete o primeiro anúncio da página 1 (com outro slug no link)
+    repeated = card(0, link=f"https://produto.mercadolivre.com.br/MLB-{BASE_ID}-outro-slug-_JM")
+    server = listing(total=8, page_size=4, extra_cards={2: repeated})
+    products = crawl(server, max_pages=2)
+
+    assert len(products) == 8
+    assert len({ml.extract_item_id(p["Link"]) for p in products}) == 8
+
+
+def test_crawl_keeps_cards_without_id_or_link(listing):
+    # Cards quebrados (sem link) não podem colapsar num único produto
+    broken = "".join(card(100 + i, link="").replace(' href=""', "") for i in range(3))
+    server = listing(total=4, page_size=4, extra_cards={1: broken})
+    products = crawl(server, max_pages=1)
+
+    assert len(products) == 7
+    assert sum(p["Link"] == "Not Found" for p in products) == 3
+
+
+def test_crawl_reports_failed_pages_and_continues(listing):
+    server = listing(total=12, page_size=4)
+    fetch = ml.http_page_fetcher()
+
+    def flaky(url):
+        if "_Desde_5_" in url:
+            raise ConnectionError("reset")
+        return fetch(url)
+
+    products = ml.crawl_listing_pages(server.first_url, flaky, max_pages=3, max_products=None, workers=2)
+    assert len(products) == 8 # Página 2 falhou; 1 e 3 chegaram
+
+
+def test_crawl_does_not_journal_empty_pages(listing):
+    server = listing(total=6, page_size=4)
+    journaled = []
+    crawl(server, on_page=lambda page, products, **info: journaled.append(page))
+
+    # A página 3 veio vazia: no resume ela é baixada de novo em vez de encerrar a categoria
+    assert server.requests == [1, 2, 3]
+    assert journaled == [1, 2]
+
+
+def test_crawl_resumes_when_first_page_came_empty(listing):
+    server = listing(total=0, page_size=4)
+    journaled = {}
+    assert crawl(server, on_page=lambda page, products, **info: journaled.setdefault(page, products)) == []
+    assert journaled == {}
+
+    server.total = 5
+    assert len(crawl(server, saved_pages=journaled)) == 5